@@ -1,5 +1,10 @@
 import os
 
+import podcast_audit
+import podcast_history
+from podcast_core import generate_html_block, extract_podcasts
+from podcast_timing import span, timed, run_main
+
 def get_input(prompt_text, allow_empty=False, default=None):
     """
     Get input from the user with a prompt.
@@ -17,86 +22,17 @@ def get_input(prompt_text, allow_empty=False, default=None):
     except EOFError:
         return ""
 
+@timed("render.format_podcast_entry")
 def format_podcast_entry(title, details, archive_link, authors, sources):
     """
-    Formats the podcast entry as HTML.
+    Formats the podcast entry as HTML, in the same canonical card format
+    the dashboard writes (see podcast_core.generate_html_block).
     """
-    # Format Authors naturally: "von Autor1, Autor2 und Autor3"
-    authors_text = "Anonym"
-    if isinstance(authors, list) and authors:
-        if len(authors) == 1:
-            authors_text = f"von {authors[0]}"
-        else:
-            # Join all except last with comma, and last with " und "
-            all_but_last = ", ".join(authors[:-1])
-            last = authors[-1]
-            authors_text = f"von {all_but_last} und {last}"
-    elif authors:
-         authors_text = f"von {authors}"
-
-    # Create HTML formatted list for sources if multiple
-    sources_html = ""
-    if isinstance(sources, list) and sources:
-        sources_html = '<ul class="source-list">' + ''.join([f'<li><a href="{s}" target="_blank">{s}</a></li>' if s.startswith('http') else f'<li>{s}</li>' for s in sources]) + '</ul>'
-    else:
-        sources_html = sources
-
-    # Determine MIME type(s) and sources for Maximum Compatibility
-    sources_block = ""
-    link_lower = archive_link.lower()
-    
-    if link_lower.endswith('.m4a'):
-        # M4A / AAC Compatibility
-        sources_block = f"""<source src="{archive_link}" type="audio/mp4">
-            <source src="{archive_link}" type="audio/x-m4a">
-            <source src="{archive_link}" type="audio/aac">"""
-        
-    elif link_lower.endswith('.mp3'):
-        # MP3 Compatibility
-        sources_block = f"""<source src="{archive_link}" type="audio/mpeg">
-            <source src="{archive_link}" type="audio/mp3">"""
-        
-    elif link_lower.endswith('.ogg') or link_lower.endswith('.oga'):
-        # OGG
-        sources_block = f"""<source src="{archive_link}" type="audio/ogg">"""
-        
-    elif link_lower.endswith('.wav'):
-        # WAV
-        sources_block = f"""<source src="{archive_link}" type="audio/wav">"""
-        
-    else:
-        # Fallback
-        sources_block = f"""<source src="{archive_link}" type="audio/mpeg">
-            <source src="{archive_link}" type="audio/mp4">"""
-
-    return f"""
-    <!-- NEUE EPISODE: {title} -->
-    <article class="podcast-card">
-        <h3>{title}</h3>
-        <p class="podcast-description">{details}</p>
-        
-        <audio controls preload="metadata">
-            {sources_block}
-            Your browser does not support the audio element.
-        </audio>
-
-        <p class="podcast-author">{authors_text}</p>
-
-        <details>
-            <summary>Details & Infos</summary>
-            <div class="details-content">
-                <ul class="podcast-details">
-                    <li class="podcast-item"><strong>Titel:</strong> {title}</li>
-                    <li class="podcast-item"><strong>Info:</strong> {details}</li>
-                </ul>
-                <div class="podcast-extra">
-                    <strong>Quellen:</strong>
-                    {sources_html}
-                </div>
-            </div>
-        </details>
-    </article>
-"""
+    if isinstance(authors, str):
+        authors = [authors]
+    if isinstance(sources, str):
+        sources = [sources] if sources else []
+    return "\n" + generate_html_block(title, details, archive_link, authors or [], sources or []) + "\n"
 
 def add_podcast_to_file(file_path, entry_html):
     """
@@ -107,7 +43,16 @@ def add_podcast_to_file(file_path, entry_html):
         return False
 
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
+        # A sharded section (podcast_shards.py) keeps its cards in .shards/:
+        # the entry goes into the last shard instead of the page
+        section_dir = os.path.dirname(os.path.abspath(file_path))
+        if os.path.isfile(os.path.join(section_dir, ".shards", "manifest.json")):
+            import podcast_api
+            podcast_api.commit([{'op': 'add', 'section': os.path.basename(section_dir), 'block': entry_html}],
+                               os.path.dirname(os.path.dirname(section_dir)))
+            return True
+
+        with span("disk.read"), open(file_path, 'r', encoding='utf-8') as f:
             content = f.read()
         
         # Find the closing tag of the main section
@@ -124,15 +69,38 @@ def add_podcast_to_file(file_path, entry_html):
              
         new_content = parts[0] + entry_html + "\n" + insert_marker + parts[1]
         
-        with open(file_path, 'w', encoding='utf-8') as f:
+        with span("disk.write"), open(file_path, 'w', encoding='utf-8') as f:
             f.write(new_content)
-            
-        return True
-        
     except Exception as e:
         print(f"Error processing file: {e}")
         return False
 
+    # The entry is saved; undo history and audit log are extras that must not turn it into a failure
+    try:
+        # Keep the change undoable (podcast_cli.py undo <section>)
+        podcast_history.record(file_path, content, [(len(parts[0]), len(parts[0]), entry_html + "\n")], "add entry")
+    except (OSError, ValueError) as e:
+        print(f"Warning: entry saved, but not recorded for undo: {e}")
+    added = extract_podcasts(entry_html)
+    if added:
+        podcast_audit.record_file_change(file_path, 'add', parts[0].count('<article class="podcast-card"'),
+                                         after=added[0])
+    return True
+
+def upload_if_local(link, root):
+    """
+    A local audio file given as the link is uploaded (podcast_upload.py)
+    and replaced by its public URL.
+    """
+    path = os.path.expanduser(link.strip('"'))
+    if link.lower().startswith(("http://", "https://")) or not os.path.isfile(path):
+        return link
+    import podcast_upload
+    print(f"Uploading {path} ...")
+    result = podcast_upload.upload(path, root, progress=lambda p: print(f"  part {p['done']}/{p['parts']}"))
+    print(f"Uploaded: {result['url']}")
+    return result['url']
+
 def get_multiline_input(prompt_text):
     """
     Get multiple items as input until empty line.
@@ -187,7 +155,12 @@ def main():
         print(f"\n--- Adding to {choice.upper()} ---")
         
         # Collection Inputs
-        archive_link = get_input("Archive Link")
+        archive_link = get_input("Archive Link (or a local audio file to upload)")
+        try:
+            archive_link = upload_if_local(archive_link, script_dir)
+        except (ValueError, OSError) as e:
+            print(f"ERROR: Upload failed: {e} (try again to resume it)")
+            continue
         title = get_input("Title of Podcast")
         
         # Details with default behavior
@@ -223,6 +196,11 @@ def main():
         print(f"Link:    {archive_link}")
         print(f"Authors: {', '.join(authors)}")
         print(f"Sources: {len(sources)} items")
+
+        import podcast_duplicates
+        matches = podcast_duplicates.find_duplicates({'title': title, 'authors': authors, 'link': archive_link})
+        if matches:
+            print(f"WARNING: already in the archive: {podcast_duplicates.describe(matches)}")
         
         confirm = input("Add this entry? (y/n): ").strip().lower()
         if confirm == 'y':
@@ -236,4 +214,4 @@ def main():
         print("\n----------------------------------------")
 
 if __name__ == "__main__":
-    main()
+    run_main(main)
@@ -0,0 +1,227 @@
+# Seeded generator for synthetic podcast section pages in the shape of
+# podcasts/<section>/index.html, mixing every card format the parsers still read.
+import random
+import argparse
+
+FIRST_NAMES = ["Mira", "Sofiia", "Anouk", "Lidija", "Henrik", "Philip", "Malai", "Viktoria",
+               "Andrea", "Sara", "Deniss", "Johann", "Jonathan", "Timon", "Mark", "Martin",
+               "Daniel", "Minoshek", "Georg", "Laurids", "Fabio", "Niklas", "Jaline", "Carlotta",
+               "Julia", "Isabella", "Paula", "Lina", "Jil", "Chiara", "Noemi", "Lionel"]
+GENRES = ["Soul", "Beat", "Hard Rock", "Heavy Metal", "Latin Rock", "Reggae", "Disco", "Punk",
+          "New Wave", "Techno", "Hip-Hop", "Pop", "Jazz", "Blues", "Grunge", "Funk", "Ska"]
+WORDS = ["Geschichte", "Klang", "Gesellschaft", "Gitarrenriffs", "Strukturen", "Musik", "Szene",
+         "Einfluss", "Bands", "Album", "Bühne", "Rhythmus", "Jahrzehnt", "Kultur", "Sound"]
+
+# Card formats seen in the real archive, with their relative frequency
+VARIANTS = [
+    ("player", 5),        # generate_html_block, audio player + podcast-sources
+    ("moodle", 3),        # generate_html_block, moodle button
+    ("simple_add", 2),    # add_podcast.format_podcast_entry, source-list
+    ("author_list", 1),   # old <ul class="author-list"> in podcast-extra
+    ("autoren_item", 1),  # very old <li><strong>Autoren:</strong> item
+]
+
+PAGE_HEAD = """<!DOCTYPE html>
+<html lang="de">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Podcasts von Bench</title>
+    <link rel="stylesheet" href="../../style.css">
+</head>
+<body>
+
+<header>
+    <h1>Podcasts von Bench</h1>
+    <p>Synthetische Benchmark-Seite</p>
+</header>
+
+<main class="podcast-grid">
+
+    <!-- PLATZHALTER FÜR WEITERE EPISODEN -->
+"""
+
+PAGE_TAIL = """
+</main>
+
+<footer>
+    <p>&copy; 2026 Hosted by Panumic | Bildungszwecke</p>
+</footer>
+
+</body>
+</html>
+"""
+
+
+def random_episode(rng, i):
+    """
+    Returns the field dict for one synthetic episode.
+    """
+    title = f"{rng.choice(GENRES)} {i}"
+    details = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 40)))
+    authors = rng.sample(FIRST_NAMES, rng.randint(1, 3))
+    sources = []
+    for _ in range(rng.randint(0, 3)):
+        if rng.random() < 0.7:
+            sources.append(f"https://example.org/{rng.choice(WORDS).lower()}/{rng.randint(1, 9999)}")
+        else:
+            sources.append(f"Buch: {rng.choice(WORDS)} ({rng.randint(1950, 2024)})")
+    ext = rng.choice([".mp3", ".mp3", ".m4a", ".mpeg", ".ogg", ".wav"])
+    link = f"https://archive.org/download/bench-{i}/Podcast%20{i}{ext}"
+    return {'title': title, 'details': details, 'link': link, 'authors': authors, 'sources': sources}
+
+def render_card(rng, i, variant):
+    """
+    Renders episode i in the given historical markup variant.
+    """
+    ep = random_episode(rng, i)
+    title, details, link = ep['title'], ep['details'], ep['link']
+    authors, sources = ep['authors'], ep['sources']
+    authors_text = f"von {authors[0]}" if len(authors) == 1 else f"von {', '.join(authors[:-1])} und {authors[-1]}"
+    source_items = "".join(f'<li><a href="{s}" target="_blank">{s}</a></li>' if s.startswith("http") else f"<li>{s}</li>"
+                           for s in sources)
+
+    if variant == "moodle":
+        link = f"https://moodle.ksasz.ch/pluginfile.php/{200000 + i}/mod_resource/content/1/Podcast_{i}.mp3?forcedownload=0"
+        media = f"""<div class="moodle-container">
+        <a href="{link}" target="_blank" class="moodle-button">
+            🔒 Höre es dir auf Moodle an (Login benötigt)
+        </a>
+        <p class="moodle-note">Diese Episode ist auf moodle. Klicke zum Öffnen/Herunterladen.</p>
+    </div>"""
+    else:
+        media = f"""<audio controls preload="metadata">
+        <source src="{link}" type="audio/mpeg">
+            <source src="{link}" type="audio/mp3">
+        Your browser does not support the audio element.
+    </audio>"""
+
+    if variant in ("player", "moodle"):
+        sources_block = ""
+        if source_items:
+            sources_block = f"""
+            <div class="podcast-sources">
+                <h4 style="margin-bottom: 5px;">Quellen:</h4>
+                <ul>
+                    {source_items}
+                </ul>
+            </div>
+            """
+        return f"""<!-- NEUE EPISODE: {title} -->
+<article class="podcast-card">
+    <h3>{title}</h3>
+
+    {media}
+
+    <p class="podcast-author">{authors_text}</p>
+
+    <details>
+        <summary>Details & Infos</summary>
+        <div class="details-content">
+            <ul class="podcast-details">
+                <li class="podcast-item"><strong>Titel:</strong> {title}</li>
+                <li class="podcast-item"><strong>Info:</strong> {details}</li>
+            </ul>
+            {sources_block}
+        </div>
+    </details>
+</article>
+"""
+
+    if variant == "simple_add":
+        return f"""
+    <!-- NEUE EPISODE: {title} -->
+    <article class="podcast-card">
+        <h3>{title}</h3>
+        <p class="podcast-description">{details}</p>
+
+        {media}
+
+        <p class="podcast-author">{authors_text}</p>
+
+        <details>
+            <summary>Details & Infos</summary>
+            <div class="details-content">
+                <ul class="podcast-details">
+                    <li class="podcast-item"><strong>Titel:</strong> {title}</li>
+                    <li class="podcast-item"><strong>Info:</strong> {details}</li>
+                </ul>
+                <div class="podcast-extra">
+                    <strong>Quellen:</strong>
+                    <ul class="source-list">{source_items}</ul>
+                </div>
+            </div>
+        </details>
+    </article>
+"""
+
+    if variant == "author_list":
+        author_items = "".join(f"<li>{a}</li>" for a in authors)
+        return f"""
+    <article class="podcast-card">
+        <h3>{title}</h3>
+        <p>{details}</p>
+        {media}
+        <details>
+            <summary>Details & Infos</summary>
+            <div class="details-content">
+                <div class="podcast-extra">
+                    <strong>Autoren:</strong>
+                    <ul class="author-list">{author_items}</ul>
+                </div>
+                <div class="podcast-extra">
+                    <strong>Quellen:</strong>
+                    <ul class="source-list">{source_items}</ul>
+                </div>
+            </div>
+        </details>
+    </article>
+"""
+
+    # autoren_item
+    return f"""
+    <article class="podcast-card">
+        <h3>{title}</h3>
+        <p>Hier klicken zum Anhören</p>
+        {media}
+        <details>
+            <summary>Details & Infos</summary>
+            <ul class="podcast-details">
+                <li class="podcast-item"><strong>Titel:</strong> {title}</li>
+                <li class="podcast-item"><strong>Info:</strong> {details}</li>
+                <li class="podcast-item"><strong>Autoren:</strong> {", ".join(authors)}</li>
+            </ul>
+        </details>
+    </article>
+"""
+
+def generate_cards(count, seed=1234, variants=None):
+    """
+    Yields (variant, html) for count cards. Same seed, same output.
+    """
+    rng = random.Random(seed)
+    names = [v for v, _ in VARIANTS] if variants is None else list(variants)
+    weights = [dict(VARIANTS)[v] for v in names]
+    for i in range(count):
+        variant = rng.choices(names, weights)[0]
+        yield variant, render_card(rng, i, variant)
+
+def generate_page(count, seed=1234, variants=None):
+    """
+    Returns a complete section page with count episodes.
+    """
+    return PAGE_HEAD + "\n".join(html for _, html in generate_cards(count, seed, variants)) + PAGE_TAIL
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic podcast section page.")
+    parser.add_argument("count", type=int, help="Number of episodes")
+    parser.add_argument("output", help="Path of the HTML file to write")
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        f.write(generate_page(args.count, args.seed))
+    print(f"Wrote {args.count} episodes to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# Local stand-in for the audio hosts (archive.org downloads), to try
+# podcast_mirror.py and its resuming of interrupted downloads offline.
+#
+#   python -m benchmarks.http_standin --port 9001 --dir /tmp/audio
+#   (link an episode to http://127.0.0.1:9001/jazz.mp3, then)
+#   python podcast_cli.py mirror
+#
+#   --drop-after-bytes 65536  cuts every answer off after 64 KiB, so each
+#                             attempt has to resume where the last one stopped
+#   --drops 2                 only the first 2 answers are cut off
+#   --fail-rate 0.3           answers 30% of requests with 503
+#   --no-ranges               ignores Range, like servers without resume support
+#
+# Files are served from --dir with an ETag (size and mtime) and Last-Modified.
+# GET honours a single "Range: bytes=N-" or "bytes=N-M" (206, or 416 when N
+# is past the end) and If-Range (the whole file with 200 once it changed,
+# e.g. after replacing it in --dir between two runs).
+import os
+import sys
+import random
+import argparse
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, unquote
+
+CHUNK_SIZE = 64 * 1024
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    options = None
+    lock = threading.Lock()
+    drops = 0
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def file_path(self):
+        rel = unquote(urlsplit(self.path).path).lstrip("/")
+        path = os.path.normpath(os.path.join(self.options.dir, rel))
+        if not path.startswith(self.options.dir + os.sep) or not os.path.isfile(path):
+            return None
+        return path
+
+    def requested_range(self, size, etag, last_modified):
+        """
+        (start, end) of a satisfiable Range, "unsatisfiable", or None for the whole file.
+        """
+        value = self.headers.get('Range')
+        if not value or self.options.no_ranges or not value.startswith("bytes=") or "," in value:
+            return None
+        condition = self.headers.get('If-Range')
+        if condition and condition != etag:
+            try:
+                if parsedate_to_datetime(condition) < parsedate_to_datetime(last_modified):
+                    return None
+            except (TypeError, ValueError):
+                return None  # an ETag that no longer matches: the file changed
+        first, _, last = value[len("bytes="):].partition("-")
+        if not first.isdigit() or (last and not last.isdigit()):
+            return None
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+        if start >= size:
+            return "unsatisfiable"
+        return (start, end) if start <= end else None
+
+    def cut_off(self):
+        """
+        True if this answer is to be dropped after --drop-after-bytes.
+        """
+        if not self.options.drop_after_bytes:
+            return False
+        with self.lock:
+            if self.options.drops and Handler.drops >= self.options.drops:
+                return False
+            Handler.drops += 1
+            return True
+
+    def do_GET(self):
+        if random.random() < self.options.fail_rate:
+            return self.reply(503, b"Injected failure", {'Retry-After': "1"})
+        path = self.file_path()
+        if not path:
+            return self.reply(404, b"Not found")
+        stat = os.stat(path)
+        size = stat.st_size
+        etag = f'"{size:x}-{stat.st_mtime_ns:x}"'
+        last_modified = formatdate(stat.st_mtime, usegmt=True)
+        headers = {'ETag': etag, 'Last-Modified': last_modified, 'Accept-Ranges': "none" if self.options.no_ranges else "bytes",
+                   'Content-Type': "application/octet-stream"}
+
+        span = self.requested_range(size, etag, last_modified) if self.command == "GET" else None
+        if span == "unsatisfiable":
+            return self.reply(416, headers={'Content-Range': f"bytes */{size}"})
+        if span:
+            status, (start, end) = 206, span
+            headers['Content-Range'] = f"bytes {start}-{end}/{size}"
+        else:
+            status, start, end = 200, 0, size - 1
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        if self.command == "HEAD":
+            return
+
+        remaining = end - start + 1
+        if self.cut_off():
+            remaining = min(remaining, self.options.drop_after_bytes)
+            self.close_connection = True
+        with open(path, 'rb') as f:
+            f.seek(start)
+            while remaining > 0:
+                block = f.read(min(CHUNK_SIZE, remaining))
+                if not block:
+                    break
+                self.wfile.write(block)
+                remaining -= len(block)
+
+    do_HEAD = do_GET
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local audio host stand-in for podcast_mirror.py.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--dir", required=True, help="Folder with the files to serve")
+    parser.add_argument("--drop-after-bytes", type=int, default=0)
+    parser.add_argument("--drops", type=int, default=0, help="How many answers to cut off (default: all)")
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--no-ranges", action="store_true")
+    args = parser.parse_args()
+
+    args.dir = os.path.abspath(args.dir)
+    Handler.options = args
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    host, port = server.server_address[:2]
+    print(f"Audio host stand-in on http://{host}:{port} (Ctrl+C to stop)", file=sys.stderr, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
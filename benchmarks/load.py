@@ -0,0 +1,165 @@
+# Load generator for podcast_server.py.
+#
+#   python -m benchmarks.load                          # 32 clients, 10 s, 20% writes on a generated section
+#   python -m benchmarks.load --clients 100 --writes 0.5
+#   python -m benchmarks.load --url http://127.0.0.1:8765 --section m2a --writes 0   # existing server, reads only
+#
+# Without --url a server is started on a temporary site, so no real page is changed.
+import os
+import re
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from urllib.parse import urlsplit
+
+from benchmarks.generate import generate_page
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER = os.path.join(REPO_DIR, "podcast_server.py")
+
+
+def make_site(size, seed):
+    root = tempfile.mkdtemp(prefix="podcast-load-")
+    section_dir = os.path.join(root, "podcasts", "bench")
+    os.makedirs(section_dir)
+    with open(os.path.join(section_dir, "index.html"), 'w', encoding='utf-8') as f:
+        f.write(generate_page(size, seed))
+    return root
+
+def start_server(root, window):
+    """
+    Starts podcast_server.py on a free port; returns (process, base URL).
+    """
+    proc = subprocess.Popen([sys.executable, SERVER, "--root", root, "--port", "0", "--window", str(window)],
+                            stderr=subprocess.PIPE, text=True)
+    line = proc.stderr.readline()
+    m = re.search(r'http://[^ ]+', line)
+    if not m:
+        proc.kill()
+        raise RuntimeError(f"Server did not start: {line}{proc.stderr.read()}")
+    return proc, m.group(0)
+
+
+# --- CLIENT ---
+
+class Connection:
+    """
+    One keep-alive HTTP/1.1 connection.
+    """
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        data = json.dumps(body).encode('utf-8') if body is not None else b""
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                          f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode('latin-1') + data)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode('latin-1').partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        payload = json.loads(await self.reader.readexactly(length)) if length else None
+        return status, payload
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+
+async def client(url, section, deadline, writes, rng, latencies, errors):
+    parts = urlsplit(url)
+    conn = Connection(parts.hostname, parts.port)
+    try:
+        _, episodes = await conn.request("GET", f"/sections/{section}")
+        count = len(episodes)
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            if rng.random() >= writes:
+                status, _ = await conn.request("GET", f"/sections/{section}/{rng.randrange(count)}")
+            elif rng.random() < 0.5:
+                status, _ = await conn.request("PATCH", f"/sections/{section}/{rng.randrange(count)}",
+                                               {'details': f"Geändert {rng.random():.6f}"})
+            else:
+                status, _ = await conn.request("POST", f"/sections/{section}",
+                                               {'title': f"Last {rng.random():.6f}", 'link': "https://archive.org/x.mp3",
+                                                'authors': ["Lastgenerator"]})
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                errors.append(status)
+    finally:
+        conn.close()
+
+async def run_load(url, section, clients, seconds, writes, seed):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    await asyncio.gather(*(client(url, section, deadline, writes, random.Random(seed + i), latencies, errors)
+                           for i in range(clients)))
+    elapsed = time.perf_counter() - start
+    stats = None
+    parts = urlsplit(url)
+    conn = Connection(parts.hostname, parts.port)
+    try:
+        _, stats = await conn.request("GET", "/stats")
+    finally:
+        conn.close()
+    return latencies, errors, elapsed, stats
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))] if ordered else 0.0
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test podcast_server.py.")
+    parser.add_argument("--url", help="Existing server (default: start one on a temporary site)")
+    parser.add_argument("--section", default="bench")
+    parser.add_argument("--size", type=int, default=200, help="Episodes on the generated page (default: 200)")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--writes", type=float, default=0.2, help="Share of write requests (default: 0.2)")
+    parser.add_argument("--window", type=float, default=5, help="Commit window of the started server in ms")
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    proc = root = None
+    url = args.url
+    if not url:
+        root = make_site(args.size, args.seed)
+        proc, url = start_server(root, args.window)
+    try:
+        latencies, errors, elapsed, stats = asyncio.run(
+            run_load(url, args.section, args.clients, args.seconds, args.writes, args.seed))
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+        if root:
+            shutil.rmtree(root, ignore_errors=True)
+
+    print(f"{len(latencies)} requests in {elapsed:.1f}s with {args.clients} clients ({args.writes:.0%} writes)")
+    print(f"  throughput: {len(latencies) / elapsed:.0f} requests/s")
+    print(f"  latency:    p50 {percentile(latencies, 0.5) * 1000:.1f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms, max {max(latencies, default=0) * 1000:.1f} ms")
+    print(f"  errors:     {len(errors)}" + (f" (statuses {sorted(set(errors))})" if errors else ""))
+    if stats and stats.get('commits'):
+        print(f"  commits:    {stats['commits']} for {stats['write_requests']} writes "
+              f"({stats['write_requests'] / stats['commits']:.1f} writes per file write), "
+              f"{stats['fallbacks']} fallbacks")
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
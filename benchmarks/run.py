@@ -0,0 +1,184 @@
+# Benchmarks for the podcast parse/render/write paths.
+#
+#   python -m benchmarks.run                      # run and print timings
+#   python -m benchmarks.run --save-baseline      # store results as the new baseline
+#   python -m benchmarks.run --compare            # fail if slower than the baseline
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+
+from benchmarks.generate import generate_page, random_episode
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+FULL_SIZES = DEFAULT_SIZES + [100000]
+
+# Timings below this are too noisy to judge regressions on
+NOISE_FLOOR = 0.0005
+
+
+def measure(func, repeat, setup=None):
+    """
+    Runs func `repeat` times and returns the fastest and median wall time.
+    setup() runs before every call and is not timed; its result is passed to func.
+    """
+    times = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        func(arg)
+        times.append(time.perf_counter() - start)
+    return {'min': min(times), 'median': statistics.median(times)}
+
+def repeats_for(size):
+    return max(1, min(20, 20000 // max(size, 1)))
+
+def bench_size(size, seed, workdir):
+    """
+    Runs every benchmark against a page with `size` episodes.
+    """
+    import manage_podcast
+    import add_podcast
+    import podcast_core
+
+    content = generate_page(size, seed)
+    repeat = repeats_for(size)
+    page_path = os.path.join(workdir, f"page-{size}.html")
+    master_path = page_path + ".orig"
+    with open(master_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+    def fresh_copy(_=None):
+        shutil.copyfile(master_path, page_path)
+        return page_path
+
+    parsed = podcast_core.scan_cards(content)
+    blocks = [p['full_block'] for p in parsed]
+    episodes = [random_episode(random.Random(seed + i), i) for i in range(min(size, 1000))]
+    new_ep = random_episode(random.Random(seed), size)
+    new_block = podcast_core.generate_html_block(new_ep['title'], new_ep['details'], new_ep['link'],
+                                                 new_ep['authors'], new_ep['sources'])
+    middle = len(parsed) // 2
+
+    def edit(path):
+        current = manage_podcast.get_file_content(path)
+        target = podcast_core.scan_cards(current)[middle]
+        manage_podcast.update_file_safely(current, target['span'], new_block, path)
+
+    def delete(path):
+        current = manage_podcast.get_file_content(path)
+        target = podcast_core.scan_cards(current)[middle]
+        manage_podcast.update_file_safely(current, target['span'], "", path)
+
+    benches = {
+        'parse.scan_cards': (lambda _: podcast_core.scan_cards(content), None),
+        'parse.extract_podcasts': (lambda _: podcast_core.extract_podcasts(content), None),
+        'parse.authors': (lambda _: [manage_podcast.parse_authors_from_block(b) for b in blocks], None),
+        'parse.sources': (lambda _: [manage_podcast.parse_sources_from_block(b) for b in blocks], None),
+        'render.generate_html_block': (lambda _: [podcast_core.generate_html_block(
+            e['title'], e['details'], e['link'], e['authors'], e['sources']) for e in episodes], None),
+        'render.format_podcast_entry': (lambda _: [add_podcast.format_podcast_entry(
+            e['title'], e['details'], e['link'], e['authors'], e['sources']) for e in episodes], None),
+        'write.add_podcast_to_file': (lambda path: add_podcast.add_podcast_to_file(path, new_block), fresh_copy),
+        'write.edit': (edit, fresh_copy),
+        'write.delete': (delete, fresh_copy),
+    }
+
+    results = {}
+    for name, (func, setup) in benches.items():
+        results[f"{name}[{size}]"] = measure(func, repeat, setup)
+    return results
+
+def run(sizes, seed):
+    workdir = tempfile.mkdtemp(prefix="podcast-bench-")
+    try:
+        results = {}
+        for size in sizes:
+            start = time.perf_counter()
+            results.update(bench_size(size, seed, workdir))
+            print(f"  size {size:>6}: done in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+        return results
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def compare(results, baseline, threshold):
+    """
+    Returns a list of (name, old, new, ratio) for benchmarks slower than the
+    baseline by more than threshold (0.25 = 25%).
+    """
+    regressions = []
+    for name, new in results.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+        old_t, new_t = old['min'], new['min']
+        if new_t < NOISE_FLOOR and old_t < NOISE_FLOOR:
+            continue
+        ratio = new_t / old_t if old_t else float('inf')
+        if ratio > 1 + threshold:
+            regressions.append((name, old_t, new_t, ratio))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark podcast parsing, rendering and file writes.")
+    parser.add_argument("--sizes", type=int, nargs="+", help=f"Episode counts (default: {DEFAULT_SIZES})")
+    parser.add_argument("--full", action="store_true", help="Include the 100k episode page")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--compare", action="store_true", help="Exit with 1 if a benchmark regressed")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown (default: 0.25 = 25%%)")
+    args = parser.parse_args()
+
+    sizes = args.sizes or (FULL_SIZES if args.full else DEFAULT_SIZES)
+    results = run(sizes, args.seed)
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'sizes': sizes,
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        'results': results,
+    }
+
+    for name, r in results.items():
+        print(f"{name:<45} min {r['min'] * 1000:10.3f} ms   median {r['median'] * 1000:10.3f} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"No baseline at {args.baseline}. Run with --save-baseline first.")
+            return 1
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}:")
+            for name, old_t, new_t, ratio in regressions:
+                print(f"  {name}: {old_t * 1000:.3f} ms -> {new_t * 1000:.3f} ms ({ratio:.2f}x)")
+            return 1
+        print("\nNo regressions against the baseline.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
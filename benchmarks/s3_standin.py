@@ -0,0 +1,234 @@
+# Local stand-in for an S3-compatible endpoint (archive.org IAS3), to try
+# podcast_upload.py without touching archive.org.
+#
+#   python -m benchmarks.s3_standin --port 9000 --dir /tmp/s3
+#   PODCAST_S3_ENDPOINT=http://127.0.0.1:9000 PODCAST_S3_BUCKET=test \
+#   PODCAST_S3_PUBLIC_URL=http://127.0.0.1:9000/{bucket}/{key} python podcast_cli.py upload jazz.mp3
+#
+#   --fail-rate 0.3   answers 30% of part uploads with 500, to exercise retries
+#   --drop-after 5    exits after 5 stored parts, to exercise resuming
+#   --auth KEY:SECRET requires "Authorization: LOW KEY:SECRET"
+#
+# Only what podcast_upload.py uses: multipart initiate / upload part / list
+# parts / complete / abort, and GET/HEAD of finished objects. Content-MD5
+# is checked like S3 does (400 BadDigest).
+import os
+import sys
+import json
+import uuid
+import base64
+import random
+import hashlib
+import argparse
+import threading
+import xml.etree.ElementTree as ET
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs, unquote
+
+NS = "http://s3.amazonaws.com/doc/2006-03-01/"
+
+
+class Store:
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.parts_stored = 0
+
+    def object_path(self, bucket, key):
+        return os.path.join(self.directory, "objects", bucket, key.replace("/", os.sep))
+
+    def upload_dir(self, upload_id):
+        if not upload_id.isalnum():
+            return None
+        return os.path.join(self.directory, "uploads", upload_id)
+
+    def initiate(self, bucket, key):
+        upload_id = uuid.uuid4().hex
+        folder = self.upload_dir(upload_id)
+        os.makedirs(folder)
+        with open(os.path.join(folder, "target.json"), 'w', encoding='utf-8') as f:
+            json.dump({'bucket': bucket, 'key': key}, f)
+        return upload_id
+
+    def parts(self, upload_id):
+        folder = self.upload_dir(upload_id)
+        return sorted(int(name[:-5]) for name in os.listdir(folder) if name.endswith(".part"))
+
+
+def local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+def xml(tag, body):
+    return f'<?xml version="1.0" encoding="UTF-8"?>\n<{tag} xmlns="{NS}">{body}</{tag}>'.encode('utf-8')
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    store = None
+    options = None
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def error(self, status, code, message):
+        self.reply(status, xml("Error", f"<Code>{code}</Code><Message>{message}</Message>"))
+
+    def target(self):
+        url = urlsplit(self.path)
+        bucket, _, key = url.path.lstrip("/").partition("/")
+        return unquote(bucket), unquote(key), {k: v[0] for k, v in parse_qs(url.query, keep_blank_values=True).items()}
+
+    def body(self):
+        return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+    def authorized(self):
+        if not self.options.auth:
+            return True
+        if self.headers.get('Authorization') == f"LOW {self.options.auth}":
+            return True
+        self.body()
+        self.error(403, "AccessDenied", "Wrong or missing LOW authorization")
+        return False
+
+    def upload_folder(self, query):
+        folder = self.store.upload_dir(query.get('uploadId', ""))
+        if not folder or not os.path.isdir(folder):
+            self.error(404, "NoSuchUpload", "Unknown upload id")
+            return None
+        return folder
+
+    def do_POST(self):
+        if not self.authorized():
+            return
+        bucket, key, query = self.target()
+        data = self.body()
+        if 'uploads' in query:
+            upload_id = self.store.initiate(bucket, key)
+            return self.reply(200, xml("InitiateMultipartUploadResult",
+                                       f"<Bucket>{bucket}</Bucket><Key>{key}</Key><UploadId>{upload_id}</UploadId>"))
+        folder = self.upload_folder(query)
+        if not folder:
+            return
+        wanted = [int(next(c.text for c in part if local_name(c.tag) == "PartNumber"))
+                  for part in ET.fromstring(data).iter() if local_name(part.tag) == "Part"]
+        if wanted != sorted(wanted) or any(not os.path.exists(os.path.join(folder, f"{n}.part")) for n in wanted):
+            return self.error(400, "InvalidPart", "Missing or unordered part")
+        out = self.store.object_path(bucket, key)
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+        md5s = b""
+        with open(out + ".tmp", 'wb') as f:
+            for n in wanted:
+                with open(os.path.join(folder, f"{n}.part"), 'rb') as part:
+                    content = part.read()
+                md5s += hashlib.md5(content).digest()
+                f.write(content)
+        os.replace(out + ".tmp", out)
+        for name in os.listdir(folder):
+            os.remove(os.path.join(folder, name))
+        os.rmdir(folder)
+        etag = f"{hashlib.md5(md5s).hexdigest()}-{len(wanted)}"
+        self.reply(200, xml("CompleteMultipartUploadResult",
+                            f"<Bucket>{bucket}</Bucket><Key>{key}</Key><ETag>\"{etag}\"</ETag>"))
+
+    def do_PUT(self):
+        if not self.authorized():
+            return
+        bucket, key, query = self.target()
+        data = self.body()
+        if 'partNumber' not in query:
+            return self.error(501, "NotImplemented", "Only multipart uploads")
+        folder = self.upload_folder(query)
+        if not folder:
+            return
+        if random.random() < self.options.fail_rate:
+            return self.error(500, "InternalError", "Injected failure")
+        digest = hashlib.md5(data)
+        sent = self.headers.get('Content-MD5')
+        if sent and base64.b64decode(sent) != digest.digest():
+            return self.error(400, "BadDigest", "Content-MD5 does not match the body")
+        path = os.path.join(folder, f"{int(query['partNumber'])}.part")
+        with open(path + ".tmp", 'wb') as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+        self.reply(200, headers={'ETag': f'"{digest.hexdigest()}"'})
+        with self.store.lock:
+            self.store.parts_stored += 1
+            if self.options.drop_after and self.store.parts_stored >= self.options.drop_after:
+                print(f"Dropping out after {self.store.parts_stored} parts", file=sys.stderr)
+                self.wfile.flush()
+                os._exit(3)
+
+    def do_GET(self):
+        if not self.authorized():
+            return
+        bucket, key, query = self.target()
+        if 'uploadId' in query:
+            folder = self.upload_folder(query)
+            if not folder:
+                return
+            marker = int(query.get('part-number-marker') or 0)
+            numbers = [n for n in self.store.parts(query['uploadId']) if n > marker]
+            page, rest = numbers[:1000], numbers[1000:]
+            parts = ""
+            for n in page:
+                with open(os.path.join(folder, f"{n}.part"), 'rb') as f:
+                    parts += f"<Part><PartNumber>{n}</PartNumber><ETag>\"{hashlib.md5(f.read()).hexdigest()}\"</ETag></Part>"
+            truncated = f"<IsTruncated>{'true' if rest else 'false'}</IsTruncated>"
+            if rest:
+                truncated += f"<NextPartNumberMarker>{page[-1]}</NextPartNumberMarker>"
+            return self.reply(200, xml("ListPartsResult", f"<UploadId>{query['uploadId']}</UploadId>{truncated}{parts}"))
+        path = self.store.object_path(bucket, key)
+        if not os.path.isfile(path):
+            return self.error(404, "NoSuchKey", "No such object")
+        with open(path, 'rb') as f:
+            data = f.read()
+        self.reply(200, data, {'Content-Type': "application/octet-stream"})
+
+    do_HEAD = do_GET
+
+    def do_DELETE(self):
+        if not self.authorized():
+            return
+        _, _, query = self.target()
+        folder = self.upload_folder(query)
+        if not folder:
+            return
+        for name in os.listdir(folder):
+            os.remove(os.path.join(folder, name))
+        os.rmdir(folder)
+        self.reply(204)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local S3-compatible stand-in for podcast_upload.py.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--dir", required=True, help="Where objects and unfinished uploads are kept")
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--drop-after", type=int, default=0)
+    parser.add_argument("--auth", help="KEY:SECRET the client must send")
+    args = parser.parse_args()
+
+    Handler.store = Store(args.dir)
+    Handler.options = args
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    host, port = server.server_address[:2]
+    print(f"S3 stand-in on http://{host}:{port} (Ctrl+C to stop)", file=sys.stderr, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
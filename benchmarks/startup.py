@@ -0,0 +1,93 @@
+# Cold start benchmark for the command line tools.
+#
+#   python -m benchmarks.startup                 # time `podcast_cli.py list` on a generated page
+#   python -m benchmarks.startup --imports 15    # also show the slowest imports (python -X importtime)
+#   python -m benchmarks.startup --budget 0.1    # exit with 1 if the median is slower than 100 ms
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+from benchmarks.generate import generate_page
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI = os.path.join(REPO_DIR, "podcast_cli.py")
+
+# Modules the headless tools must never load
+GUI_MODULES = ("tkinter", "_tkinter", "webbrowser")
+
+
+def make_site(size, seed):
+    root = tempfile.mkdtemp(prefix="podcast-startup-")
+    section_dir = os.path.join(root, "podcasts", "bench")
+    os.makedirs(section_dir)
+    with open(os.path.join(section_dir, "index.html"), 'w', encoding='utf-8') as f:
+        f.write(generate_page(size, seed))
+    return root
+
+def run_once(command, importtime=False):
+    """
+    Runs the command in a fresh interpreter; returns (wall seconds, importtime stderr).
+    """
+    argv = [sys.executable] + (["-X", "importtime"] if importtime else []) + command
+    start = time.perf_counter()
+    proc = subprocess.run(argv, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    return time.perf_counter() - start, proc.stderr
+
+def parse_importtime(stderr):
+    """
+    Returns {module: (self us, cumulative us)} from `python -X importtime` output.
+    """
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        imports[name.strip()] = (int(self_us), int(cumulative))
+    return imports
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the cold start of podcast_cli.py list.")
+    parser.add_argument("--size", type=int, default=100, help="Episodes on the generated page (default: 100)")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--imports", type=int, default=10, help="Number of slowest imports to show")
+    parser.add_argument("--budget", type=float, default=0.1, help="Allowed median in seconds (default: 0.1)")
+    args = parser.parse_args()
+
+    root = make_site(args.size, args.seed)
+    command = [CLI, "--root", root, "list", "bench"]
+    try:
+        run_once(command)  # warm the OS file cache, not the interpreter
+        times = [run_once(command)[0] for _ in range(args.runs)]
+        _, stderr = run_once(command, importtime=True)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    baseline = [run_once(["-c", "pass"])[0] for _ in range(args.runs)]
+    median = statistics.median(times)
+    print(f"podcast_cli.py list ({args.size} episodes): min {min(times) * 1000:.1f} ms   median {median * 1000:.1f} ms")
+    print(f"bare interpreter:                 median {statistics.median(baseline) * 1000:.1f} ms")
+
+    imports = parse_importtime(stderr)
+    slowest = sorted(imports.items(), key=lambda kv: -kv[1][0])[:args.imports]
+    print(f"\n{'module':<36}{'self ms':>10}{'cumul. ms':>12}")
+    for name, (self_us, cumulative) in slowest:
+        print(f"{name:<36}{self_us / 1000:>10.2f}{cumulative / 1000:>12.2f}")
+
+    status = 0
+    gui = [name for name in GUI_MODULES if name in imports]
+    if gui:
+        print(f"\nGUI modules loaded by the CLI: {', '.join(gui)}")
+        status = 1
+    if median > args.budget:
+        print(f"\nMedian {median * 1000:.1f} ms is over the budget of {args.budget * 1000:.0f} ms")
+        status = 1
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
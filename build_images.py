@@ -0,0 +1,196 @@
+import os
+import re
+import io
+import hashlib
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE = os.path.join(SCRIPT_DIR, ".image-cache")
+
+# Content images that get responsive variants (screenshots on the grades page)
+RESPONSIVE_DIRS = ("grades/images/",)
+RESPONSIVE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+RESPONSIVE_WIDTHS = (480, 960, 1440)
+RESPONSIVE_SIZES = "(max-width: 1200px) 100vw, 1200px"
+
+# Modern formats in order of preference (best first), with encoder settings
+VARIANT_FORMATS = (
+    ("avif", "image/avif", {"quality": 55}),
+    ("webp", "image/webp", {"quality": 80, "method": 6}),
+)
+
+IMG_PATTERN = re.compile(r'<img\b[^>]*?\ssrc="([^"]+)"[^>]*>', re.IGNORECASE)
+
+
+def pillow_formats():
+    """
+    Returns the variant formats the installed Pillow can write.
+    """
+    if Image is None:
+        return []
+    Image.init()
+    return [fmt for fmt in VARIANT_FORMATS if fmt[0].upper() in Image.SAVE]
+
+def source_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def is_responsive_source(rel_path):
+    return rel_path.startswith(RESPONSIVE_DIRS) and rel_path.lower().endswith(RESPONSIVE_EXTENSIONS)
+
+def _encode(img, fmt, options):
+    buf = io.BytesIO()
+    img.save(buf, format=fmt.upper(), **options)
+    return buf.getvalue()
+
+def _cached(cache_dir, name, produce):
+    """
+    Returns the cache path for name, calling produce() to fill it on a miss.
+    """
+    path = os.path.join(cache_dir, name)
+    if not os.path.exists(path):
+        data = produce()
+        tmp = path + ".tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return path, True
+    return path, False
+
+def optimize_png(path, digest, cache_dir):
+    """
+    Losslessly re-encodes a PNG. Returns the cached path, or None if it did not shrink.
+    """
+    marker = os.path.join(cache_dir, f"{digest[:24]}.keep")
+    if os.path.exists(marker):
+        return None, False
+
+    def produce():
+        with Image.open(path) as img:
+            img.load()
+            return _encode(img, "png", {"optimize": True})
+
+    out, made = _cached(cache_dir, f"{digest[:24]}.opt.png", produce)
+    if os.path.getsize(out) >= os.path.getsize(path):
+        # Remember that the original is already as small as we can make it
+        os.remove(out)
+        open(marker, 'wb').close()
+        return None, made
+    return out, made
+
+def responsive_variants(path, rel_path, digest, cache_dir, formats):
+    """
+    Creates resized modern-format variants of one image.
+    Returns (info, generated_count) where info lists the variants per MIME type.
+    """
+    with Image.open(path) as img:
+        width, height = img.size
+        widths = sorted({w for w in RESPONSIVE_WIDTHS if w < width} | {width})
+        base = os.path.splitext(rel_path)[0]
+        info = {'width': width, 'height': height, 'types': {}}
+        generated = 0
+
+        for ext, mime, options in formats:
+            entries = []
+            for w in widths:
+                def produce(w=w, ext=ext, options=options):
+                    frame = img.convert("RGBA") if img.mode not in ("RGB", "RGBA") else img
+                    if w != width:
+                        frame = frame.resize((w, round(height * w / width)), Image.LANCZOS)
+                    return _encode(frame, ext, options)
+
+                cache_path, made = _cached(cache_dir, f"{digest[:24]}-{w}w.{ext}", produce)
+                generated += made
+                entries.append({'path': f"{base}-{w}w.{ext}", 'file': cache_path, 'width': w})
+            info['types'][mime] = entries
+    return info, generated
+
+def prune_cache(cache_dir, used):
+    for name in os.listdir(cache_dir):
+        full = os.path.join(cache_dir, name)
+        if full not in used and not name.endswith(".keep"):
+            os.remove(full)
+
+def optimize_images(root, files, cache_dir=DEFAULT_CACHE):
+    """
+    Runs the image stage over the site's files.
+
+    Returns a dict with:
+      'overrides'  - rel path -> optimized file to publish instead of the original
+      'extra'      - rel path -> generated variant file to publish in addition
+      'responsive' - rel path -> variant info used by add_picture_markup
+      'generated'  - number of cache misses (images actually encoded)
+    """
+    result = {'overrides': {}, 'extra': {}, 'responsive': {}, 'generated': 0}
+    if Image is None:
+        return result
+
+    os.makedirs(cache_dir, exist_ok=True)
+    formats = pillow_formats()
+    used = set()
+
+    for rel_path in files:
+        if not rel_path.lower().endswith(RESPONSIVE_EXTENSIONS):
+            continue
+        path = os.path.join(root, rel_path)
+        digest = source_hash(path)
+
+        if rel_path.lower().endswith(".png"):
+            optimized, made = optimize_png(path, digest, cache_dir)
+            result['generated'] += made
+            if optimized:
+                result['overrides'][rel_path] = optimized
+                used.add(optimized)
+
+        if formats and is_responsive_source(rel_path):
+            info, made = responsive_variants(path, rel_path, digest, cache_dir, formats)
+            result['generated'] += made
+            result['responsive'][rel_path] = info
+            for entries in info['types'].values():
+                for entry in entries:
+                    result['extra'][entry['path']] = entry['file']
+                    used.add(entry['file'])
+
+    prune_cache(cache_dir, used)
+    return result
+
+def add_picture_markup(html, rel_path, responsive):
+    """
+    Wraps <img> tags that point at images with variants in a <picture> element
+    with one <source srcset> per modern format. The original stays as fallback.
+    """
+    if not responsive:
+        return html
+    page_dir = os.path.dirname(rel_path)
+
+    def relative(target):
+        return os.path.relpath(target, page_dir or ".").replace(os.sep, "/")
+
+    def wrap(m):
+        src = m.group(1)
+        target = os.path.normpath(os.path.join(page_dir, src)).replace(os.sep, "/")
+        info = responsive.get(target)
+        if info is None:
+            return m.group(0)
+        # Already inside a <picture>
+        if html.rfind("<picture", 0, m.start()) > html.rfind("</picture>", 0, m.start()):
+            return m.group(0)
+
+        img = m.group(0)
+        if " width=" not in img and " height=" not in img:
+            img = img[:4] + f' width="{info["width"]}" height="{info["height"]}"' + img[4:]
+
+        sources = []
+        for mime, entries in info['types'].items():
+            srcset = ", ".join(f"{relative(e['path'])} {e['width']}w" for e in entries)
+            sources.append(f'<source type="{mime}" srcset="{srcset}" sizes="{RESPONSIVE_SIZES}">')
+        return "<picture>" + "".join(sources) + img + "</picture>"
+
+    return IMG_PATTERN.sub(wrap, html)
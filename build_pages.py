@@ -0,0 +1,340 @@
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from podcast_timing import span, run_main
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_DIR = "templates"
+PAGES_DIR = "pages"        # templates/pages/<path> is rendered to <path> in the site
+STATE_DIR = ".pages-cache"
+STATE_VERSION = 1
+DEFAULT_WORKERS = 8
+MAX_DEPTH = 16             # include nesting; deeper means a cycle
+
+# The hand-written pages (index.html, podcasts/index.html, grades/*.html)
+# are generated from templates/, so the head, favicon block, navbar and
+# footer they share live in one partial each:
+#
+#   templates/pages/grades/about.html    the page; rendered to grades/about.html
+#   templates/partials/grades/footer.html
+#
+#   python build_pages.py            render the pages whose templates changed
+#   python build_pages.py --graph    which pages include which partial
+#   python build_pages.py --watch    re-render on every save
+#
+# Template syntax, kept to what these pages need:
+#
+#   {% include "partials/favicons.html" dir="../favicon/" theme="#ffffff" %}
+#       on a line of its own; replaced by the partial, whose {{ dir }} and
+#       {{ theme }} take the given values (and the values of the including
+#       template, so nested partials see them too). Paths are relative to
+#       templates/; values cannot contain '"' (write &quot;).
+#   {{ name }}     a value passed to the include; an unknown name is an error
+#   {# note #}     removed from the output
+#
+# .pages-cache/state.json records, per page, the SHA-256 of every template
+# it read while rendering (the dependency graph) and of the page it wrote.
+# A build hashes only templates whose size or mtime changed and renders
+# only the pages depending on one that did, in parallel. Pages are written
+# only when their content changes. A generated page edited by hand (its hash
+# no longer matches) is left alone and reported; edit its template instead,
+# or pass --force.
+
+INCLUDE = re.compile(r'^[ \t]*\{%\s*include\s+"([^"]+)"((?:\s+\w+="[^"]*")*)\s*%\}[ \t]*(?:\r?\n|\Z)', re.MULTILINE)
+ARGUMENT = re.compile(r'(\w+)="([^"]*)"')
+VARIABLE = re.compile(r'\{\{\s*(\w+)\s*\}\}')
+COMMENT = re.compile(r'\{#.*?#\}', re.DOTALL)
+
+
+# --- STATE ---
+
+def state_path(root=None):
+    return os.path.join(root or SCRIPT_DIR, STATE_DIR, "state.json")
+
+def load_state(root=None):
+    try:
+        with open(state_path(root), 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('version') == STATE_VERSION:
+            return state
+    except (OSError, ValueError):
+        pass
+    return {'version': STATE_VERSION, 'templates': {}, 'pages': {}}
+
+def save_state(state, root=None):
+    path = state_path(root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(state, separators=(",", ":"), sort_keys=True))
+    os.replace(tmp, path)
+
+
+# --- TEMPLATES ---
+
+def scan_templates(root, known):
+    """
+    {template path (relative to templates/, forward slashes): [size, mtime_ns, sha256]}.
+    Only files whose size or mtime changed are read and hashed.
+    """
+    base = os.path.join(root, TEMPLATE_DIR)
+    templates = {}
+    folders = [(base, "")]
+    while folders:
+        folder, prefix = folders.pop()
+        try:
+            entries = list(os.scandir(folder))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            rel = prefix + entry.name
+            if entry.is_dir():
+                folders.append((entry.path, rel + "/"))
+                continue
+            stat = entry.stat()
+            old = known.get(rel)
+            if old and old[:2] == [stat.st_size, stat.st_mtime_ns]:
+                templates[rel] = old
+            else:
+                with open(entry.path, 'rb') as f:
+                    templates[rel] = [stat.st_size, stat.st_mtime_ns, hashlib.sha256(f.read()).hexdigest()]
+    return templates
+
+
+class Loader:
+    """
+    Reads each template once per build; shared by the render threads.
+    """
+
+    def __init__(self, root):
+        self.base = os.path.join(root, TEMPLATE_DIR)
+        self.texts = {}
+        self.lock = threading.Lock()
+
+    def load(self, rel):
+        with self.lock:
+            if rel not in self.texts:
+                path = os.path.normpath(os.path.join(self.base, rel))
+                if not path.startswith(self.base + os.sep):
+                    raise ValueError(f"Template outside {TEMPLATE_DIR}/: {rel}")
+                try:
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                except FileNotFoundError:
+                    raise ValueError(f"Template not found: {TEMPLATE_DIR}/{rel}")
+                self.texts[rel] = (data.decode('utf-8'), hashlib.sha256(data).hexdigest())
+            return self.texts[rel]
+
+
+def render_template(loader, rel, values, deps, stack=()):
+    """
+    Expands one template; `deps` collects {template: sha256} of everything read.
+    """
+    if rel in stack or len(stack) >= MAX_DEPTH:
+        raise ValueError(f"Include cycle: {' -> '.join(stack + (rel,))}")
+    text, digest = loader.load(rel)
+    deps[rel] = digest
+    text = COMMENT.sub("", text)
+
+    def include(m):
+        child = m.group(1)
+        child_values = {**values, **dict(ARGUMENT.findall(m.group(2)))}
+        out = render_template(loader, child, child_values, deps, stack + (rel,))
+        return out if out.endswith("\n") or not out else out + "\n"
+
+    def variable(m):
+        if m.group(1) not in values:
+            line = text.count("\n", 0, m.start()) + 1
+            raise ValueError(f"{TEMPLATE_DIR}/{rel}:{line}: no value for {{{{ {m.group(1)} }}}}")
+        return values[m.group(1)]
+
+    # Variables first, so a value can never inject an include
+    return INCLUDE.sub(include, VARIABLE.sub(variable, text))
+
+def render_page(loader, page):
+    """
+    (html, {template: sha256}) of one page of templates/pages/.
+    """
+    deps = {}
+    return render_template(loader, f"{PAGES_DIR}/{page}", {}, deps), deps
+
+
+# --- BUILD ---
+
+def _output_signature(path):
+    try:
+        stat = os.stat(path)
+        return [stat.st_size, stat.st_mtime_ns]
+    except OSError:
+        return None
+
+def _hash_file(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def output_state(path, record):
+    """
+    'ok' (still what we wrote), 'missing', or 'edited' (changed since).
+    """
+    signature = _output_signature(path)
+    if signature is None:
+        return 'missing'
+    if not record or 'output' not in record:
+        return 'ok'        # never generated: the template takes over the page
+    if signature == record['output'][:2]:
+        return 'ok'
+    if _hash_file(path) == record['output'][2]:
+        record['output'][:2] = signature     # touched, same content
+        return 'ok'
+    return 'edited'
+
+def build_pages(root=None, force=False, workers=DEFAULT_WORKERS, pages=None, dry_run=False):
+    """
+    Renders the pages whose templates changed (or the given `pages`, paths
+    below templates/pages/) into the site. Returns a stats dict.
+    """
+    start = time.perf_counter()
+    root = os.path.abspath(root or SCRIPT_DIR)
+    state = load_state(root)
+
+    with span("pages.scan"):
+        templates = scan_templates(root, state['templates'])
+        prefix = PAGES_DIR + "/"
+        all_pages = sorted(rel[len(prefix):] for rel in templates if rel.startswith(prefix))
+        records = state['pages']
+        dirty, conflicts = [], []
+        for page in all_pages:
+            record = records.get(page)
+            status = output_state(os.path.join(root, *page.split("/")), record)
+            if status == 'edited' and not force:
+                conflicts.append(page)
+                continue
+            stale = (record is None or status != 'ok'
+                     or any(templates.get(rel, [None] * 3)[2] != digest for rel, digest in record['deps'].items()))
+            if stale or force or (pages and page in pages):
+                dirty.append(page)
+
+    loader = Loader(root)
+    written, unchanged = [], 0
+    if dirty:
+        with span("pages.render"), ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            results = list(pool.map(lambda page: render_page(loader, page), dirty))
+        for page, (html, deps) in zip(dirty, results):
+            path = os.path.join(root, *page.split("/"))
+            data = html.encode('utf-8')
+            digest = hashlib.sha256(data).hexdigest()
+            current = _output_signature(path)
+            if current and current[0] == len(data) and _hash_file(path) == digest:
+                unchanged += 1
+            else:
+                written.append(page)
+                if not dry_run:
+                    _write_atomic(path, data)
+            if not dry_run:
+                records[page] = {'deps': deps, 'output': (_output_signature(path) or [0, 0]) + [digest]}
+
+    # Pages whose template was deleted: their output goes too, unless edited by hand
+    removed = []
+    for page in sorted(set(records) - set(all_pages)):
+        path = os.path.join(root, *page.split("/"))
+        if output_state(path, records[page]) == 'ok' and os.path.exists(path):
+            removed.append(page)
+            if not dry_run:
+                os.remove(path)
+        if not dry_run:
+            del records[page]
+
+    if not dry_run and (dirty or removed or templates != state['templates']):
+        state['templates'] = templates
+        save_state(state, root)
+    return {'pages': len(all_pages), 'rendered': len(dirty), 'written': written, 'unchanged': unchanged,
+            'conflicts': conflicts, 'removed': removed, 'dry_run': dry_run,
+            'seconds': time.perf_counter() - start}
+
+def dependents(root=None):
+    """
+    {template: [pages including it]} from the last build.
+    """
+    graph = {}
+    for page, record in sorted(load_state(root)['pages'].items()):
+        for rel in record['deps']:
+            if rel != f"{PAGES_DIR}/{page}":
+                graph.setdefault(rel, []).append(page)
+    return dict(sorted(graph.items()))
+
+
+def report(stats, verbose=True):
+    verb = "Would write" if stats['dry_run'] else "Wrote"
+    print(f"{verb} {len(stats['written'])} of {stats['pages']} pages "
+          f"({stats['rendered']} rendered, {stats['unchanged']} unchanged) in {stats['seconds'] * 1000:.0f}ms")
+    if verbose:
+        for page in stats['written']:
+            print(f"  + {page}")
+        for page in stats['removed']:
+            print(f"  - {page}")
+    for page in stats['conflicts']:
+        print(f"  ! {page} was edited by hand; edit {TEMPLATE_DIR}/{PAGES_DIR}/{page} instead (or use --force)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Render the pages in templates/pages/ with their shared partials.")
+    parser.add_argument("pages", nargs="*", help="Render these pages even if unchanged (e.g. grades/about.html)")
+    parser.add_argument("--force", action="store_true", help="Render everything, overwriting hand edits")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Render threads (default: 8)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be written")
+    parser.add_argument("--graph", action="store_true", help="List the pages that include each partial")
+    parser.add_argument("--watch", action="store_true", help="Keep running and rebuild on changes")
+    parser.add_argument("--interval", type=float, default=0.5, help="Seconds between checks with --watch")
+    args = parser.parse_args()
+
+    if args.graph:
+        for rel, pages in dependents().items():
+            print(f"{rel}\n" + "".join(f"  {page}\n" for page in pages), end="")
+        return 0
+    try:
+        stats = build_pages(force=args.force, workers=args.workers, pages=set(args.pages), dry_run=args.dry_run)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    report(stats)
+    if not args.watch:
+        return 1 if stats['conflicts'] else 0
+
+    print(f"Watching {TEMPLATE_DIR}/ (Ctrl+C to stop)")
+    last_error, conflicts = None, set(stats['conflicts'])
+    try:
+        while True:
+            time.sleep(args.interval)
+            try:
+                stats = build_pages(workers=args.workers)
+            except ValueError as e:
+                if str(e) != last_error:
+                    print(f"Error: {e}")
+                last_error = str(e)
+                continue
+            last_error = None
+            # A conflict is reported once, not on every check
+            if stats['written'] or stats['removed'] or set(stats['conflicts']) != conflicts:
+                report(stats)
+            conflicts = set(stats['conflicts'])
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(run_main(main))
@@ -0,0 +1,472 @@
+import os
+import re
+import sys
+import json
+import gzip
+import time
+import hashlib
+import argparse
+from urllib.parse import unquote, quote
+
+import build_images
+import build_pages
+import podcast_search
+import podcast_authors
+import podcast_shards
+from podcast_timing import span, run_main
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(SCRIPT_DIR, "_site")
+MANIFEST_NAME = ".build-manifest.json"
+MANIFEST_VERSION = 2   # 2: entries carry the content digest
+
+# Tooling files that live next to the site but are never published
+EXCLUDED_DIRS = {"benchmarks", "__pycache__", build_pages.TEMPLATE_DIR}
+EXCLUDED_EXTENSIONS = {".py", ".pyc", ".md", ".zip", ".jsonl", ".patch", ".txt"}
+
+# Assets that get a content hash in their filename (safe to cache forever)
+FINGERPRINT_EXTENSIONS = {".css", ".js", ".png", ".ico", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".avif"}
+
+# Text formats worth storing precompressed next to the original
+COMPRESS_EXTENSIONS = {".html", ".css", ".js", ".svg", ".json", ".ico", ".xml"}
+
+# Attributes in HTML (and url() in CSS) that may point at local files
+HTML_REF_PATTERN = re.compile(r'(\s(?:href|src|content)=")([^"]*)(")')
+SRCSET_PATTERN = re.compile(r'(\ssrcset=")([^"]*)(")')
+CSS_URL_PATTERN = re.compile(r'(url\(\s*["\']?)([^"\')]+)(["\']?\s*\))')
+
+EXTERNAL_PREFIXES = ("http:", "https:", "//", "#", "mailto:", "tel:", "data:", "javascript:")
+
+
+# --- HELPERS ---
+
+def file_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+def read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def write_bytes(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+def collect_site_files(root):
+    """
+    Returns the relative paths (with forward slashes) of every publishable file.
+    """
+    files = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        # Skip hidden folders, build output and tooling folders
+        dirnames[:] = sorted(d for d in dirnames
+                             if not d.startswith(('.', '_')) and d not in EXCLUDED_DIRS)
+        for name in sorted(filenames):
+            if name.startswith('.'):
+                continue
+            if os.path.splitext(name)[1].lower() in EXCLUDED_EXTENSIONS:
+                continue
+            rel = os.path.relpath(os.path.join(dirpath, name), root)
+            files.append(rel.replace(os.sep, "/"))
+    return files
+
+def fingerprinted_name(rel_path, data):
+    base, ext = os.path.splitext(rel_path)
+    return f"{base}.{file_hash(data)[:10]}{ext}"
+
+
+# --- MINIFIERS ---
+
+STRING_PATTERN = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'')
+
+def minify_css(css):
+    """
+    Strips comments and redundant whitespace. String literals are left untouched.
+    """
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.DOTALL)
+    out = []
+    last = 0
+    for m in STRING_PATTERN.finditer(css):
+        out.append(_squeeze_css(css[last:m.start()]))
+        out.append(m.group(0))
+        last = m.end()
+    out.append(_squeeze_css(css[last:]))
+    return "".join(out).strip()
+
+def _squeeze_css(chunk):
+    chunk = re.sub(r'\s+', ' ', chunk)
+    chunk = re.sub(r'\s*([{};,>])\s*', r'\1', chunk)
+    return chunk.replace(';}', '}')
+
+def minify_js(js):
+    """
+    Conservative minifier: drops indentation, blank lines and comment-only lines.
+    Line breaks are kept so automatic semicolon insertion still works.
+    """
+    lines = []
+    in_block_comment = False
+    for line in js.splitlines():
+        stripped = line.strip()
+        if in_block_comment:
+            if '*/' in stripped:
+                in_block_comment = False
+                stripped = stripped.split('*/', 1)[1].strip()
+            else:
+                continue
+        if stripped.startswith('/*'):
+            if '*/' not in stripped:
+                in_block_comment = True
+                continue
+            stripped = stripped.split('*/', 1)[1].strip()
+        if not stripped or stripped.startswith('//'):
+            continue
+        lines.append(stripped)
+    return "\n".join(lines)
+
+RAW_TEXT_PATTERN = re.compile(r'(<(pre|textarea|script|style)\b[^>]*>)(.*?)(</\2\s*>)', re.DOTALL | re.IGNORECASE)
+
+def minify_html(html):
+    """
+    Removes comments and collapses whitespace outside of pre/textarea/script/style.
+    Inline scripts and styles are run through the JS/CSS minifiers.
+    """
+    out = []
+    last = 0
+    for m in RAW_TEXT_PATTERN.finditer(html):
+        out.append(_squeeze_html(html[last:m.start()]))
+        tag = m.group(2).lower()
+        body = m.group(3)
+        if tag == 'style':
+            body = minify_css(body)
+        elif tag == 'script':
+            body = minify_js(body)
+        out.append(_squeeze_html(m.group(1)) + body + m.group(4))
+        last = m.end()
+    out.append(_squeeze_html(html[last:]))
+    return "".join(out).strip() + "\n"
+
+def _squeeze_html(chunk):
+    # Keep conditional comments, drop everything else
+    chunk = re.sub(r'<!--(?!\[if).*?-->', '', chunk, flags=re.DOTALL)
+    # A whitespace run containing a newline becomes one newline, others one space
+    return re.sub(r'\s+', lambda m: "\n" if "\n" in m.group(0) else " ", chunk)
+
+MINIFIERS = {
+    ".css": minify_css,
+    ".js": minify_js,
+    ".html": minify_html,
+}
+
+
+# --- REFERENCE REWRITING ---
+
+def resolve_reference(value, page_dir, asset_map):
+    """
+    Maps a reference found in a file at page_dir to its fingerprinted location.
+    Returns None if the reference does not point at a known asset.
+    """
+    if not value or value.startswith(EXTERNAL_PREFIXES):
+        return None
+    path, sep, suffix = value.partition('?')
+    if not sep:
+        path, sep, suffix = value.partition('#')
+    if path.startswith('/'):
+        target = unquote(path.lstrip('/'))
+    else:
+        target = os.path.normpath(os.path.join(page_dir, unquote(path))).replace(os.sep, "/")
+    if target not in asset_map:
+        return None
+    new_rel = os.path.relpath(asset_map[target], page_dir or ".").replace(os.sep, "/")
+    if path.startswith('/'):
+        new_rel = "/" + asset_map[target]
+    return quote(new_rel, safe="/") + (sep + suffix if sep else "")
+
+def rewrite_references(text, rel_path, asset_map):
+    """
+    Rewrites href/src/content/srcset attributes (HTML) or url() values (CSS).
+    Returns the new text and the sorted list of assets it depends on.
+    """
+    page_dir = os.path.dirname(rel_path)
+    used = set()
+
+    def sub_single(m):
+        new = resolve_reference(m.group(2), page_dir, asset_map)
+        if new is None:
+            return m.group(0)
+        used.add(new)
+        return m.group(1) + new + m.group(3)
+
+    def sub_srcset(m):
+        candidates = []
+        for candidate in m.group(2).split(','):
+            parts = candidate.strip().split(None, 1)
+            if not parts:
+                continue
+            new = resolve_reference(parts[0], page_dir, asset_map)
+            if new is not None:
+                used.add(new)
+                parts[0] = new
+            candidates.append(" ".join(parts))
+        return m.group(1) + ", ".join(candidates) + m.group(3)
+
+    if rel_path.endswith('.css'):
+        text = CSS_URL_PATTERN.sub(sub_single, text)
+    else:
+        text = HTML_REF_PATTERN.sub(sub_single, text)
+        text = SRCSET_PATTERN.sub(sub_srcset, text)
+    return text, sorted(used)
+
+
+# --- COMPRESSION ---
+
+def precompress(out_path, data):
+    """
+    Writes .gz (and .br when brotli is installed) siblings if they save space.
+    Stale siblings from a previous build are removed.
+    """
+    written = []
+    variants = [(".gz", lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", lambda d: brotli.compress(d, quality=11)))
+
+    for suffix, compress in variants:
+        packed = compress(data)
+        if len(packed) < len(data):
+            write_bytes(out_path + suffix, packed)
+            written.append(suffix)
+        elif os.path.exists(out_path + suffix):
+            os.remove(out_path + suffix)
+    return written
+
+
+# --- BUILD ---
+
+def load_manifest(output_dir):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') == MANIFEST_VERSION:
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {'version': MANIFEST_VERSION, 'files': {}}
+
+def save_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    os.makedirs(output_dir, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+
+def build_order(rel_path):
+    """
+    Binary assets first, then CSS (may reference images), then JS, then pages.
+    """
+    ext = os.path.splitext(rel_path)[1].lower()
+    return ({".css": 1, ".js": 2, ".html": 3}.get(ext, 0), rel_path)
+
+def process_file(rel_path, source_path, ctx):
+    """
+    Builds one file and returns its manifest entry and whether it was rebuilt.
+    ctx holds the shared build state (output dir, asset map, previous manifest...).
+    """
+    ext = os.path.splitext(rel_path)[1].lower()
+    raw = read_bytes(source_path)
+    input_hash = file_hash(raw)
+    asset_map = ctx['asset_map']
+
+    deps = []
+    data = raw
+    if ext in (".html", ".css"):
+        text = raw.decode('utf-8')
+        if ext == ".html":
+            text = build_images.add_picture_markup(text, rel_path, ctx['responsive'])
+        text, deps = rewrite_references(text, rel_path, asset_map)
+        data = text.encode('utf-8')
+
+    # The cache key covers the input and the fingerprinted names it links to
+    key = file_hash((input_hash + "|" + "|".join(deps) + f"|{ctx['minify']}|{ctx['compress']}").encode('utf-8'))
+    old = ctx['previous'].get(rel_path)
+    if old and old.get('key') == key and os.path.exists(os.path.join(ctx['output_dir'], old['output'])):
+        if ext in FINGERPRINT_EXTENSIONS:
+            asset_map[rel_path] = old['output']
+            ctx['seen'].setdefault(old['digest'], old['output'])
+        return old, False
+
+    if ctx['minify'] and ext in MINIFIERS:
+        data = MINIFIERS[ext](data.decode('utf-8')).encode('utf-8')
+
+    entry = {
+        'input': input_hash,
+        'key': key,
+        'size': len(raw),
+        'output_size': len(data),
+        'compressed': [],
+    }
+
+    out_rel = rel_path
+    if ext in FINGERPRINT_EXTENSIONS:
+        digest = file_hash(data)
+        entry['digest'] = digest
+        if digest in ctx['seen']:
+            # Identical content elsewhere in the site (e.g. the same icon in
+            # favicon/ and grades/favicon/): link to the first copy instead
+            entry['output'] = asset_map[rel_path] = ctx['seen'][digest]
+            entry['output_size'] = 0
+            ctx['duplicates'] += 1
+            return entry, True
+        out_rel = fingerprinted_name(rel_path, data)
+        asset_map[rel_path] = ctx['seen'][digest] = out_rel
+
+    out_path = os.path.join(ctx['output_dir'], out_rel)
+    write_bytes(out_path, data)
+    if ctx['compress'] and ext in COMPRESS_EXTENSIONS:
+        entry['compressed'] = precompress(out_path, data)
+
+    entry['output'] = out_rel
+    return entry, True
+
+def remove_orphans(output_dir, keep):
+    """
+    Deletes files in the output directory that the current build did not produce.
+    """
+    removed = 0
+    for dirpath, dirnames, filenames in os.walk(output_dir, topdown=False):
+        for name in filenames:
+            full = os.path.join(dirpath, name)
+            rel = os.path.relpath(full, output_dir).replace(os.sep, "/")
+            if rel == MANIFEST_NAME or rel in keep:
+                continue
+            os.remove(full)
+            removed += 1
+        if dirpath != output_dir and not os.listdir(dirpath):
+            os.rmdir(dirpath)
+    return removed
+
+def build_site(root=SCRIPT_DIR, output_dir=DEFAULT_OUTPUT, minify=True, compress=True, files=None, cache_dir=None, search_cache=None):
+    """
+    Builds the publishable site into output_dir and returns a stats dict.
+    """
+    start = time.perf_counter()
+    root = os.path.abspath(root)
+    output_dir = os.path.abspath(output_dir)
+    manifest = load_manifest(output_dir)
+    previous = manifest['files']
+
+    # Page stage: the pages generated from templates/ are brought up to date first
+    with span("build.pages"):
+        pages = build_pages.build_pages(root)
+
+    if files is None:
+        files = collect_site_files(root)
+    sources = {rel: os.path.join(root, rel) for rel in files}
+
+    # Shard stage: sharded sections are published as one stitched page
+    with span("build.shards"):
+        shards = podcast_shards.build_pages(root)
+    sources.update({rel: path for rel, path in shards['files'].items() if rel in sources})
+
+    # Image stage: optimized originals replace their sources, variants are added
+    with span("build.images"):
+        images = build_images.optimize_images(root, files, cache_dir or build_images.DEFAULT_CACHE)
+    sources.update(images['overrides'])
+    sources.update(images['extra'])
+
+    # Search stage: the sharded episode index read by podcasts/search.js
+    with span("build.search"):
+        search = podcast_search.build_index(root, search_cache or podcast_search.DEFAULT_CACHE)
+    sources.update(search['files'])
+
+    # Author stage: per-author pages from the incremental author index
+    with span("build.authors"):
+        authors = podcast_authors.build_pages(root)
+    sources.update(authors['files'])
+
+    ctx = {
+        'output_dir': output_dir,
+        'previous': previous,
+        'asset_map': {},
+        'seen': {},
+        'duplicates': 0,
+        'responsive': images['responsive'],
+        'minify': minify,
+        'compress': compress,
+    }
+    entries = {}
+    rebuilt = 0
+
+    for rel_path in sorted(sources, key=build_order):
+        with span("build.file" + os.path.splitext(rel_path)[1].lower()):
+            entry, changed = process_file(rel_path, sources[rel_path], ctx)
+        entries[rel_path] = entry
+        rebuilt += changed
+
+    keep = set()
+    for entry in entries.values():
+        keep.add(entry['output'])
+        keep.update(entry['output'] + suffix for suffix in entry.get('compressed', []))
+    with span("build.remove_orphans"):
+        removed = remove_orphans(output_dir, keep)
+
+    manifest['files'] = entries
+    save_manifest(output_dir, manifest)
+
+    return {
+        'files': len(entries),
+        'rebuilt': rebuilt,
+        'unchanged': len(entries) - rebuilt,
+        'removed': removed,
+        'pages_written': len(pages['written']),
+        'pages_conflicts': pages['conflicts'],
+        'duplicates': ctx['duplicates'],
+        'images_encoded': images['generated'],
+        'sharded_sections': shards['sections'],
+        'search_docs': search['docs'],
+        'search_shards': search['shards'],
+        'authors': authors['authors'],
+        'author_pages_rendered': authors['rendered'],
+        'input_bytes': sum(e['size'] for e in entries.values()),
+        'output_bytes': sum(e['output_size'] for e in entries.values()),
+        'seconds': time.perf_counter() - start,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Minify, fingerprint and precompress the static site.")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Output directory (default: _site)")
+    parser.add_argument("--no-minify", action="store_true", help="Copy text files without minifying")
+    parser.add_argument("--no-compress", action="store_true", help="Skip .gz/.br precompression")
+    parser.add_argument("--clean", action="store_true", help="Ignore the manifest and rebuild everything")
+    args = parser.parse_args()
+
+    if args.clean:
+        manifest_path = os.path.join(args.output, MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+
+    stats = build_site(output_dir=args.output, minify=not args.no_minify, compress=not args.no_compress)
+
+    print(f"Built {stats['files']} files into {args.output}")
+    print(f"  rebuilt: {stats['rebuilt']}, unchanged: {stats['unchanged']}, removed: {stats['removed']}")
+    print(f"  size: {stats['input_bytes']} -> {stats['output_bytes']} bytes")
+    print(f"  pages from templates/: {stats['pages_written']} written")
+    for page in stats['pages_conflicts']:
+        print(f"  warning: {page} was edited by hand and not regenerated (see build_pages.py)")
+    print(f"  images encoded: {stats['images_encoded']}, duplicate assets linked: {stats['duplicates']}")
+    if stats['sharded_sections']:
+        print(f"  sharded sections stitched: {stats['sharded_sections']}")
+    print(f"  search index: {stats['search_docs']} episodes in {stats['search_shards']} shards")
+    print(f"  author pages: {stats['authors']} authors, {stats['author_pages_rendered']} pages rendered")
+    if build_images.Image is None:
+        print("  note: Pillow is not installed, image optimization was skipped")
+    if brotli is None:
+        print("  note: 'brotli' is not installed, only .gz files were written")
+    print(f"  done in {stats['seconds']:.2f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(run_main(main))
@@ -0,0 +1,281 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import build_site
+from podcast_timing import span, run_main
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_DIR = ".deploy-cache"
+MANIFEST_VERSION = 1
+DEFAULT_WORKERS = 8
+HASH_BLOCK = 1 << 20
+
+# Publishes the built site (build_site.py output, default _site/) into a
+# target folder, typically a git worktree of the gh-pages branch:
+#
+#   git worktree add ../gh-pages gh-pages
+#   python deploy_site.py ../gh-pages --build --commit "Update site"
+#   python deploy_site.py /srv/www --link          (hardlinks instead of copies)
+#
+# .deploy-cache/<target hash>.json remembers, per published file, the size,
+# mtime and SHA-256 of its source and the size and mtime of the copy in the
+# target. A file whose source and copy both still match is not read at all,
+# so a deploy with nothing to do is a walk plus two stats per file. Other
+# files are hashed on a thread pool and only copied when their content
+# changed. Files the site no longer has are deleted from the target. On a
+# first deploy (no manifest yet) the target may hold files of unknown
+# origin: they are only deleted in a git worktree, where git can bring them
+# back, and otherwise listed as 'foreign' and left alone.
+#
+# Hardlinked files share their content with _site, so they change as soon
+# as the next build rewrites them; use copies for a git worktree.
+
+KEEP = {".git", ".nojekyll"}
+
+
+# --- MANIFEST ---
+
+def manifest_path(target, root=None):
+    name = hashlib.sha1(os.path.abspath(target).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(root or SCRIPT_DIR, STATE_DIR, name + ".json")
+
+def load_manifest(path, target):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') == MANIFEST_VERSION and manifest.get('target') == os.path.abspath(target):
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {'version': MANIFEST_VERSION, 'target': os.path.abspath(target), 'files': {}}
+
+def save_manifest(path, manifest):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        # dumps, not dump: only dumps uses the C encoder
+        f.write(json.dumps(manifest, separators=(",", ":"), sort_keys=True))
+    os.replace(tmp, path)
+
+
+# --- FILES ---
+
+def collect_files(source):
+    """
+    {relative path: os.stat_result} of everything in the build output.
+    """
+    files = {}
+    folders = [(source, "")]
+    while folders:
+        folder, prefix = folders.pop()
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    folders.append((entry.path, prefix + entry.name + "/"))
+                elif prefix or entry.name != build_site.MANIFEST_NAME:
+                    files[prefix + entry.name] = entry.stat()
+    return files
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _stat(path):
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+def place(source_path, target_path, link):
+    """
+    Puts a file into the target atomically (a reader never sees half a file).
+    """
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    tmp = f"{target_path}.{os.getpid()}.deploy-tmp"
+    if link:
+        try:
+            os.link(source_path, tmp)
+        except OSError:
+            link = False   # other file system: fall back to a copy
+    if not link:
+        with open(source_path, 'rb') as src, open(tmp, 'wb') as dst:
+            for block in iter(lambda: src.read(HASH_BLOCK), b""):
+                dst.write(block)
+    os.replace(tmp, target_path)
+
+def sync_file(rel, stat, source, target, old, link, dry_run=False):
+    """
+    Brings one file of the target up to date. Returns (action, manifest entry);
+    action is 'touched' (same content, new mtime) or 'copied'.
+    """
+    source_path = os.path.join(source, rel)
+    target_path = os.path.join(target, *rel.split("/"))
+    current = _stat(target_path)
+    digest = hash_file(source_path)
+    if current and current.st_size == stat.st_size:
+        same = (old and old['sha256'] == digest and old['target'] == [current.st_size, current.st_mtime_ns]) \
+               or hash_file(target_path) == digest
+        if same:
+            return 'touched', {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest,
+                               'target': [current.st_size, current.st_mtime_ns]}
+    if dry_run:
+        return 'copied', None
+    place(source_path, target_path, link)
+    placed = os.stat(target_path)
+    return 'copied', {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest,
+                      'target': [placed.st_size, placed.st_mtime_ns]}
+
+def remove_files(target, rels):
+    removed = 0
+    for rel in rels:
+        path = os.path.join(target, *rel.split("/"))
+        if os.path.isfile(path):
+            os.remove(path)
+            removed += 1
+        # Drop folders left empty
+        folder = os.path.dirname(path)
+        while folder != target and os.path.isdir(folder) and not os.listdir(folder):
+            os.rmdir(folder)
+            folder = os.path.dirname(folder)
+    return removed
+
+def untracked_files(target, keep):
+    """
+    Files in the target that neither the site nor KEEP account for.
+    """
+    found = []
+    for dirpath, dirnames, filenames in os.walk(target):
+        dirnames[:] = [d for d in dirnames if d not in KEEP]
+        for name in filenames:
+            rel = os.path.relpath(os.path.join(dirpath, name), target).replace(os.sep, "/")
+            if rel not in keep and rel not in KEEP:
+                found.append(rel)
+    return found
+
+
+# --- DEPLOY ---
+
+def deploy(target, source=build_site.DEFAULT_OUTPUT, root=None, workers=DEFAULT_WORKERS, link=False,
+           delete=True, dry_run=False):
+    """
+    Syncs the build output into target. Returns a stats dict.
+    """
+    start = time.perf_counter()
+    source, target = os.path.abspath(source), os.path.abspath(target)
+    if not os.path.isdir(source):
+        raise FileNotFoundError(f"No build output in {source}: run build_site.py first (or deploy --build)")
+    if target == source or target.startswith(source + os.sep) or source.startswith(target + os.sep):
+        raise ValueError("Target and build output must not contain each other")
+    os.makedirs(target, exist_ok=True)
+    path = manifest_path(target, root)
+    manifest = load_manifest(path, target)
+    previous = manifest['files']
+
+    with span("deploy.scan"):
+        files = collect_files(source)
+        pending, entries = [], {}
+        for rel, stat in files.items():
+            old = previous.get(rel)
+            if old and old['size'] == stat.st_size and old['mtime_ns'] == stat.st_mtime_ns:
+                current = _stat(f"{target}/{rel}")
+                if current and [current.st_size, current.st_mtime_ns] == old['target']:
+                    entries[rel] = old
+                    continue
+            pending.append(rel)
+
+    unchanged, copied = len(entries), []
+    if pending:
+        with span("deploy.sync"), ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            results = pool.map(lambda rel: sync_file(rel, files[rel], source, target, previous.get(rel), link,
+                                                     dry_run), pending)
+            for rel, (action, entry) in zip(pending, results):
+                entries[rel] = entry
+                if action == 'copied':
+                    copied.append(rel)
+                else:
+                    unchanged += 1
+
+    # Files the site no longer has; on a first deploy, whatever else is in the target
+    orphans, foreign = [], []
+    if delete and previous:
+        orphans = sorted(rel for rel in previous if rel not in files)
+    elif delete:
+        orphans = sorted(untracked_files(target, files))
+        if not os.path.exists(os.path.join(target, ".git")):
+            orphans, foreign = [], orphans
+    removed = 0
+    if not dry_run and (pending or orphans):
+        with span("deploy.remove"):
+            removed = remove_files(target, orphans)
+        # With --keep-orphans their entries stay, so a later deploy still removes them
+        kept = {rel: entry for rel, entry in previous.items() if rel not in files and rel not in orphans}
+        manifest['files'] = {**kept, **entries}
+        save_manifest(path, manifest)
+    return {'target': target, 'files': len(files), 'copied': len(copied), 'unchanged': unchanged,
+            'hashed': len(pending), 'removed': len(orphans) if dry_run else removed,
+            'bytes': sum(files[rel].st_size for rel in copied), 'changed_files': sorted(copied),
+            'removed_files': orphans, 'foreign_files': foreign, 'dry_run': dry_run, 'seconds': time.perf_counter() - start}
+
+def git_commit(target, message):
+    """
+    Commits everything in a git worktree target. Returns the new commit id, or
+    None when there was nothing to commit.
+    """
+    subprocess.run(["git", "-C", target, "add", "-A"], check=True)
+    if subprocess.run(["git", "-C", target, "diff", "--cached", "--quiet"]).returncode == 0:
+        return None
+    subprocess.run(["git", "-C", target, "commit", "-q", "-m", message], check=True)
+    return subprocess.run(["git", "-C", target, "rev-parse", "--short", "HEAD"], check=True,
+                          capture_output=True, text=True).stdout.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish only the changed files of the built site.")
+    parser.add_argument("target", help="Folder to publish into, e.g. a git worktree of gh-pages")
+    parser.add_argument("--source", default=build_site.DEFAULT_OUTPUT, help="Build output (default: _site)")
+    parser.add_argument("--build", action="store_true", help="Run build_site.py into --source first")
+    parser.add_argument("--link", action="store_true", help="Hardlink files instead of copying them")
+    parser.add_argument("--keep-orphans", action="store_true", help="Do not delete files the site no longer has")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Hashing/copy threads (default: 8)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would change")
+    parser.add_argument("--commit", metavar="MESSAGE", help="Commit the target (a git worktree) afterwards")
+    parser.add_argument("--verbose", action="store_true", help="List every copied and removed file")
+    args = parser.parse_args()
+
+    if args.build:
+        build = build_site.build_site(output_dir=args.source)
+        print(f"Built {build['files']} files ({build['rebuilt']} rebuilt) in {build['seconds']:.2f}s")
+    stats = deploy(args.target, args.source, workers=args.workers, link=args.link,
+                   delete=not args.keep_orphans, dry_run=args.dry_run)
+
+    verb = "Would copy" if args.dry_run else "Copied"
+    print(f"{verb} {stats['copied']} of {stats['files']} files ({stats['bytes']} bytes) to {stats['target']}")
+    print(f"  unchanged: {stats['unchanged']}, hashed: {stats['hashed']}, removed: {stats['removed']}")
+    if stats['foreign_files']:
+        print(f"  left alone: {len(stats['foreign_files'])} files that were in the target before the first deploy")
+    if args.verbose:
+        for rel in stats['changed_files']:
+            print(f"  + {rel}")
+        for rel in stats['removed_files']:
+            print(f"  - {rel}")
+    if args.commit and not args.dry_run:
+        try:
+            commit = git_commit(stats['target'], args.commit)
+        except subprocess.CalledProcessError as e:
+            print(f"  git failed: {e}")
+            return 1
+        print(f"  committed {commit}" if commit else "  nothing to commit")
+    print(f"  done in {stats['seconds']:.2f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(run_main(main))
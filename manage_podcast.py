@@ -1,15 +1,12 @@
 import os
 import re
 
-def get_file_content(file_path):
-    if not os.path.exists(file_path):
-        return None
-    with open(file_path, 'r', encoding='utf-8') as f:
-        return f.read()
-
-def save_file_content(file_path, content):
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(content)
+import podcast_audit
+import podcast_history
+from add_podcast import get_input
+from podcast_core import (get_file_content, save_file_content, scan_cards, parse_canonical_card, pattern,
+                          audio_source_tags, split_authors, clean_name, extract_podcasts)
+from podcast_timing import timed, run_main
 
 def update_file_safely(original_content, old_block_span, new_block, file_path):
     """
@@ -24,37 +21,27 @@ def update_file_safely(original_content, old_block_span, new_block, file_path):
          
     new_full = original_content[:start] + new_block + original_content[end:]
     save_file_content(file_path, new_full)
-    return True
 
-def extract_podcasts(content):
-    """
-    Returns a list of dictionaries containing podcast details and their full HTML block.
-    """
-    podcasts = []
-    # Regex to find article blocks. 
-    # We look for the comment (optional) + article block
-    pattern = re.compile(r'(<!-- NEUE EPISODE: .*? -->\s*)?<article class="podcast-card">(.*?)</article>', re.DOTALL)
-    
-    matches = list(pattern.finditer(content))
-    
-    for i, match in enumerate(matches):
-        full_block = match.group(0) # The whole match including comment if present
-        inner_html = match.group(2)
-        
-        # Extract Title
-        title_match = re.search(r'<h3>(.*?)</h3>', inner_html)
-        title = title_match.group(1) if title_match else "Unknown Title"
-        
-        podcasts.append({
-            'index': i,
-            'title': title,
-            'full_block': full_block,
-            'span': match.span(),
-            'inner_html': inner_html
-        })
-    
-    return podcasts
+    # Keep the change undoable (podcast_cli.py undo <section>); the file is
+    # already saved, so a failure here is only reported
+    m_title = pattern('title').search(original_content, start, end)
+    title = m_title.group(1).strip() if m_title else "entry"
+    try:
+        podcast_history.record(file_path, original_content, [(start, end, new_block)],
+                               f"{'delete' if not new_block else 'edit'} {title}")
+    except (OSError, ValueError) as e:
+        print(f"Warning: change saved, but not recorded for undo: {e}")
 
+    # And in the audit log (podcast_cli.py audit), for pages of a site
+    before = extract_podcasts(original_content[start:end])
+    after = extract_podcasts(new_block) if new_block else []
+    if before:
+        podcast_audit.record_file_change(file_path, 'update' if new_block else 'delete',
+                                         original_content[:start].count('<article class="podcast-card"'),
+                                         before=before[0], after=after[0] if after else None)
+    return True
+
+@timed("parse.authors")
 def parse_authors_from_block(block):
     """
     Attempts to extract a list of authors from the HTML block.
@@ -62,31 +49,26 @@ def parse_authors_from_block(block):
     # Check for new format: <p class="podcast-author">von A, B und C</p>
     match = re.search(r'<p class="podcast-author">(.*?)</p>', block)
     if match:
-        text = match.group(1).replace("von ", "")
-        # Split by " und " first to get the last part
-        parts = text.split(" und ")
-        if len(parts) > 1:
-            last = parts[-1]
-            others = " und ".join(parts[:-1]) # Rejoin just in case multiple "und" (unlikely)
-            list_authors = [x.strip() for x in others.split(",")]
-            list_authors.append(last.strip())
-            return list_authors
-        else:
-            return [text.strip()]
-            
+        return split_authors(match.group(1))
+
+
     # Check for old list format
     list_match = re.search(r'<ul class="author-list">(.*?)</ul>', block, re.DOTALL)
     if list_match:
         items = re.findall(r'<li>(.*?)</li>', list_match.group(1))
-        return [item.strip() for item in items]
+        return [clean_name(item) for item in items if clean_name(item)]
 
     return []
 
+@timed("parse.sources")
 def parse_sources_from_block(block):
     """
     Attempts to extract a list of sources from the HTML block.
     """
     list_match = re.search(r'<ul class="source-list">(.*?)</ul>', block, re.DOTALL)
+    if not list_match:
+        # Newer cards: <div class="podcast-sources"> ... <ul>...</ul>
+        list_match = re.search(r'<div class="podcast-sources">.*?<ul>(.*?)</ul>', block, re.DOTALL)
     if list_match:
         # Extract text or href from <li>...</li>
         # <li><a href="...">...</a></li> OR <li>...</li>
@@ -164,6 +146,42 @@ def edit_list_interactive(current_list, item_name="Item"):
                 
     return working_list
 
+def edit_canonical_podcast(podcast, choice, content, file_path):
+    """
+    Edits a card in the current (migrated) format by changing its fields and
+    re-rendering it, instead of patching each historical layout by regex.
+    """
+    from podcast_api import normalize_fields, render_block
+
+    fields = parse_canonical_card(podcast['inner_html'])
+
+    if choice == '1': # Title
+        changes = {'title': get_input("New Title")}
+    elif choice == '2': # Details
+        print(f"Current Description: {fields['details']}")
+        p_input = input(f"New Details (Leave empty for default 'Ein Podcast über {fields['title']}'): ").strip()
+        changes = {'details': p_input if p_input else f"Ein Podcast über {fields['title']}"}
+    elif choice == '3': # Link
+        changes = {'link': get_input("New Audio Link")}
+    elif choice == '4': # Authors
+        new_authors = edit_list_interactive(fields['authors'], "Author")
+        if new_authors is None: # Cancelled
+            return
+        changes = {'authors': new_authors}
+    elif choice == '5': # Sources
+        new_sources = edit_list_interactive(fields['sources'], "Source")
+        if new_sources is None: # Cancelled
+            return
+        changes = {'sources': new_sources}
+    else:
+        print("Invalid choice.")
+        return
+
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(file_path))))
+    new_block = render_block(normalize_fields(changes, base=fields), root)
+    update_file_safely(content, podcast['span'], new_block, file_path)
+    print("Entry updated successfully!")
+
 def edit_podcast_logic(podcast, content, file_path):
     print(f"\nEditing: {podcast['title']}")
     print("What would you like to edit?")
@@ -178,6 +196,10 @@ def edit_podcast_logic(podcast, content, file_path):
     
     if choice == 'c':
         return
+
+    if 'data-format=' in podcast['full_block']:
+        edit_canonical_podcast(podcast, choice, content, file_path)
+        return
     
     new_block = podcast['full_block']
     
@@ -189,7 +211,8 @@ def edit_podcast_logic(podcast, content, file_path):
              new_block = re.sub(r'<li class="podcast-item"><strong>Titel:</strong> .*?</li>', f'<li class="podcast-item"><strong>Titel:</strong> {new_title}</li>', new_block)
 
     elif choice == '2': # Details
-        print(f"Current Description: {re.search(r'<p class=\"podcast-description\">(.*?)</p>', new_block).group(1) if re.search(r'<p class=\"podcast-description\">(.*?)</p>', new_block) else 'Unknown'}")
+        current_match = re.search(r'<p class="podcast-description">(.*?)</p>', new_block)
+        print(f"Current Description: {current_match.group(1) if current_match else 'Unknown'}")
         p_input = input(f"New Details (Leave empty for default 'Ein Podcast über {podcast['title']}'): ").strip()
         
         new_details = p_input if p_input else f"Ein Podcast über {podcast['title']}"
@@ -206,24 +229,8 @@ def edit_podcast_logic(podcast, content, file_path):
     elif choice == '3': # Link
         new_link = get_input("New Audio Link")
         if new_link:
-            # Generate Multi-Source Block
-            sources_block = ""
-            link_lower = new_link.lower()
-            
-            if link_lower.endswith('.m4a'):
-                sources_block = f"""<source src="{new_link}" type="audio/mp4">
-        <source src="{new_link}" type="audio/x-m4a">
-        <source src="{new_link}" type="audio/aac">"""
-            elif link_lower.endswith('.mp3'):
-                sources_block = f"""<source src="{new_link}" type="audio/mpeg">
-        <source src="{new_link}" type="audio/mp3">"""
-            elif link_lower.endswith('.ogg') or link_lower.endswith('.oga'):
-                sources_block = f"""<source src="{new_link}" type="audio/ogg">"""
-            elif link_lower.endswith('.wav'):
-                sources_block = f"""<source src="{new_link}" type="audio/wav">"""
-            else:
-                sources_block = f"""<source src="{new_link}" type="audio/mpeg">
-        <source src="{new_link}" type="audio/mp4">"""
+            # One correctly typed <source> per file
+            sources_block = audio_source_tags(new_link)
 
             # Remove existing source tags and insert new block
             new_block = re.sub(r'<source src=".*?"(?: type=".*?")?>', '', new_block)
@@ -377,13 +384,16 @@ def main():
             continue
         
         file_path = os.path.join(script_dir, rel_path)
+        if os.path.isdir(os.path.join(os.path.dirname(file_path), ".shards")):
+            print("This section is sharded (podcast_shards.py); edit it with the dashboard or podcast_cli.py.")
+            continue
         content = get_file_content(file_path)
         
         if not content:
             print(f"File not found at {file_path}")
             continue
             
-        podcasts = extract_podcasts(content)
+        podcasts = scan_cards(content)
         
         if not podcasts:
             print("No podcasts found in this file.")
@@ -427,4 +437,4 @@ def main():
         # Simpler to loop back to file selection to reload content fresh.
         
 if __name__ == "__main__":
-    main()
+    run_main(main)
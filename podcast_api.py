@@ -0,0 +1,478 @@
+import os
+import re
+import sys
+import bisect
+
+import podcast_history
+from podcast_core import get_file_content, commit_files, extract_podcasts, generate_html_block, clean_name
+from podcast_timing import timed
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SECTION_NAME = re.compile(r'[a-z0-9][a-z0-9_-]*')
+MAIN_END = "</main>"
+
+# Fields an episode is made of, in the order generate_html_block takes them
+FIELDS = ('title', 'details', 'link', 'authors', 'sources')
+
+class ConflictError(ValueError):
+    """
+    The episode changed since the caller read it (expected_block / expected).
+    """
+
+# Called with the results of every committed batch, after its files are written.
+# Indexes register here to update only the episodes that changed.
+_commit_hooks = []
+
+
+# --- SECTIONS ---
+
+def list_sections(root=None):
+    """
+    Returns the names of all sections (podcasts/<name>/index.html).
+    """
+    base = os.path.join(root or SCRIPT_DIR, "podcasts")
+    if not os.path.isdir(base):
+        return []
+    return sorted(name for name in os.listdir(base)
+                  if SECTION_NAME.fullmatch(name) and os.path.isfile(os.path.join(base, name, "index.html")))
+
+def section_path(section, root=None):
+    if not SECTION_NAME.fullmatch(section or ""):
+        raise ValueError(f"Invalid section name: {section!r}")
+    path = os.path.join(root or SCRIPT_DIR, "podcasts", section, "index.html")
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"Section '{section}' not found at {path}")
+    return path
+
+def read_section(section, root=None):
+    """
+    Returns (file_path, content, podcasts) for a section. For a sharded
+    section (podcast_shards.py) it is (manifest path, None, podcasts).
+    """
+    import podcast_shards
+    path = section_path(section, root)
+    if podcast_shards.is_sharded(section, root):
+        return podcast_shards.read_section(section, root)
+    content = get_file_content(path)
+    return path, content, extract_podcasts(content)
+
+def storage_path(section, root=None):
+    """
+    The file every commit to a section rewrites (the page, or the shard
+    manifest): its size and mtime tell caches whether the section changed,
+    and the undo history lives next to it.
+    """
+    import podcast_shards
+    path = section_path(section, root)
+    if podcast_shards.is_sharded(section, root):
+        return podcast_shards.manifest_path(section, root)
+    return path
+
+def count_episodes(section, root=None):
+    """
+    Number of cards in a section, without parsing them.
+    """
+    import podcast_shards
+    if podcast_shards.is_sharded(section, root):
+        return sum(s['count'] for s in podcast_shards.load_manifest(section, root)['shards'])
+    return (get_file_content(section_path(section, root)) or "").count('<article class="podcast-card"')
+
+
+# --- EPISODES ---
+
+def public_fields(podcast):
+    """
+    The JSON-friendly view of a parsed episode (no raw HTML or spans).
+    """
+    return {'index': podcast['index'], **{k: podcast[k] for k in FIELDS}}
+
+def normalize_fields(data, base=None):
+    """
+    Merges `data` over `base` and applies the same defaults and checks as the
+    dashboard's edit window. Raises ValueError for missing or unknown fields.
+    """
+    unknown = set(data) - set(FIELDS) - {'index'}
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+
+    fields = {k: (base or {}).get(k) for k in FIELDS}
+    fields.update({k: v for k, v in data.items() if k in FIELDS})
+
+    for key in ('authors', 'sources'):
+        value = fields[key] or []
+        if isinstance(value, str):
+            value = [value]
+        fields[key] = [clean_name(str(x)) for x in value if clean_name(str(x))]
+    for key in ('title', 'details', 'link'):
+        fields[key] = str(fields[key] or "").strip()
+
+    if not fields['title'] or not fields['link']:
+        raise ValueError("Title and Link are required!")
+    if not fields['details']:
+        fields['details'] = f"Ein Podcast über {fields['title']}"
+    if not fields['authors']:
+        fields['authors'] = ["Anonym"]
+    return fields
+
+def render_block(fields, root=None):
+    # Imported here: it loads subprocess and concurrent.futures, which reads do not need
+    import podcast_peaks
+    peaks = podcast_peaks.peaks_url(fields['link'], root)
+    return generate_html_block(*(fields[k] for k in FIELDS), peaks=peaks).strip()
+
+def apply_splices(content, splices):
+    """
+    Applies (start, end, replacement) edits to content in a single pass.
+    Splices refer to positions in the original content and must not overlap.
+    """
+    pieces = []
+    last = 0
+    for start, end, text in sorted(splices, key=lambda s: (s[0], s[1])):
+        if start < last:
+            raise ValueError("Overlapping edits in one batch")
+        pieces.append(content[last:start])
+        pieces.append(text)
+        last = end
+    pieces.append(content[last:])
+    return "".join(pieces)
+
+def _delete_span(content, podcast):
+    # Also swallow the blank lines that followed the card
+    start, end = podcast['span']
+    while end < len(content) and content[end] in " \t\r\n":
+        end += 1
+    return start, end
+
+def plan_section_changes(content, podcasts, operations, root=None):
+    """
+    Turns add/update/delete operations on one section into splices.
+
+    Indices refer to the section as it was read, so a batch behaves the same
+    no matter in which order its operations are listed. Returns (splices, results).
+    """
+    splices = []
+    results = []
+    new_blocks = []
+    touched = set()
+    deleted = []
+
+    for op in operations:
+        kind = op.get('op')
+        if kind == 'add' and op.get('block'):
+            # A card taken over verbatim from another section (move/copy)
+            block = op['block'].strip()
+            parsed = extract_podcasts(block)
+            if len(parsed) != 1:
+                raise ValueError("'block' must contain exactly one podcast card")
+            new_blocks.append(block)
+            results.append({'op': 'add', 'index': len(new_blocks) - 1,
+                            'fields': {k: parsed[0][k] for k in FIELDS}})
+            continue
+        if kind == 'add':
+            fields = normalize_fields(op.get('data') or {})
+            new_blocks.append(render_block(fields, root))
+            results.append({'op': 'add', 'index': len(new_blocks) - 1, 'fields': fields})
+            continue
+
+        if kind not in ('update', 'delete'):
+            raise ValueError(f"Unknown operation: {kind!r}")
+        index = op.get('index')
+        if not isinstance(index, int) or not 0 <= index < len(podcasts):
+            raise IndexError(f"No episode with index {index!r} (section has {len(podcasts)})")
+        if index in touched:
+            raise ValueError(f"Episode {index} is changed more than once in one batch")
+        touched.add(index)
+
+        target = podcasts[index]
+        expected = op.get('expected_block')
+        if expected is not None and expected != target['full_block']:
+            raise ConflictError("Could not find original entry to update. Refresh list.")
+        expected = op.get('expected')
+        if expected is not None and any(target.get(k) != v for k, v in expected.items() if k in FIELDS):
+            raise ConflictError(f"Episode {index} was changed meanwhile. Refresh list.")
+
+        if kind == 'delete':
+            start, end = _delete_span(content, target)
+            splices.append((start, end, ""))
+            deleted.append(index)
+            results.append({'op': 'delete', 'index': index, 'title': target['title'],
+                            'before': public_fields(target)})
+        elif op.get('block'):
+            # A card whose markup a tool changed itself (podcast_peaks.py), kept verbatim
+            block = op['block'].strip()
+            parsed = extract_podcasts(block)
+            if len(parsed) != 1:
+                raise ValueError("'block' must contain exactly one podcast card")
+            start, end = target['span']
+            splices.append((start, end, block))
+            results.append({'op': 'update', 'index': index, 'fields': {k: parsed[0][k] for k in FIELDS},
+                            'before': public_fields(target)})
+        else:
+            fields = normalize_fields(op.get('data') or {}, base=target)
+            start, end = target['span']
+            splices.append((start, end, render_block(fields, root)))
+            results.append({'op': 'update', 'index': index, 'fields': fields,
+                            'before': public_fields(target)})
+
+    # Adds go before </main>, in the order they were given
+    if new_blocks:
+        marker = content.rfind(MAIN_END)
+        if marker == -1:
+            raise ValueError(f"'{MAIN_END}' tag not found.")
+        splices.append((marker, marker, "".join(b + "\n\n" for b in new_blocks)))
+
+    # Work out where every episode ends up after the batch
+    deleted.sort()
+    remaining = len(podcasts) - len(deleted)
+    for r in results:
+        if r['op'] == 'update':
+            r['index'] -= bisect.bisect_left(deleted, r['index'])
+        elif r['op'] == 'add':
+            r['index'] += remaining
+    return splices, results
+
+def add_commit_hook(func):
+    """
+    Registers func(results) to run after every committed batch. Each result has
+    'section', 'op' and the episode's new 'index'; adds and updates carry the new
+    'fields', updates and deletes the old ones as 'before'. Undo/redo report
+    {'op': 'reload', 'section': ...}: the section changed as a whole.
+    """
+    if func not in _commit_hooks:
+        _commit_hooks.append(func)
+
+def remove_commit_hook(func):
+    if func in _commit_hooks:
+        _commit_hooks.remove(func)
+
+@timed("api.commit")
+def commit(operations, root=None, loaded=None, linked=False):
+    """
+    Applies operations (each with a 'section') to any number of sections.
+    Every section is read once and all changed pages are written together,
+    all-or-nothing. `loaded` may hold read_section() results the caller
+    already has. An operation may carry the 'user' for the audit log.
+    With linked=True the batch is one undo step of all its sections.
+    Returns the internal results in input order.
+    """
+    import podcast_shards
+    loaded = loaded or {}
+    by_section = {}
+    for position, op in enumerate(operations):
+        if not isinstance(op, dict):
+            raise ValueError(f"Operation {position} is not an object: {op!r}")
+        if op.get('data') is not None and not isinstance(op['data'], dict):
+            raise ValueError(f"Operation {position}: 'data' must be an object")
+        section = op.get('section')
+        if not section:
+            raise ValueError(f"Operation {position} has no section")
+        by_section.setdefault(section, []).append((position, op))
+
+    # Plan every section before writing any of them
+    files = {}
+    changes = []  # (path, old content, splices, results) for the history
+    sharded = []  # (manifest path, [(path, old content, splices)], results)
+    keys = {}     # section -> its history key (storage_path), if it changed
+    ordered = [None] * len(operations)
+    for section, items in by_section.items():
+        if podcast_shards.is_sharded(section, root):
+            # Only the shards holding the touched episodes (and the manifest) change
+            section_files, shard_changes, results = podcast_shards.plan(section, [op for _, op in items], root)
+            files.update(section_files)
+            if section_files:
+                sharded.append((podcast_shards.manifest_path(section, root), shard_changes, results))
+                keys[section] = podcast_shards.manifest_path(section, root)
+            for (position, _), r in zip(items, results):
+                r['section'] = section
+                ordered[position] = r
+            continue
+        path, content, podcasts = loaded.get(section) or read_section(section, root)
+        splices, results = plan_section_changes(content, podcasts, [op for _, op in items], root)
+        if splices:
+            files[path] = apply_splices(content, splices)
+            changes.append((path, content, splices, results))
+            keys[section] = path
+        for (position, _), r in zip(items, results):
+            r['section'] = section
+            ordered[position] = r
+
+    if files:
+        commit_files(files)
+        _record(operations, ordered, changes, sharded, root, keys if linked and len(keys) > 1 else None)
+    return ordered
+
+def _record(operations, ordered, changes, sharded, root=None, linked_keys=None):
+    """
+    Undo history, audit log and commit hooks of a batch whose pages are
+    written. A failure here is reported, never raised: the change is made,
+    and a caller retrying the batch would apply it twice.
+    """
+    import podcast_audit
+    if linked_keys:
+        # One step in each section, undone together from any of them
+        files = [(path, content, splices) for path, content, splices, _ in changes]
+        files += [change for _, shard_changes, _ in sharded for change in shard_changes]
+        steps = [("undo history", podcast_history.record_linked, (linked_keys, files, describe(ordered)))]
+    else:
+        steps = [("undo history", podcast_history.record, (path, content, splices, describe(results)))
+                 for path, content, splices, results in changes]
+        steps += [("undo history", podcast_history.record_files, (path, shard_changes, describe(results)))
+                  for path, shard_changes, results in sharded]
+    steps.append(("audit log", podcast_audit.record_results, (operations, ordered, root)))
+    steps += [("commit hook", hook, (ordered,)) for hook in list(_commit_hooks)]
+    for what, func, args in steps:
+        try:
+            func(*args)
+        except Exception as e:
+            print(f"Warning: changes saved, but the {what} failed: {type(e).__name__}: {e}", file=sys.stderr)
+
+def describe(results):
+    """
+    Short label of a batch for the undo history, e.g. "delete Soul, add Jazz".
+    """
+    labels = [f"{r['op']} {r['fields']['title'] if 'fields' in r else r['title']}" for r in results]
+    if len(labels) > 3:
+        labels = labels[:3] + [f"+{len(labels) - 3} more"]
+    return ", ".join(labels)
+
+def _notify(results):
+    for hook in list(_commit_hooks):
+        hook(results)
+
+def commit_section(section, operations, root=None):
+    """
+    Applies operations to one section with one read and one write.
+    """
+    return commit([{**op, 'section': section} for op in operations], root)
+
+
+def step_history(section, direction, steps=1, root=None):
+    """
+    Undoes or redoes the last `steps` changes of a section. A step that also
+    changed other sections (a move) reverts them too; they are listed as 'linked'.
+    """
+    import podcast_audit
+    linked = set()
+    labels = podcast_history.step(storage_path(section, root), direction, steps, linked)
+    if labels:
+        import podcast_shards
+        for changed in [section] + sorted(linked):
+            if podcast_shards.is_sharded(changed, root):
+                # Undoing an append that started a shard leaves that file empty
+                podcast_shards.remove_unlisted(changed, root)
+            podcast_audit.record_step(changed, direction, labels, root)
+        _notify([{'op': 'reload', 'section': changed, 'index': None} for changed in [section] + sorted(linked)])
+    result = {'section': section, direction: labels}
+    if linked:
+        result['linked'] = sorted(linked)
+    return result
+
+
+# --- PUBLIC API ---
+
+def list_podcasts(section, root=None):
+    _, _, podcasts = read_section(section, root)
+    return [public_fields(p) for p in podcasts]
+
+def get_podcast(section, index, root=None):
+    _, _, podcasts = read_section(section, root)
+    if not isinstance(index, int) or not 0 <= index < len(podcasts):
+        raise IndexError(f"No episode with index {index!r} (section has {len(podcasts)})")
+    return public_fields(podcasts[index])
+
+def add_podcast(section, data, root=None):
+    return _result(commit_section(section, [{'op': 'add', 'data': data}], root)[0])
+
+def update_podcast(section, index, changes, root=None, expected_block=None):
+    op = {'op': 'update', 'index': index, 'data': changes, 'expected_block': expected_block}
+    return _result(commit_section(section, [op], root)[0])
+
+def delete_podcast(section, index, root=None, expected_block=None):
+    op = {'op': 'delete', 'index': index, 'expected_block': expected_block}
+    return _result(commit_section(section, [op], root)[0])
+
+def bulk_apply(operations, root=None):
+    """
+    Applies a list of operations, each a dict with 'op' (add/update/delete),
+    'section', and 'index' and/or 'data'. Every section is read once and
+    written once; either all sections change or none. Indices refer to the
+    sections as they were before the batch.
+    Returns one result per operation, in input order.
+    """
+    return [_result(r) for r in commit(operations, root)]
+
+def parse_selection(items):
+    """
+    Accepts (section, index) pairs, "section:index" strings or dicts with
+    'section', 'index' and optionally 'expected_block'.
+    """
+    selection = []
+    for item in items:
+        if isinstance(item, str):
+            section, sep, index = item.rpartition(":")
+            if not sep or not index.strip().isdigit():
+                raise ValueError(f"Expected SECTION:INDEX, got {item!r}")
+            item = {'section': section, 'index': int(index)}
+        elif not isinstance(item, dict):
+            section, index = item
+            item = {'section': section, 'index': index}
+        selection.append(item)
+    return selection
+
+def transfer_podcasts(selection, target, mode="move", root=None):
+    """
+    Moves or copies the selected episodes to the end of section `target`, in
+    the order given. Cards are taken over verbatim. Each involved section is
+    read once and written once, and all of them are committed together, as
+    one undo step of every section involved.
+    """
+    if mode not in ("move", "copy"):
+        raise ValueError(f"Unknown mode: {mode!r}")
+    selection = parse_selection(selection)
+
+    cache = {target: read_section(target, root)}
+    operations = []
+    adds = []
+    for item in selection:
+        section = item['section']
+        if mode == "move" and section == target:
+            raise ValueError(f"Episode {item['index']} is already in section '{target}'")
+        if section not in cache:
+            cache[section] = read_section(section, root)
+        podcasts = cache[section][2]
+        index = item['index']
+        if not isinstance(index, int) or not 0 <= index < len(podcasts):
+            raise IndexError(f"No episode with index {index!r} in '{section}' (section has {len(podcasts)})")
+        source = podcasts[index]
+        expected = item.get('expected_block')
+        if expected is not None and expected != source['full_block']:
+            raise ConflictError("Could not find original entry to move. Refresh list.")
+
+        if mode == "move":
+            operations.append({'op': 'delete', 'section': section, 'index': index, 'expected_block': expected})
+        adds.append({'op': 'add', 'section': target, 'block': source['full_block']})
+
+    return [_result(r) for r in commit(operations + adds, root, loaded=cache, linked=True)]
+
+def undo(section, steps=1, root=None):
+    return step_history(section, "undo", steps, root)
+
+def redo(section, steps=1, root=None):
+    return step_history(section, "redo", steps, root)
+
+def history(section, limit=20, root=None):
+    return {'section': section, **podcast_history.entries(storage_path(section, root), limit)}
+
+def move_podcasts(selection, target, root=None):
+    return transfer_podcasts(selection, target, "move", root)
+
+def copy_podcasts(selection, target, root=None):
+    return transfer_podcasts(selection, target, "copy", root)
+
+def _result(r):
+    out = {'op': r['op'], 'section': r.get('section'), 'index': r['index']}
+    if 'fields' in r:
+        out.update(r['fields'])
+    elif 'title' in r:
+        out['title'] = r['title']
+    return out
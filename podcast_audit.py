@@ -0,0 +1,385 @@
+import os
+import sys
+import json
+import time
+import bisect
+import datetime
+
+from podcast_core import author_key
+from podcast_timing import timed
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+AUDIT_DIR = ".audit"
+SEGMENT_BYTES = 4 * 1024 * 1024   # the current segment is closed past this size
+SPARSE_EVERY = 64                 # one offset per this many records of a closed segment
+
+# Append-only log of every episode change: who, when, with which tool, and
+# the fields before and after. Answers "who deleted Reggae and when" without
+# digging through git history of the pages.
+#
+#   .audit/current.jsonl          the open segment; every change is one appended line
+#   .audit/segments/000001.jsonl  closed segments, never written again
+#   .audit/index.json             per closed segment: time range, record count, the
+#                                 sections / author keys / title keys it mentions and
+#                                 a sparse [max time so far, byte offset] list
+#   .audit/sections.json          sections that already have a snapshot
+#
+# A record is {"time", "batch", "user", "tool", "op", "section", "index", "title",
+# "before", "after"}. Records of one commit share their "batch" and use the
+# indices of podcast_api results (deletes: before the batch, others: after).
+# The first change of a section and every undo/redo also store a "snapshot"
+# record with all of the section's episodes, which replay() starts from.
+#
+# Appending never reads the log. Queries skip closed segments whose index
+# cannot match and seek into the others; only the open segment is scanned.
+#
+#   python podcast_cli.py audit --title Reggae --op delete
+#   python podcast_cli.py audit --section m2a --since 2026-09-01 --until 2026-10-01
+#   python podcast_cli.py replay m2a --until "2026-10-01 12:00"
+
+FIELDS = ('title', 'details', 'link', 'authors', 'sources')
+
+
+# --- STORAGE ---
+
+def audit_dir(root=None):
+    return os.path.join(root or SCRIPT_DIR, AUDIT_DIR)
+
+def current_user():
+    user = os.environ.get('PODCAST_USER')
+    if user:
+        return user
+    try:
+        import getpass
+        return getpass.getuser()
+    except (ImportError, KeyError, OSError):
+        return "unknown"
+
+def _fields(podcast):
+    return {k: podcast[k] for k in FIELDS} if podcast else None
+
+def _append(root, records):
+    folder = audit_dir(root)
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, "current.jsonl")
+    data = "".join(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n" for r in records)
+    # One write in append mode, so lines of concurrent writers do not interleave
+    with open(path, 'ab') as f:
+        f.write(data.encode('utf-8'))
+        size = f.tell()
+    if size > SEGMENT_BYTES:
+        rotate(root)
+
+def _load_json(path, default):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+def _save_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+# --- RECORDING ---
+
+def _base(section, op, batch, user=None, tool=None):
+    return {'time': round(time.time(), 3), 'batch': batch, 'user': user or current_user(),
+            'tool': tool or os.path.basename(sys.argv[0] or "python"), 'op': op, 'section': section}
+
+def _snapshot_if_new(root, sections, batch, user, tool):
+    # The first logged change of a section is followed by its full state
+    path = os.path.join(audit_dir(root), "sections.json")
+    seen = _load_json(path, [])
+    new = [s for s in sorted(sections) if s not in seen]
+    if not new:
+        return []
+    records = [snapshot_record(s, root, batch, user, tool) for s in new]
+    _save_json(path, seen + new)
+    return records
+
+def snapshot_record(section, root=None, batch=None, user=None, tool=None, op="snapshot", labels=None):
+    import podcast_api
+    record = _base(section, op, batch or time.time_ns(), user, tool)
+    if labels is not None:
+        record['labels'] = labels
+    record['episodes'] = [_fields(p) for p in podcast_api.list_podcasts(section, root)]
+    return record
+
+@timed("audit.record")
+def record_results(operations, results, root=None, tool=None):
+    """
+    Logs a committed podcast_api batch. operations[i] produced results[i];
+    an operation may name its 'user' (the HTTP server passes X-User).
+    """
+    batch = time.time_ns()
+    records = []
+    for op, r in zip(operations, results):
+        after = r.get('fields')
+        before = _fields(r.get('before')) if r['op'] != 'add' else None
+        record = _base(r['section'], r['op'], batch, op.get('user'), tool)
+        record.update({'index': r['index'], 'title': (after or before or r)['title'],
+                       'before': before, 'after': after})
+        records.append(record)
+    users = {op.get('user') for op in operations}
+    records += _snapshot_if_new(root, {r['section'] for r in results}, batch,
+                                users.pop() if len(users) == 1 else None, tool)
+    _append(root, records)
+
+def record_change(section, op, index, before=None, after=None, root=None, tool=None):
+    """
+    Logs one change made without podcast_api (add_podcast.py, manage_podcast.py).
+    before/after are field dicts (or parsed podcasts).
+    """
+    batch = time.time_ns()
+    before, after = _fields(before), _fields(after)
+    record = _base(section, op, batch, tool=tool)
+    record.update({'index': index, 'title': (after or before)['title'], 'before': before, 'after': after})
+    _append(root, [record] + _snapshot_if_new(root, {section}, batch, None, tool))
+
+def section_of(file_path):
+    """
+    (section, root) when file_path is the page of a section of a site
+    (<root>/podcasts/<section>/index.html), else None.
+    """
+    import podcast_api
+    path = os.path.abspath(file_path)
+    section_dir = os.path.dirname(path)
+    podcasts_dir = os.path.dirname(section_dir)
+    if os.path.basename(path) != "index.html" or os.path.basename(podcasts_dir) != "podcasts":
+        return None
+    section, root = os.path.basename(section_dir), os.path.dirname(podcasts_dir)
+    return (section, root) if section in podcast_api.list_sections(root) else None
+
+def record_file_change(file_path, op, index, before=None, after=None, tool=None):
+    """
+    record_change for a page the caller already wrote. Files that are not a
+    section page are not logged, and a failure to log is only reported:
+    the change itself has been made. Returns True if it was logged.
+    """
+    located = section_of(file_path)
+    if located is None:
+        return False
+    try:
+        record_change(located[0], op, index, before, after, located[1], tool)
+    except (OSError, ValueError) as e:
+        print(f"Warning: change saved, but not logged to the audit log: {e}", file=sys.stderr)
+        return False
+    return True
+
+def record_step(section, direction, labels, root=None):
+    """
+    Logs an undo/redo. It changes the section as a whole, so the record
+    carries the full state afterwards.
+    """
+    _append(root, [snapshot_record(section, root, op=direction, labels=labels)])
+
+
+# --- SEGMENTS ---
+
+def segments_dir(root=None):
+    return os.path.join(audit_dir(root), "segments")
+
+def rotate(root=None):
+    """
+    Closes the current segment and indexes it.
+    """
+    folder = segments_dir(root)
+    os.makedirs(folder, exist_ok=True)
+    current = os.path.join(audit_dir(root), "current.jsonl")
+    names = sorted(n for n in os.listdir(folder) if n.endswith(".jsonl"))
+    name = f"{int(names[-1][:-6]) + 1 if names else 1:06d}.jsonl"
+    try:
+        os.replace(current, os.path.join(folder, name))
+    except FileNotFoundError:
+        return None  # another process rotated it just now
+    load_index(root)
+    return name
+
+def _keys(record):
+    titles, authors = set(), set()
+    for fields in [record.get('before'), record.get('after')] + (record.get('episodes') or []):
+        if fields:
+            titles.add(author_key(fields['title']))
+            authors.update(author_key(a) for a in fields['authors'])
+    return titles, authors
+
+def index_segment(path):
+    """
+    Index entry of one closed segment, built in a single read.
+    """
+    entry = {'file': os.path.basename(path), 'records': 0, 'first': None, 'last': None,
+             'sections': set(), 'titles': set(), 'authors': set(), 'offsets': []}
+    offset = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            record = json.loads(line)
+            if entry['records'] % SPARSE_EVERY == 0:
+                # Max time of everything before this offset: seeking here for
+                # `since` > that value skips nothing that could match
+                entry['offsets'].append([entry['last'] or 0, offset])
+            t = record['time']
+            entry['first'] = t if entry['first'] is None else min(entry['first'], t)
+            entry['last'] = t if entry['last'] is None else max(entry['last'], t)
+            entry['sections'].add(record['section'])
+            titles, authors = _keys(record)
+            entry['titles'] |= titles
+            entry['authors'] |= authors
+            entry['records'] += 1
+            offset += len(line)
+    for key in ('sections', 'titles', 'authors'):
+        entry[key] = sorted(entry[key])
+    return entry
+
+def load_index(root=None):
+    """
+    Index of the closed segments; segments missing from it are indexed now.
+    """
+    path = os.path.join(audit_dir(root), "index.json")
+    index = _load_json(path, {'segments': []})
+    folder = segments_dir(root)
+    known = {s['file'] for s in index['segments']}
+    names = sorted(n for n in os.listdir(folder) if n.endswith(".jsonl")) if os.path.isdir(folder) else []
+    missing = [n for n in names if n not in known]
+    if missing:
+        index['segments'] += [index_segment(os.path.join(folder, n)) for n in missing]
+        index['segments'].sort(key=lambda s: s['file'])
+        _save_json(path, index)
+    return index
+
+
+# --- QUERIES ---
+
+def parse_time(value):
+    """
+    Seconds since the epoch from a number or an ISO date ("2026-10-01", "2026-10-01 12:00").
+    """
+    if value is None or isinstance(value, (int, float)):
+        return value
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.datetime.fromisoformat(value.strip()).timestamp()
+    except ValueError:
+        raise ValueError(f"Invalid time: {value!r} (expected e.g. 2026-10-01 or 2026-10-01 12:00)")
+
+def _matches(record, section, title, author, op, since, until):
+    if section and record['section'] != section:
+        return False
+    if op and record['op'] != op:
+        return False
+    if since is not None and record['time'] < since:
+        return False
+    if until is not None and record['time'] > until:
+        return False
+    if title or author:
+        titles, authors = _keys(record)
+        if record['op'] not in ('add', 'update', 'delete'):
+            return False  # snapshots mention every episode; they are not changes to it
+        if title and title not in titles:
+            return False
+        if author and author not in authors:
+            return False
+    return True
+
+def _read(path, offset=0):
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def _segment_candidates(index, section, title, author, since, until):
+    for entry in index['segments']:
+        if since is not None and entry['last'] < since:
+            continue
+        if until is not None and entry['first'] > until:
+            continue
+        if section and section not in entry['sections']:
+            continue
+        if title and title not in entry['titles']:
+            continue
+        if author and author not in entry['authors']:
+            continue
+        offset = 0
+        if since is not None:
+            maxima = [m for m, _ in entry['offsets']]
+            point = bisect.bisect_left(maxima, since) - 1
+            offset = entry['offsets'][point][1] if point >= 0 else 0
+        yield entry['file'], offset
+
+def iter_records(root=None, section=None, title=None, author=None, op=None, since=None, until=None):
+    """
+    Matching records, oldest first. title/author match across spellings.
+    """
+    title = author_key(title) if title else None
+    author = author_key(author) if author else None
+    since, until = parse_time(since), parse_time(until)
+    index = load_index(root)
+    paths = [(os.path.join(segments_dir(root), name), offset)
+             for name, offset in _segment_candidates(index, section, title, author, since, until)]
+    current = os.path.join(audit_dir(root), "current.jsonl")
+    if os.path.exists(current):
+        paths.append((current, 0))
+    for path, offset in paths:
+        for record in _read(path, offset):
+            if _matches(record, section, title, author, op, since, until):
+                yield record
+
+@timed("audit.query")
+def query(root=None, section=None, title=None, author=None, op=None, since=None, until=None, limit=50):
+    """
+    The newest `limit` matching changes, newest first, with readable times.
+    """
+    records = list(iter_records(root, section, title, author, op, since, until))
+    records.reverse()
+    if limit:
+        records = records[:limit]
+    for record in records:
+        record['when'] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record['time']))
+        record.pop('episodes', None)
+    return records
+
+
+# --- REPLAY ---
+
+def _apply_batch(episodes, records):
+    # Deletes refer to the section before the batch, updates and adds to after it
+    for r in sorted((r for r in records if r['op'] == 'delete'), key=lambda r: -r['index']):
+        del episodes[r['index']]
+    for r in records:
+        if r['op'] == 'update':
+            episodes[r['index']] = r['after']
+    for r in sorted((r for r in records if r['op'] == 'add'), key=lambda r: r['index']):
+        episodes.insert(r['index'], r['after'])
+
+@timed("audit.replay")
+def replay(section, until=None, root=None):
+    """
+    The episodes of a section as they were at `until` (default: now),
+    rebuilt from the latest snapshot before it and the changes after that.
+    Only changes that were logged are known; pages edited by hand in
+    between make the result drift until the next snapshot.
+    """
+    until = parse_time(until)
+    episodes = None
+    batch, pending = None, []
+    for record in iter_records(root, section=section, until=until):
+        if record['batch'] != batch:
+            if episodes is not None:
+                _apply_batch(episodes, pending)
+            batch, pending = record['batch'], []
+        if 'episodes' in record:
+            episodes, pending = list(record['episodes']), []
+        else:
+            pending.append(record)
+    if episodes is None:
+        raise ValueError(f"No snapshot of '{section}' logged before that time")
+    _apply_batch(episodes, pending)
+    return [{'index': i, **fields} for i, fields in enumerate(episodes)]
@@ -0,0 +1,383 @@
+import os
+import re
+import json
+import hashlib
+
+import podcast_api
+from podcast_core import author_key, canonical_url, clean_name, episode_fingerprints
+from podcast_timing import timed
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_NAME = ".author-index"
+PAGES_DIR = "podcasts/authors"   # published path of the generated author pages
+INDEX_VERSION = 2
+
+# Placeholder written for episodes without authors, not a person
+ANONYMOUS = author_key("Anonym")
+
+# .author-index/index.json:
+#   sections      section -> {'signature': [size, mtime_ns] of the page, 'episodes': [episode ids in page order]}
+#   episodes      id -> {'section', 'fields'}
+#   authors       author_key -> {'names': {spelling: count}, 'episodes': [ids]}
+#   sources       canonical_url -> {'names': {spelling: count}, 'episodes': [ids]}
+#   fingerprints  podcast_core.episode_fingerprints key -> {'names': {title: count}, 'episodes': [ids]}
+#   dirty         author keys whose page has to be rendered again
+#
+# Commits through podcast_api update it episode by episode (see watch());
+# pages changed by other means are found by their signature and rescanned.
+
+
+# --- STORAGE ---
+
+def index_dir(root=None):
+    return os.path.join(root or SCRIPT_DIR, INDEX_NAME)
+
+def empty_index():
+    return {'v': INDEX_VERSION, 'next_id': 0, 'sections': {}, 'episodes': {},
+            'authors': {}, 'sources': {}, 'fingerprints': {}, 'dirty': []}
+
+# Loaded indexes per site root, with the signature of index.json they match,
+# so a long-running process (the dashboard) parses the file only once
+_loaded = {}
+
+def index_path(root=None):
+    return os.path.join(index_dir(root), "index.json")
+
+def load_index(root=None):
+    path = index_path(root)
+    cached = _loaded.get(path)
+    try:
+        if cached and cached[0] == page_signature(path):
+            return cached[1]
+        with open(path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if index.get('v') == INDEX_VERSION:
+            index['dirty'] = set(index['dirty'])
+            _loaded[path] = (page_signature(path), index)
+            return index
+    except (OSError, ValueError):
+        pass
+    index = empty_index()
+    index['dirty'] = set()
+    return index
+
+def save_index(index, root=None):
+    path = index_path(root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({**index, 'dirty': sorted(index['dirty'])}, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+    _loaded[path] = (page_signature(path), index)
+
+def current_index(root=None):
+    """
+    The index, brought up to date with the pages (and saved if that changed it).
+    """
+    index, rescanned = refresh(root)
+    if rescanned or not os.path.exists(index_path(root)):
+        save_index(index, root)
+    return index
+
+def page_signature(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+# --- EPISODES ---
+
+def _link(mapping, key, name, episode_id):
+    entry = mapping.setdefault(key, {'names': {}, 'episodes': []})
+    entry['names'][name] = entry['names'].get(name, 0) + 1
+    entry['episodes'].append(episode_id)
+
+def _unlink(mapping, key, name, episode_id):
+    entry = mapping.get(key)
+    if not entry:
+        return
+    if episode_id in entry['episodes']:
+        entry['episodes'].remove(episode_id)
+    entry['names'][name] = entry['names'].get(name, 1) - 1
+    if entry['names'][name] <= 0:
+        del entry['names'][name]
+    if not entry['episodes']:
+        del mapping[key]
+
+def _keys(fields):
+    authors = [(author_key(a), clean_name(a)) for a in fields['authors']]
+    sources = [(canonical_url(s), clean_name(s)) for s in fields['sources']]
+    # An author listed twice on one card still counts once
+    return ({k: n for k, n in reversed(authors) if k and k != ANONYMOUS},
+            {k: n for k, n in reversed(sources) if k})
+
+def add_episode(index, section, fields):
+    episode_id = str(index['next_id'])
+    index['next_id'] += 1
+    fields = {k: fields[k] for k in podcast_api.FIELDS}
+    index['episodes'][episode_id] = {'section': section, 'fields': fields}
+    authors, sources = _keys(fields)
+    for key, name in authors.items():
+        _link(index['authors'], key, name, episode_id)
+        index['dirty'].add(key)
+    for key, name in sources.items():
+        _link(index['sources'], key, name, episode_id)
+    for key in episode_fingerprints(fields['title'], fields['authors'], fields['link']):
+        _link(index['fingerprints'], key, fields['title'], episode_id)
+    return episode_id
+
+def remove_episode(index, episode_id):
+    episode = index['episodes'].pop(episode_id)
+    authors, sources = _keys(episode['fields'])
+    for key, name in authors.items():
+        _unlink(index['authors'], key, name, episode_id)
+        index['dirty'].add(key)
+    for key, name in sources.items():
+        _unlink(index['sources'], key, name, episode_id)
+    fields = episode['fields']
+    for key in episode_fingerprints(fields['title'], fields['authors'], fields['link']):
+        _unlink(index['fingerprints'], key, fields['title'], episode_id)
+
+def _fields(podcast):
+    return {k: podcast[k] for k in podcast_api.FIELDS}
+
+
+# --- SECTIONS ---
+
+def refresh_section(index, section, root=None):
+    """
+    Re-reads one page and replaces all of its episodes in the index.
+    """
+    for episode_id in index['sections'].pop(section, {'episodes': []})['episodes']:
+        remove_episode(index, episode_id)
+    path, _, podcasts = podcast_api.read_section(section, root)
+    index['sections'][section] = {
+        'signature': page_signature(path),
+        'episodes': [add_episode(index, section, _fields(p)) for p in podcasts],
+    }
+
+@timed("authors.refresh")
+def refresh(root=None, index=None):
+    """
+    Brings the index up to date with the pages. Only pages whose size or
+    modification time changed since they were indexed are parsed again.
+    Returns (index, rescanned sections).
+    """
+    index = index or load_index(root)
+    sections = podcast_api.list_sections(root)
+    rescanned = []
+    for section in sections:
+        known = index['sections'].get(section)
+        path = podcast_api.storage_path(section, root)
+        if not known or known['signature'] != page_signature(path):
+            refresh_section(index, section, root)
+            rescanned.append(section)
+    for section in set(index['sections']) - set(sections):
+        for episode_id in index['sections'].pop(section)['episodes']:
+            remove_episode(index, episode_id)
+        rescanned.append(section)
+    return index, rescanned
+
+def apply_results(index, section, results, root=None):
+    """
+    Applies one committed batch of a section episode by episode. The old
+    fields of every touched episode are checked against the index first;
+    if anything disagrees (or the card count is off afterwards) the
+    section is rescanned instead.
+    """
+    known = index['sections'].get(section)
+    path = podcast_api.storage_path(section, root)
+    if not known or any(r['op'] == 'reload' for r in results):
+        refresh_section(index, section, root)
+        return False
+
+    ids = known['episodes']
+    fields_of = lambda i: index['episodes'][ids[i]]['fields']
+    before = lambda r: {k: r['before'][k] for k in podcast_api.FIELDS}
+    deleted = sorted(r['index'] for r in results if r['op'] == 'delete')
+    kept = [i for i in range(len(ids)) if i not in set(deleted)]
+    adds = [r for r in results if r['op'] == 'add']
+    updates = [(kept[r['index']] if r['index'] < len(kept) else None, r) for r in results if r['op'] == 'update']
+
+    consistent = (all(r['index'] < len(ids) and fields_of(r['index']) == before(r)
+                      for r in results if r['op'] == 'delete')
+                  and all(i is not None and fields_of(i) == before(r) for i, r in updates)
+                  and [r['index'] for r in adds] == list(range(len(kept), len(kept) + len(adds))))
+    if consistent:
+        new_ids = list(ids)
+        for i, r in updates:
+            remove_episode(index, ids[i])
+            new_ids[i] = add_episode(index, section, r['fields'])
+        for i in deleted:
+            remove_episode(index, ids[i])
+        new_ids = [new_ids[i] for i in kept] + [add_episode(index, section, r['fields']) for r in adds]
+        if podcast_api.count_episodes(section, root) == len(new_ids):
+            known['episodes'] = new_ids
+            known['signature'] = page_signature(path)
+            return True
+        known['episodes'] = new_ids
+    refresh_section(index, section, root)
+    return False
+
+def watch(root=None):
+    """
+    Keeps an existing index current with every podcast_api commit of this
+    process. Without an index nothing is registered; the next build creates it.
+    """
+    if not os.path.exists(index_path(root)):
+        return None
+
+    def on_commit(results):
+        index = load_index(root)
+        by_section = {}
+        for r in results:
+            by_section.setdefault(r['section'], []).append(r)
+        for section, items in by_section.items():
+            apply_results(index, section, items, root)
+        save_index(index, root)
+
+    podcast_api.add_commit_hook(on_commit)
+    return on_commit
+
+
+# --- QUERIES ---
+
+def display_name(entry):
+    """
+    The most used spelling of an author or source.
+    """
+    return min(entry['names'], key=lambda name: (-entry['names'][name], name)) if entry['names'] else ""
+
+def episode_positions(index):
+    return {episode_id: (section, position)
+            for section, known in index['sections'].items()
+            for position, episode_id in enumerate(known['episodes'])}
+
+def listing(kind, root=None):
+    """
+    Authors or sources with their spellings and episodes, most episodes first.
+    """
+    index = current_index(root)
+    positions = episode_positions(index)
+    out = []
+    for key, entry in index[kind].items():
+        episodes = sorted(entry['episodes'], key=positions.get)
+        out.append({'name': display_name(entry), 'key': key, 'spellings': sorted(entry['names']),
+                    'episodes': [{'section': positions[e][0], 'index': positions[e][1],
+                                  'title': index['episodes'][e]['fields']['title']} for e in episodes]})
+    out.sort(key=lambda a: (-len(a['episodes']), a['key']))
+    return out
+
+
+# --- PAGES ---
+
+def author_slug(key):
+    # Plain one-word names keep a readable file name; anything else gets a hash
+    slug = re.sub(r'[^a-z0-9]+', '-', key).strip('-')
+    if slug != key:
+        slug = f"{slug or 'autor'}-{hashlib.sha1(key.encode('utf-8')).hexdigest()[:6]}"
+    return slug
+
+PAGE_TEMPLATE = '''<!DOCTYPE html>
+<html lang="de">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title}</title>
+    <link rel="apple-touch-icon" sizes="57x57" href="../../favicon/apple-touch-icon-57x57.png">
+    <link rel="icon" type="image/png" sizes="32x32" href="../../favicon/favicon-32x32.png">
+    <link rel="icon" type="image/png" sizes="16x16" href="../../favicon/favicon-16x16.png">
+    <link rel="stylesheet" href="../../style.css">
+</head>
+<body>
+
+<header>
+    <h1>{title}</h1>
+    <p>{subtitle}</p>
+</header>
+
+{main}
+{body}
+</main>
+
+<footer>
+    <p><a href="{back}">Zurück</a> &middot; &copy; 2026 Panumic.</p>
+</footer>
+{scripts}</body>
+</html>
+'''
+
+def section_label(section):
+    return section[:1].upper() + section[1:]
+
+def render_author_page(index, key, positions, root=None):
+    entry = index['authors'][key]
+    name = display_name(entry)
+    episodes = sorted(entry['episodes'], key=positions.get)
+    cards = []
+    for episode_id in episodes:
+        episode = index['episodes'][episode_id]
+        section = episode['section']
+        block = podcast_api.render_block(episode['fields'], root)
+        label = f'<p class="podcast-section"><a href="../{section}/">{section_label(section)}</a></p>'
+        cards.append(block.replace("</h3>", "</h3>\n    " + label, 1))
+    sections = sorted({index['episodes'][e]['section'] for e in episodes})
+    count = f"{len(episodes)} Episode" + ("n" if len(episodes) != 1 else "")
+    return PAGE_TEMPLATE.format(title=f"Podcasts von {name}",
+                                subtitle=f"{count} aus {', '.join(map(section_label, sections))}",
+                                main='<main class="podcast-grid">', body="\n\n".join(cards), back="./",
+                                scripts='<script src="../waveform.js" defer></script>\n')
+
+def render_overview(index):
+    entries = sorted(index['authors'].items(), key=lambda item: display_name(item[1]).casefold())
+    items = "\n".join(f'        <li><a href="{author_slug(key)}.html">{display_name(entry)}</a> '
+                      f'({len(entry["episodes"])})</li>' for key, entry in entries)
+    return PAGE_TEMPLATE.format(title="Autorinnen und Autoren", subtitle=f"{len(entries)} Personen in allen Klassen",
+                                main="<main>", body=f'    <ul class="author-list">\n{items}\n    </ul>',
+                                back="../", scripts="")
+
+def _write_if_changed(path, text):
+    data = text.encode('utf-8')
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+    except OSError:
+        pass
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return True
+
+@timed("authors.build_pages")
+def build_pages(root=None):
+    """
+    Refreshes the index and renders the pages of the authors whose episodes
+    changed since the last build. Returns
+      'files' - published path (podcasts/authors/...) -> page in .author-index/pages
+      plus counts for the build report.
+    """
+    index, rescanned = refresh(root)
+    pages = os.path.join(index_dir(root), "pages")
+    positions = episode_positions(index)
+
+    files = {}
+    rendered = 0
+    for key in index['authors']:
+        path = os.path.join(pages, author_slug(key) + ".html")
+        if key in index['dirty'] or not os.path.exists(path):
+            rendered += _write_if_changed(path, render_author_page(index, key, positions, root))
+        files[f"{PAGES_DIR}/{author_slug(key)}.html"] = path
+    overview = os.path.join(pages, "index.html")
+    _write_if_changed(overview, render_overview(index))
+    files[f"{PAGES_DIR}/index.html"] = overview
+
+    # Pages of authors who no longer have episodes
+    keep = set(files.values())
+    for name in os.listdir(pages):
+        if os.path.join(pages, name) not in keep:
+            os.remove(os.path.join(pages, name))
+
+    index['dirty'] = set()
+    save_index(index, root)
+    return {'files': files, 'authors': len(index['authors']), 'sources': len(index['sources']),
+            'rendered': rendered, 'rescanned': rescanned}
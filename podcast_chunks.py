@@ -0,0 +1,69 @@
+import hashlib
+
+from podcast_timing import timed
+
+# Content-defined chunking: chunk boundaries come from a rolling (Gear) hash
+# over the bytes themselves, not from fixed offsets. Inserting or removing a
+# few bytes (a new ID3 tag, a trimmed intro) only changes the chunks around
+# the edit; every other chunk keeps its boundaries and therefore its hash.
+MIN_CHUNK = 16 * 1024
+AVERAGE_BITS = 16                 # boundary when 16 hash bits are 0: ~64 KB chunks
+MAX_CHUNK = 256 * 1024
+READ_SIZE = 1 << 20
+
+# The top bits of a Gear hash depend on the last 32 bytes, the low bits on
+# only the last few, so the boundary test looks at the top bits
+MASK = ((1 << AVERAGE_BITS) - 1) << (32 - AVERAGE_BITS)
+
+# 256 fixed pseudo-random 32-bit values, the same on every machine
+GEAR = tuple(int.from_bytes(hashlib.sha256(bytes([i])).digest()[:4], 'big') for i in range(256))
+
+
+def find_boundary(data, start, end):
+    """
+    Returns the end of the chunk starting at `start` (at most `end`).
+    The first MIN_CHUNK bytes are never a boundary, so they are skipped.
+    """
+    limit = min(end, start + MAX_CHUNK)
+    pos = start + MIN_CHUNK
+    if pos >= limit:
+        return limit
+    gear = GEAR
+    h = 0
+    # The hash only depends on the last 32 bytes, so start just before MIN_CHUNK
+    for byte in data[pos - 32:pos]:
+        h = ((h << 1) + gear[byte]) & 0xFFFFFFFF
+    for byte in data[pos:limit]:
+        h = ((h << 1) + gear[byte]) & 0xFFFFFFFF
+        pos += 1
+        if not h & MASK:
+            return pos
+    return limit
+
+def iter_chunks(f):
+    """
+    Yields the content-defined chunks of a binary file object.
+    """
+    buffer = b""
+    pos = 0
+    eof = False
+    while True:
+        # Keep at least MAX_CHUNK bytes ahead, so every boundary is found
+        while not eof and len(buffer) - pos < MAX_CHUNK:
+            data = f.read(READ_SIZE)
+            eof = not data
+            buffer = buffer[pos:] + data
+            pos = 0
+        if pos >= len(buffer):
+            return
+        end = find_boundary(buffer, pos, len(buffer))
+        yield buffer[pos:end]
+        pos = end
+
+@timed("chunks.hashes")
+def chunk_hashes(path):
+    """
+    SHA-256 (hex, shortened to 16 characters) of every chunk of a file, in order.
+    """
+    with open(path, 'rb') as f:
+        return [hashlib.sha256(chunk).hexdigest()[:16] for chunk in iter_chunks(f)]
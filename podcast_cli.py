@@ -0,0 +1,360 @@
+import sys
+import json
+import argparse
+
+import podcast_api
+from podcast_timing import run_main
+
+# Non-interactive counterpart to add_podcast.py / manage_podcast.py.
+# Every command prints JSON on stdout; errors print {"error": ...} and exit with 1.
+#
+#   python podcast_cli.py list m2a
+#   python podcast_cli.py add s2e --title "Jazz" --link https://... --author Anna --author Ben
+#   python podcast_cli.py update m2a 3 --details "Neue Beschreibung"
+#   python podcast_cli.py bulk fixes.json
+#   python podcast_cli.py move m2a:3 m2a:5 --to s2e
+#   python podcast_cli.py undo m2a --steps 2
+#   python podcast_cli.py mirror --workers 8
+#   python podcast_cli.py add m2a --title "Jazz" --audio-file ~/Downloads/jazz.wav
+#   python podcast_cli.py shard m2a --size 200
+#   python podcast_cli.py audit --title Reggae --op delete
+#   python podcast_cli.py validate
+#   python podcast_cli.py snapshot create
+#   python podcast_cli.py replace "http://archive.org" "https://archive.org" --field link --apply
+#   python podcast_cli.py upload ~/Aufnahmen/jazz.mp3 --bucket ksasz-m2a-podcasts
+#   python podcast_cli.py pdfs --text "podcasts/pdfs/Heavy Metal.pdf"
+
+
+def emit(data):
+    json.dump(data, sys.stdout, ensure_ascii=False, indent=2)
+    sys.stdout.write("\n")
+
+def fields_from_args(args):
+    """
+    Collects the episode fields given on the command line (only the ones set).
+    """
+    data = json.loads(args.json) if args.json else {}
+    for key in ('title', 'details', 'link'):
+        value = getattr(args, key)
+        if value is not None:
+            data[key] = value
+    if args.author is not None:
+        data['authors'] = args.author
+    if args.source is not None:
+        data['sources'] = args.source
+    if args.audio_file:
+        import podcast_transcode
+        data['link'] = podcast_transcode.transcode([args.audio_file], args.root)[0]['link']
+    if args.upload_file:
+        import podcast_upload
+        data['link'] = podcast_upload.upload(args.upload_file, args.root, args.bucket,
+                                             progress=upload_progress)['url']
+    return data
+
+def upload_progress(p):
+    print(f"part {p['part']:>5}  ({p['done']}/{p['parts']})", file=sys.stderr)
+
+def add_field_arguments(parser):
+    parser.add_argument("--title")
+    parser.add_argument("--details")
+    parser.add_argument("--link", help="Audio URL (archive.org or moodle)")
+    parser.add_argument("--author", action="append", help="Repeat for several authors")
+    parser.add_argument("--source", action="append", help="Repeat for several sources")
+    parser.add_argument("--json", help="Fields as a JSON object (flags override it)")
+    parser.add_argument("--audio-file", help="Local audio file: transcode it and link the result")
+    parser.add_argument("--upload-file", help="Local audio file: upload it (podcast_upload.py) and link the URL")
+    parser.add_argument("--bucket", help="Bucket / archive.org item for --upload-file (default: PODCAST_S3_BUCKET)")
+
+def read_operations(path):
+    if path == "-":
+        return json.load(sys.stdin)
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Scriptable podcast manager with JSON output.")
+    parser.add_argument("--root", help="Site root (default: the folder of this script)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("sections", help="List all sections")
+
+    p = sub.add_parser("list", help="List the episodes of a section")
+    p.add_argument("section")
+
+    p = sub.add_parser("get", help="Show one episode")
+    p.add_argument("section")
+    p.add_argument("index", type=int)
+
+    p = sub.add_parser("add", help="Append an episode")
+    p.add_argument("section")
+    add_field_arguments(p)
+    p.add_argument("--allow-duplicate", action="store_true", help="Add even if the episode already exists")
+
+    p = sub.add_parser("update", help="Change fields of an episode")
+    p.add_argument("section")
+    p.add_argument("index", type=int)
+    add_field_arguments(p)
+
+    p = sub.add_parser("delete", help="Remove an episode")
+    p.add_argument("section")
+    p.add_argument("index", type=int)
+
+    p = sub.add_parser("bulk", help="Apply a JSON list of operations (one write per section)")
+    p.add_argument("file", help="JSON file with [{op, section, index, data}, ...] or - for stdin")
+
+    for name, verb in (("move", "Move"), ("copy", "Copy")):
+        p = sub.add_parser(name, help=f"{verb} episodes to another section (all files change or none)")
+        p.add_argument("episodes", nargs="+", metavar="SECTION:INDEX")
+        p.add_argument("--to", required=True, dest="target", help="Target section")
+
+    for name in ("undo", "redo"):
+        p = sub.add_parser(name, help=f"{name.capitalize()} the last change(s) of a section")
+        p.add_argument("section")
+        p.add_argument("--steps", type=int, default=1)
+
+    p = sub.add_parser("history", help="Show the undo/redo history of a section")
+    p.add_argument("section")
+    p.add_argument("--limit", type=int, default=20)
+
+    p = sub.add_parser("mirror", help="Download all audio files into the local mirror (.audio-mirror)")
+    p.add_argument("sections", nargs="*", help="Sections to mirror (default: all)")
+    p.add_argument("--workers", type=int, default=4, help="Parallel downloads (default: 4)")
+    p.add_argument("--timeout", type=float, default=30, help="Seconds per request (default: 30)")
+    p.add_argument("--retries", type=int, default=3, help="Attempts per file, each resuming the last (default: 3)")
+    p.add_argument("--no-check", action="store_true", help="Trust mirrored files without asking the server")
+    p.add_argument("--verify", action="store_true", help="Re-hash mirrored files and re-fetch damaged ones")
+
+    p = sub.add_parser("peaks", help="Precompute waveform peaks for episodes with local or mirrored audio")
+    p.add_argument("sections", nargs="*", help="Sections to process (default: all)")
+    p.add_argument("--workers", type=int, default=4)
+
+    p = sub.add_parser("search", help="Search all sections like the search box on podcasts/index.html")
+    p.add_argument("query")
+    p.add_argument("--limit", type=int, default=20)
+
+    sub.add_parser("authors", help="List authors across all sections (spellings merged)")
+    sub.add_parser("sources", help="List sources across all sections (URLs canonicalized)")
+
+    p = sub.add_parser("duplicates", help="Report duplicate episodes across all sections")
+    p.add_argument("--audio", action="store_true", help="Also compare mirrored/local audio files by content")
+    p.add_argument("--workers", type=int, default=4)
+    p.add_argument("--threshold", type=float, default=0.5, help="Share of equal chunks for similar audio")
+
+    p = sub.add_parser("migrate", help="Rewrite legacy cards into the current card format")
+    p.add_argument("sections", nargs="*", help="Sections to migrate (default: all)")
+    p.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    p.add_argument("--diff", action="store_true", help="Print a unified diff instead of the JSON report")
+    p.add_argument("--all", action="store_true", help="Also re-render cards already in the current format")
+
+    p = sub.add_parser("validate", help="Check every card and page; only changed cards are checked again")
+    p.add_argument("sections", nargs="*", help="Sections to check (default: all)")
+    p.add_argument("--workers", type=int, help="Parallel processes (default: one per CPU)")
+    p.add_argument("--no-cache", action="store_true", help="Check every card again")
+
+    p = sub.add_parser("replace", help="Find and replace in episode fields across sections (preview unless --apply)")
+    p.add_argument("pattern")
+    p.add_argument("replacement")
+    p.add_argument("--field", action="append", choices=podcast_api.FIELDS, help="Repeatable (default: all fields)")
+    p.add_argument("--section", action="append", help="Repeatable (default: all sections)")
+    p.add_argument("--regex", action="store_true", help="Pattern is a regular expression (\\1 etc. in the replacement)")
+    p.add_argument("-i", "--ignore-case", action="store_true")
+    p.add_argument("--apply", action="store_true", help="Write the changes (otherwise only the preview diff)")
+
+    p = sub.add_parser("upload", help="Upload audio files to archive.org (or another S3 endpoint); resumes")
+    p.add_argument("files", nargs="*")
+    p.add_argument("--bucket", help="Bucket / archive.org item (default: PODCAST_S3_BUCKET)")
+    p.add_argument("--key", help="Name in the bucket (default: the file name; only with one file)")
+    p.add_argument("--workers", type=int, default=4, help="Parts sent at the same time")
+    p.add_argument("--part-size", type=int, default=16, help="Part size in MB (at least 5)")
+    p.add_argument("--pending", action="store_true", help="List interrupted uploads instead")
+
+    p = sub.add_parser("pdfs", help="Extract text, page count and thumbnail of the PDF sources (cached)")
+    p.add_argument("--workers", type=int, help="Worker processes (default: one per CPU)")
+    p.add_argument("--text", metavar="PDF", help="Print the extracted text of this PDF instead")
+
+    p = sub.add_parser("snapshot", help="Deduplicated backups of the site tree")
+    snap = p.add_subparsers(dest="action", required=True)
+    q = snap.add_parser("create", help="Back up the site (only changed chunks are stored)")
+    q.add_argument("--label", default="", help="Labelled snapshots are never pruned")
+    snap.add_parser("list", help="List snapshots")
+    q = snap.add_parser("restore", help="Write the files of a snapshot back")
+    q.add_argument("id")
+    q.add_argument("--to", help="Target folder (default: the site itself)")
+    q.add_argument("--path", action="append", help="Only this file or folder (repeatable)")
+    q = snap.add_parser("prune", help="Delete snapshots outside the retention policy and unused chunks")
+    q.add_argument("--keep-last", type=int, default=7)
+    q.add_argument("--keep-daily", type=int, default=30)
+    q.add_argument("--keep-weekly", type=int, default=12)
+    q.add_argument("--keep-monthly", type=int, default=12)
+    q.add_argument("--dry-run", action="store_true")
+    q = snap.add_parser("export", help="Write a snapshot as a zip file")
+    q.add_argument("id")
+    q.add_argument("output", help="Zip file, or - for stdout")
+    q.add_argument("--path", action="append", help="Only this file or folder (repeatable)")
+
+    p = sub.add_parser("audit", help="Query the log of episode changes (newest first)")
+    p.add_argument("--section")
+    p.add_argument("--title", help="Episode title (any spelling)")
+    p.add_argument("--author")
+    p.add_argument("--op", choices=["add", "update", "delete", "snapshot", "undo", "redo"])
+    p.add_argument("--since", help="e.g. 2026-09-01 or '2026-09-01 14:00'")
+    p.add_argument("--until")
+    p.add_argument("--limit", type=int, default=50)
+    p = sub.add_parser("replay", help="Show a section as it was at a past time, rebuilt from the audit log")
+    p.add_argument("section")
+    p.add_argument("--until", help="Point in time (default: now)")
+
+    p = sub.add_parser("shard", help="Split a section into shard files (or re-split a sharded one)")
+    p.add_argument("section")
+    p.add_argument("--size", type=int, default=200, help="Episodes per shard (default: 200)")
+    p = sub.add_parser("unshard", help="Put the shards of a section back into its page")
+    p.add_argument("section")
+
+    p = sub.add_parser("transcode", help="Loudness-normalize audio files into Opus + AAC (needs ffmpeg)")
+    p.add_argument("files", nargs="+")
+    p.add_argument("--workers", type=int, help="Parallel ffmpeg processes (default: half the CPUs)")
+    p.add_argument("--output-dir", help="Folder inside the site root (default: podcasts/audio)")
+
+    return parser
+
+def run_command(args):
+    root = args.root
+    if args.command == "sections":
+        return podcast_api.list_sections(root)
+    if args.command == "list":
+        return podcast_api.list_podcasts(args.section, root)
+    if args.command == "get":
+        return podcast_api.get_podcast(args.section, args.index, root)
+    if args.command == "add":
+        data = fields_from_args(args)
+        if not args.allow_duplicate:
+            import podcast_duplicates
+            matches = podcast_duplicates.find_duplicates(data, root)
+            if matches:
+                raise ValueError(f"Already in the archive: {podcast_duplicates.describe(matches)} "
+                                 "(use --allow-duplicate to add it anyway)")
+        return podcast_api.add_podcast(args.section, data, root)
+    if args.command == "update":
+        return podcast_api.update_podcast(args.section, args.index, fields_from_args(args), root)
+    if args.command == "delete":
+        return podcast_api.delete_podcast(args.section, args.index, root)
+    if args.command == "bulk":
+        return podcast_api.bulk_apply(read_operations(args.file), root)
+    if args.command in ("move", "copy"):
+        return podcast_api.transfer_podcasts(args.episodes, args.target, args.command, root)
+    if args.command in ("undo", "redo"):
+        return podcast_api.step_history(args.section, args.command, args.steps, root)
+    if args.command == "history":
+        return podcast_api.history(args.section, args.limit, root)
+    if args.command == "mirror":
+        import podcast_mirror
+        def progress(r):
+            print(f"{r['status']:>11}  {r['url']}" + (f"  ({r['error']})" if r.get('error') else ""), file=sys.stderr)
+        return podcast_mirror.mirror(args.sections, root, workers=args.workers, check=not args.no_check,
+                                     verify=args.verify, timeout=args.timeout, retries=args.retries,
+                                     progress=progress)
+    if args.command == "transcode":
+        import podcast_transcode
+        return podcast_transcode.transcode(args.files, root, args.output_dir,
+                                           args.workers or podcast_transcode.DEFAULT_WORKERS)
+    if args.command == "peaks":
+        import podcast_peaks
+        return podcast_peaks.generate(args.sections, root, args.workers)
+    if args.command == "search":
+        import podcast_search
+        return podcast_search.search(args.query, root, args.limit)
+    if args.command in ("authors", "sources"):
+        import podcast_authors
+        return podcast_authors.listing(args.command, root)
+    if args.command == "duplicates":
+        import podcast_duplicates
+        return podcast_duplicates.scan(root, args.audio, args.workers, args.threshold)
+    if args.command == "migrate":
+        import podcast_migrate
+        reports = podcast_migrate.migrate(args.sections, root, dry_run=args.dry_run, rerender=args.all)
+        if args.diff:
+            return "".join(podcast_migrate.unified_diff(r) for r in reports)
+        for r in reports:
+            r['changes'] = [title for _, _, title in r['changes']]
+        return reports
+    if args.command == "validate":
+        import podcast_validate
+        return podcast_validate.validate(args.sections, root, args.workers, not args.no_cache)
+    if args.command == "replace":
+        import podcast_replace
+        result = podcast_replace.replace(args.pattern, args.replacement, args.field, args.section, root,
+                                         args.regex, args.ignore_case, args.apply)
+        for change in result['changes']:
+            print("\n".join(podcast_replace.diff_lines(change)), file=sys.stderr)
+        return result
+    if args.command == "upload":
+        import podcast_upload
+        if args.pending:
+            return podcast_upload.pending(root)
+        if not args.files:
+            raise ValueError("No files to upload")
+        if args.key and len(args.files) > 1:
+            raise ValueError("--key needs exactly one file")
+        return [podcast_upload.upload(path, root, args.bucket, args.key, args.workers, args.part_size << 20,
+                                      progress=upload_progress)
+                for path in args.files]
+    if args.command == "pdfs":
+        import podcast_pdfs
+        if args.text:
+            entry, = podcast_pdfs.process([args.text], root, args.workers).values()
+            if entry['error']:
+                raise ValueError(f"{args.text}: {entry['error']}")
+            return entry['text']
+        return podcast_pdfs.extract_all(root, args.workers)
+    if args.command == "snapshot":
+        import podcast_snapshot
+        if args.action == "create":
+            return podcast_snapshot.create(root, args.label)
+        if args.action == "list":
+            return podcast_snapshot.list_snapshots(root)
+        if args.action == "restore":
+            return podcast_snapshot.restore(args.id, args.to, args.path, root)
+        if args.action == "prune":
+            return podcast_snapshot.prune(root, args.keep_last, args.keep_daily, args.keep_weekly,
+                                          args.keep_monthly, args.dry_run)
+        result = podcast_snapshot.export_zip(args.id, args.output, args.path, root)
+        # The zip itself went to stdout
+        return "" if args.output == "-" else result
+    if args.command == "audit":
+        import podcast_audit
+        return podcast_audit.query(root, args.section, args.title, args.author, args.op,
+                                   args.since, args.until, args.limit)
+    if args.command == "replay":
+        import podcast_audit
+        return podcast_audit.replay(args.section, args.until, root)
+    if args.command == "shard":
+        import podcast_shards
+        return podcast_shards.shard_section(args.section, args.size, root)
+    if args.command == "unshard":
+        import podcast_shards
+        return podcast_shards.unshard_section(args.section, root)
+    raise ValueError(f"Unknown command: {args.command}")
+
+# Commands that write pages through podcast_api.commit
+WRITING_COMMANDS = {"replace", "add", "update", "delete", "bulk", "move", "copy", "undo", "redo", "peaks", "shard", "unshard"}
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        if args.command in WRITING_COMMANDS:
+            import podcast_authors
+            podcast_authors.watch(args.root)
+        result = run_command(args)
+    except (ValueError, IndexError, OSError, RuntimeError) as e:
+        emit({'error': str(e)})
+        return 1
+    if isinstance(result, str):
+        sys.stdout.write(result)
+    else:
+        emit(result)
+    if args.command == "validate" and result['errors']:
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(run_main(main))
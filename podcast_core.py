@@ -0,0 +1,439 @@
+import os
+import re
+import unicodedata
+from urllib.parse import urlsplit, urlunsplit, quote, unquote
+
+from podcast_timing import timed
+
+# Shared backend of add_podcast.py, manage_podcast.py, podcast_dashboard.py and
+# the headless tools (podcast_api.py, podcast_cli.py). Keep GUI imports out of here.
+
+# --- FILES ---
+
+@timed("disk.read")
+def get_file_content(file_path):
+    if not os.path.exists(file_path):
+        return None
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+@timed("disk.write")
+def save_file_content(file_path, content):
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+@timed("disk.commit")
+def commit_files(files):
+    """
+    Writes {path: content} all-or-nothing. Every file is first written to a
+    temporary file next to it, then all of them are renamed into place. If a
+    rename fails, the files already replaced are restored from hard-linked
+    backups, so either every page changes or none does.
+    """
+    staged = []    # (path, tmp_path)
+    backups = []   # hard links to the old versions
+    replaced = []  # (path, backup_path or None if the file is new)
+    try:
+        for path, content in files.items():
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            staged.append((path, tmp_path))
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+
+        for path, tmp_path in staged:
+            backup = None
+            if os.path.exists(path):
+                backup = f"{path}.{os.getpid()}.bak"
+                if os.path.exists(backup):
+                    os.remove(backup)
+                os.link(path, backup)
+                backups.append(backup)
+            os.replace(tmp_path, path)
+            replaced.append((path, backup))
+    except BaseException:
+        for path, backup in reversed(replaced):
+            if backup:
+                os.replace(backup, path)
+            else:
+                os.remove(path)
+        raise
+    finally:
+        for path, tmp_path in staged:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        for backup in backups:
+            if os.path.exists(backup):
+                os.remove(backup)
+
+
+# --- NORMALIZATION ---
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = ('utm', 'fbclid', 'gclid', 'mc_cid', 'mc_eid')
+
+def clean_name(text):
+    """
+    Unicode NFC, no control characters, single spaces: "Viktoria\u00a0 " -> "Viktoria".
+    """
+    text = unicodedata.normalize('NFC', text)
+    return " ".join("".join(c if unicodedata.category(c)[0] != 'C' else " " for c in text).split())
+
+def author_key(name):
+    """
+    The identity of an author across spellings: "  Zoë  Müller" and "zoe muller" match.
+    """
+    text = unicodedata.normalize('NFKD', clean_name(name).casefold())
+    return "".join(c for c in text if not unicodedata.combining(c)).replace("ß", "ss").strip(" .,;")
+
+def canonical_url(source):
+    """
+    The identity of a source. URLs lose what does not change the target
+    (scheme, "www.", default ports, fragments, tracking parameters,
+    escaping differences, a trailing slash); anything else is cleaned text.
+    """
+    source = clean_name(source)
+    if not source.lower().startswith(("http://", "https://")):
+        return source
+    try:
+        parts = urlsplit(source)
+        port = parts.port
+    except ValueError:
+        return source  # typed in by hand, e.g. a bad port or an unclosed [
+    host = (parts.hostname or "").lower().removeprefix("www.")
+    if port and port not in (80, 443):
+        host += f":{port}"
+    path = quote(unquote(parts.path), safe="/:@!$&'()*+,;=-._~").rstrip("/") or "/"
+    query = "&".join(pair for pair in parts.query.split("&")
+                     if pair and not pair.split("=", 1)[0].lower().startswith(TRACKING_PARAMS))
+    return urlunsplit(("https", host, path, query, ""))
+
+
+def episode_fingerprints(title, authors, link):
+    """
+    Keys under which two cards count as the same episode: the same audio
+    URL ("a:..."), or the same title by the same people ("t:...").
+    """
+    import hashlib
+    digest = lambda text: hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+    keys = {}
+    if link:
+        keys['a:' + digest(canonical_url(link))] = "same audio URL"
+    names = sorted({author_key(a) for a in authors} - {"", author_key("Anonym")})
+    if author_key(title):
+        keys['t:' + digest(author_key(title) + "|" + "|".join(names))] = "same title and authors"
+    return keys
+
+
+# --- CARDS ---
+
+# Version written into data-format by generate_html_block. Cards carrying it
+# are parsed with the fast path below, everything else with the legacy chain.
+CARD_FORMAT_VERSION = 2
+
+# Patterns are compiled on first use, so importing this module stays cheap
+# for commands that never parse a page.
+_PATTERN_SOURCES = {
+    'card': (r'(<!-- NEUE EPISODE: .*? -->\s*)?<article class="podcast-card"(?: data-format="(\d+)")?>(.*?)</article>', re.DOTALL),
+    # Canonical card fields (exactly what generate_html_block writes)
+    'title': (r'<h3>(.*?)</h3>', re.DOTALL),
+    'details': (r'<li class="podcast-item"><strong>Info:</strong> (.*?)</li>', re.DOTALL),
+    'link': (r'<source src="([^"]*)"|<a href="([^"]*)"[^>]*class="moodle-button"', 0),
+    'authors': (r'<p class="podcast-author">(.*?)</p>', 0),
+    'sources': (r'<div class="podcast-sources">.*?<ul>(.*?)</ul>', re.DOTALL),
+    'list_item': (r'<li>(.*?)</li>', re.DOTALL),
+    'href': (r'href="(.*?)"', 0),
+}
+_patterns = {}
+
+def pattern(name):
+    """
+    Returns the compiled pattern `name`, compiling it the first time it is needed.
+    """
+    compiled = _patterns.get(name)
+    if compiled is None:
+        source, flags = _PATTERN_SOURCES[name]
+        compiled = _patterns[name] = re.compile(source, flags)
+    return compiled
+
+def split_authors(text):
+    """
+    "von A, B und C" -> ["A", "B", "C"]
+    """
+    text = clean_name(text)
+    if text.startswith("von "):
+        text = text[4:]
+    parts = text.split(" und ")
+    if len(parts) > 1:
+        names = ", ".join(parts[:-1]).split(",") + [parts[-1]]
+    else:
+        names = [text]
+    return [name for name in map(clean_name, names) if name] or [text]
+
+def parse_source_items(list_html):
+    sources = []
+    for item in pattern('list_item').findall(list_html):
+        m_href = pattern('href').search(item)
+        sources.append(m_href.group(1) if m_href else item.strip())
+    return sources
+
+def parse_canonical_card(inner_html):
+    """
+    Fast path for cards in the current format: no legacy probes.
+    """
+    m = pattern('title').search(inner_html)
+    title = m.group(1).strip() if m else "Unknown Title"
+    m = pattern('details').search(inner_html)
+    details = m.group(1).strip() if m else ""
+    m = pattern('link').search(inner_html)
+    link = (m.group(1) or m.group(2)) if m else ""
+    m = pattern('authors').search(inner_html)
+    authors = split_authors(m.group(1)) if m else ["Anonym"]
+    m = pattern('sources').search(inner_html)
+    sources = parse_source_items(m.group(1)) if m else []
+    return {'title': title, 'details': details, 'link': link, 'authors': authors, 'sources': sources}
+
+def parse_legacy_card(inner_html):
+    """
+    Parses cards written by older versions of the tools (see podcast_migrate.py).
+    """
+    # Helper to extract content
+    def get_text(regex, default=""):
+        m = re.search(regex, inner_html, re.DOTALL)
+        return m.group(1).strip() if m else default
+
+    title = get_text(r'<h3>(.*?)</h3>', "Unknown Title")
+    # Remove moodle indicator from title if present
+    title = re.sub(r'<span class="moodle-indicator">.*?</span>', '', title).strip()
+
+    # Details: try structured p, fall back to generic p
+    details = get_text(r'<p class="podcast-description">(.*?)</p>')
+
+    # Fallback: check inside details/summary hidden block
+    if not details:
+        details = get_text(r'<li class="podcast-item"><strong>Info:</strong> (.*?)</li>')
+
+    if not details:
+        details = get_text(r'<p>(.*?)</p>')
+        # Filter out "Hier klicken zum Anhören" junk if present from old entries
+        if "Hier klicken" in details: details = ""
+
+    link = ""
+    # Try to find link in audio source first
+    m_link = re.search(r'<source src="([^"]*)"', inner_html)
+    if m_link:
+        link = m_link.group(1)
+    else:
+        # Try to find link in moodle button
+        m_link_btn = re.search(r'href="([^"]*)"[^>]*class="moodle-button"', inner_html)
+        if m_link_btn:
+            link = m_link_btn.group(1)
+
+    # Authors
+    authors = []
+    # New format p tag
+    m_auth_p = re.search(r'<p class="podcast-author">(.*?)</p>', inner_html)
+    if m_auth_p:
+        authors = split_authors(m_auth_p.group(1))
+    else:
+        # Check old list format
+        m_auth_ul = re.search(r'<ul class="author-list">(.*?)</ul>', inner_html, re.DOTALL)
+        if m_auth_ul:
+            authors = [x.strip() for x in re.findall(r'<li>(.*?)</li>', m_auth_ul.group(1))]
+        elif re.search(r'<li class="podcast-item"><strong>Autoren:</strong>', inner_html):
+            # Simple text extraction from li?
+            li_text = get_text(r'<li class="podcast-item"><strong>Autoren:</strong> (.*?)</li>')
+            if li_text and "<ul" not in li_text: authors = [li_text]
+
+    if not authors: authors = ["Anonym"]
+
+    # Sources: old source-list, or the podcast-sources block of newer cards
+    sources = []
+    m_source_ul = re.search(r'<ul class="source-list">(.*?)</ul>', inner_html, re.DOTALL)
+    if not m_source_ul:
+        m_source_ul = pattern('sources').search(inner_html)
+    if m_source_ul:
+        sources = parse_source_items(m_source_ul.group(1))
+
+    return {'title': title, 'details': details, 'link': link, 'authors': authors, 'sources': sources}
+
+def iter_cards(content):
+    """
+    Yields (index, match) for every card on a page without parsing its fields.
+    Match groups: 1 = episode comment, 2 = format version, 3 = inner HTML.
+    """
+    return enumerate(pattern('card').finditer(content))
+
+@timed("parse.scan_cards")
+def scan_cards(content):
+    """
+    Lightweight listing of the cards on a page: title, raw HTML and position.
+    """
+    cards = []
+    for i, match in iter_cards(content):
+        m = pattern('title').search(match.group(3))
+        cards.append({
+            'index': i,
+            'title': m.group(1).strip() if m else "Unknown Title",
+            'format': int(match.group(2)) if match.group(2) else 1,
+            'full_block': match.group(0),
+            'span': match.span(),
+            'inner_html': match.group(3)
+        })
+    return cards
+
+@timed("parse.extract_podcasts")
+def extract_podcasts(content):
+    """
+    Parses every card on a page into its fields (see FIELDS in podcast_api.py).
+    """
+    podcasts = []
+    for i, match in iter_cards(content):
+        version = int(match.group(2)) if match.group(2) else 1
+        inner_html = match.group(3)
+        if version == CARD_FORMAT_VERSION:
+            fields = parse_canonical_card(inner_html)
+        else:
+            fields = parse_legacy_card(inner_html)
+
+        podcasts.append({
+            'index': i,
+            **fields,
+            'format': version,
+            'full_block': match.group(0),
+            'span': match.span()
+        })
+    return podcasts
+
+# MIME types of the audio files episodes link to. Opus files made by
+# podcast_transcode.py always have an AAC twin (.m4a) next to them, which
+# is offered as a fallback for browsers without Opus support.
+AUDIO_TYPES = {
+    '.opus': 'audio/ogg; codecs=opus',
+    '.ogg': 'audio/ogg',
+    '.oga': 'audio/ogg',
+    '.m4a': 'audio/mp4',
+    '.mp4': 'audio/mp4',
+    '.aac': 'audio/aac',
+    '.mp3': 'audio/mpeg',
+    '.mpeg': 'audio/mpeg',
+    '.mpga': 'audio/mpeg',
+    '.wav': 'audio/wav',
+    '.flac': 'audio/flac',
+    '.webm': 'audio/webm',
+}
+AUDIO_FALLBACKS = {'.opus': '.m4a'}
+
+def audio_sources(link):
+    """
+    Returns [(url, mime type or None)] for an audio link. Unknown extensions
+    get no type, so the browser sniffs the file instead of trusting a guess.
+    """
+    path = link.split('#', 1)[0].split('?', 1)[0]
+    base, ext = os.path.splitext(path)
+    ext = ext.lower()
+    sources = [(link, AUDIO_TYPES.get(ext))]
+    fallback = AUDIO_FALLBACKS.get(ext)
+    if fallback:
+        sources.append((base + fallback + link[len(path):], AUDIO_TYPES[fallback]))
+    return sources
+
+def audio_source_tags(link, separator="\n        "):
+    return separator.join(f'<source src="{src}" type="{mime}">' if mime else f'<source src="{src}">'
+                          for src, mime in audio_sources(link))
+
+@timed("render.generate_html_block")
+def generate_html_block(title, details, link, authors, sources, peaks=None):
+    # peaks: URL of the waveform peaks (podcast_peaks.py), drawn by podcasts/waveform.js
+    # Authors Text
+    authors_text = "Anonym"
+    if authors:
+        if len(authors) == 1:
+            authors_text = f"von {authors[0]}"
+        else:
+            authors_text = f"von {', '.join(authors[:-1])} und {authors[-1]}"
+    
+    # Sources HTML
+    sources_html_block = ""
+    if sources:
+        list_items = ""
+        for s in sources:
+            s_clean = s.strip()
+            if not s_clean: continue
+            
+            if s_clean.lower().startswith("http"):
+                list_items += f'<li><a href="{s_clean}" target="_blank">{s_clean}</a></li>'
+            elif s_clean.lower().endswith(".pdf"):
+                # Handle local PDF link
+                name = os.path.basename(s_clean)
+                list_items += f'<li><a href="{s_clean}" target="_blank">📄 PDF: {name}</a></li>'
+            else:
+                list_items += f'<li>{s_clean}</li>'
+        
+        if list_items:
+            sources_html_block = f'''
+            <div class="podcast-sources">
+                <h4 style="margin-bottom: 5px;">Quellen:</h4>
+                <ul>
+                    {list_items}
+                </ul>
+            </div>
+            '''
+
+    # Output Format (Player vs Button)
+    link_lower = link.lower()
+    is_moodle = "moodle" in link_lower or "ksasz.ch" in link_lower
+
+    if is_moodle:
+        # MOODLE LOGIC: Button instead of Player
+        
+        # Ensure forcedownload=0
+        if "forcedownload=1" in link:
+            link = link.replace("forcedownload=1", "forcedownload=0")
+        elif "forcedownload=" not in link:
+             if "?" in link:
+                 link += "&forcedownload=0"
+             else:
+                 link += "?forcedownload=0"
+        
+        # Generate Button HTML
+        content_block = f"""<div class="moodle-container">
+        <a href="{link}" target="_blank" class="moodle-button">
+            🔒 Höre es dir auf Moodle an (Login benötigt)
+        </a>
+        <p class="moodle-note">Diese Episode ist auf moodle. Klicke zum Öffnen/Herunterladen.</p>
+    </div>"""
+
+    else:
+        # STANDARD LOGIC: Audio Player
+        
+        # One <source> per actual file, typed by its extension
+        sources_block = audio_source_tags(link)
+
+        # With a waveform to show, the audio itself is only fetched on play
+        audio_attrs = f'preload="none" data-peaks="{peaks}"' if peaks else 'preload="metadata"'
+        content_block = f"""<audio controls {audio_attrs}>
+        {sources_block}
+        Your browser does not support the audio element.
+    </audio>"""
+
+    return f"""<!-- NEUE EPISODE: {title} -->
+<article class="podcast-card" data-format="{CARD_FORMAT_VERSION}">
+    <h3>{title}</h3>
+    
+    {content_block}
+
+    <p class="podcast-author">{authors_text}</p>
+
+    <details>
+        <summary>Details & Infos</summary>
+        <div class="details-content">
+            <ul class="podcast-details">
+                <li class="podcast-item"><strong>Titel:</strong> {title}</li>
+                <li class="podcast-item"><strong>Info:</strong> {details}</li>
+            </ul>
+            {sources_html_block}
+        </div>
+    </details>
+</article>"""
@@ -1,217 +1,16 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog, filedialog
 import os
-import re
-import webbrowser
-import shutil
-
-# --- BACKEND LOGIC (Copied/Adapted from manage_podcast.py) ---
-
-def get_file_content(file_path):
-    if not os.path.exists(file_path):
-        return None
-    with open(file_path, 'r', encoding='utf-8') as f:
-        return f.read()
-
-def save_file_content(file_path, content):
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(content)
-
-def extract_podcasts(content):
-    podcasts = []
-    # Regex consistent with manage_podcast.py
-    pattern = re.compile(r'(<!-- NEUE EPISODE: .*? -->\s*)?<article class="podcast-card">(.*?)</article>', re.DOTALL)
-    matches = list(pattern.finditer(content))
-    
-    for i, match in enumerate(matches):
-        full_block = match.group(0)
-        inner_html = match.group(2)
-        
-        # Helper to extract content
-        def get_text(regex, default=""):
-            m = re.search(regex, inner_html, re.DOTALL)
-            return m.group(1).strip() if m else default
-
-        title = get_text(r'<h3>(.*?)</h3>', "Unknown Title")
-        # Remove moodle indicator from title if present
-        title = re.sub(r'<span class="moodle-indicator">.*?</span>', '', title).strip()
-        
-        # Details: try structured p, fall back to generic p
-        details = get_text(r'<p class="podcast-description">(.*?)</p>')
-        
-        # Fallback: check inside details/summary hidden block
-        if not details:
-            details = get_text(r'<li class="podcast-item"><strong>Info:</strong> (.*?)</li>')
-
-        if not details:
-            details = get_text(r'<p>(.*?)</p>') 
-            # Filter out "Hier klicken zum Anhören" junk if present from old entries
-            if "Hier klicken" in details: details = ""
-            
-        link = ""
-        # Try to find link in audio source first
-        m_link = re.search(r'<source src="(.*?)"', inner_html)
-        if m_link: 
-            link = m_link.group(1)
-        else:
-            # Try to find link in moodle button
-            m_link_btn = re.search(r'href="(.*?)" class="moodle-button"', inner_html)
-            if m_link_btn:
-                link = m_link_btn.group(1)
-
-        # Authors
-        authors = []
-        # New format p tag
-        m_auth_p = re.search(r'<p class="podcast-author">(.*?)</p>', inner_html)
-        if m_auth_p:
-            text = m_auth_p.group(1).replace("von ", "")
-            parts = text.split(" und ")
-            if len(parts) > 1:
-                authors = [x.strip() for x in ", ".join(parts[:-1]).split(",")] + [parts[-1].strip()]
-            else:
-                authors = [text.strip()]
-        else:
-            # Check old list format
-            m_auth_ul = re.search(r'<ul class="author-list">(.*?)</ul>', inner_html, re.DOTALL)
-            if m_auth_ul:
-                authors = [x.strip() for x in re.findall(r'<li>(.*?)</li>', m_auth_ul.group(1))]
-            elif re.search(r'<li class="podcast-item"><strong>Autoren:</strong>', inner_html):
-                # Simple text extraction from li?
-                li_text = get_text(r'<li class="podcast-item"><strong>Autoren:</strong> (.*?)</li>')
-                if li_text and "<ul" not in li_text: authors = [li_text]
-
-        if not authors: authors = ["Anonym"]
-
-        # Sources
-        sources = []
-        m_source_ul = re.search(r'<ul class="source-list">(.*?)</ul>', inner_html, re.DOTALL)
-        if m_source_ul:
-            raw_items = re.findall(r'<li>(.*?)</li>', m_source_ul.group(1))
-            for item in raw_items:
-                m_href = re.search(r'href="(.*?)"', item)
-                sources.append(m_href.group(1) if m_href else item.strip())
-
-        podcasts.append({
-            'index': i,
-            'title': title,
-            'details': details,
-            'link': link,
-            'authors': authors,
-            'sources': sources,
-            'full_block': full_block,
-            'span': match.span()
-        })
-    return podcasts
-
-def generate_html_block(title, details, link, authors, sources):
-    # Authors Text
-    authors_text = "Anonym"
-    if authors:
-        if len(authors) == 1:
-            authors_text = f"von {authors[0]}"
-        else:
-            authors_text = f"von {', '.join(authors[:-1])} und {authors[-1]}"
-    
-    # Sources HTML
-    sources_html_block = ""
-    if sources:
-        list_items = ""
-        for s in sources:
-            s_clean = s.strip()
-            if not s_clean: continue
-            
-            if s_clean.lower().startswith("http"):
-                list_items += f'<li><a href="{s_clean}" target="_blank">{s_clean}</a></li>'
-            elif s_clean.lower().endswith(".pdf"):
-                # Handle local PDF link
-                name = os.path.basename(s_clean)
-                list_items += f'<li><a href="{s_clean}" target="_blank">📄 PDF: {name}</a></li>'
-            else:
-                list_items += f'<li>{s_clean}</li>'
-        
-        if list_items:
-            sources_html_block = f'''
-            <div class="podcast-sources">
-                <h4 style="margin-bottom: 5px;">Quellen:</h4>
-                <ul>
-                    {list_items}
-                </ul>
-            </div>
-            '''
-
-    # Output Format (Player vs Button)
-    link_lower = link.lower()
-    is_moodle = "moodle" in link_lower or "ksasz.ch" in link_lower
-
-    if is_moodle:
-        # MOODLE LOGIC: Button instead of Player
-        
-        # Ensure forcedownload=0
-        if "forcedownload=1" in link:
-            link = link.replace("forcedownload=1", "forcedownload=0")
-        elif "forcedownload=" not in link:
-             if "?" in link:
-                 link += "&forcedownload=0"
-             else:
-                 link += "?forcedownload=0"
-        
-        # Generate Button HTML
-        content_block = f"""<div class="moodle-container">
-        <a href="{link}" target="_blank" class="moodle-button">
-            🔒 Höre es dir auf Moodle an (Login benötigt)
-        </a>
-        <p class="moodle-note">Diese Episode ist auf moodle. Klicke zum Öffnen/Herunterladen.</p>
-    </div>"""
-
-    else:
-        # STANDARD LOGIC: Audio Player
-        
-        # Determine MIME type(s)
-        sources_block = ""
-        if link_lower.endswith('.m4a'):
-            sources_block = f"""<source src="{link}" type="audio/mp4">
-            <source src="{link}" type="audio/x-m4a">
-            <source src="{link}" type="audio/aac">"""
-        elif link_lower.endswith('.mp3'):
-            sources_block = f"""<source src="{link}" type="audio/mpeg">
-            <source src="{link}" type="audio/mp3">"""
-        elif link_lower.endswith('.ogg') or link_lower.endswith('.oga'):
-            sources_block = f"""<source src="{link}" type="audio/ogg">
-            <source src="{link}" type="audio/vorbis">"""
-        elif link_lower.endswith('.wav'):
-             sources_block = f"""<source src="{link}" type="audio/wav">
-             <source src="{link}" type="audio/x-wav">"""
-        else:
-             sources_block = f"""<source src="{link}" type="audio/mpeg">
-             <source src="{link}" type="audio/mp4">"""
-
-        content_block = f"""<audio controls preload="metadata">
-        {sources_block}
-        Your browser does not support the audio element.
-    </audio>"""
-
-    return f"""<!-- NEUE EPISODE: {title} -->
-<article class="podcast-card">
-    <h3>{title}</h3>
-    
-    {content_block}
-
-    <p class="podcast-author">{authors_text}</p>
-
-    <details>
-        <summary>Details & Infos</summary>
-        <div class="details-content">
-            <ul class="podcast-details">
-                <li class="podcast-item"><strong>Titel:</strong> {title}</li>
-                <li class="podcast-item"><strong>Info:</strong> {details}</li>
-            </ul>
-            {sources_html_block}
-        </div>
-    </details>
-</article>"""
+
+from podcast_timing import span, timed, run_main
 
 # --- GUI ---
 
+def open_in_browser(url):
+    # webbrowser pulls in subprocess & co., only load it when a link is clicked
+    import webbrowser
+    webbrowser.open(url)
+
 # Theme Colors (Matching style.css)
 COLORS = {
     'bg': '#121212',
@@ -287,6 +86,10 @@ class PodcastDashboard:
         self.btn_s2e.pack(side=tk.LEFT, padx=5)
         
         DashboardBtn(controls_frame, text="REFRESH", command=self.load_podcasts, bg=COLORS['btn_bg'], fg=COLORS['text']).pack(side=tk.LEFT, padx=20)
+        DashboardBtn(controls_frame, text="↶ UNDO", command=lambda: self.step_history("undo"), bg=COLORS['btn_bg'], fg=COLORS['text']).pack(side=tk.LEFT, padx=2)
+        DashboardBtn(controls_frame, text="↷ REDO", command=lambda: self.step_history("redo"), bg=COLORS['btn_bg'], fg=COLORS['text']).pack(side=tk.LEFT, padx=(2, 20))
+        DashboardBtn(controls_frame, text="MOVE ✓", command=lambda: self.transfer_selected("move"), bg=COLORS['btn_bg'], fg=COLORS['text']).pack(side=tk.LEFT, padx=2)
+        DashboardBtn(controls_frame, text="COPY ✓", command=lambda: self.transfer_selected("copy"), bg=COLORS['btn_bg'], fg=COLORS['text']).pack(side=tk.LEFT, padx=(2, 20))
         DashboardBtn(controls_frame, text="+ NEW EPISODE", command=self.add_podcast_dialog, bg=COLORS['secondary'], fg='black').pack(side=tk.LEFT)
 
         # Scrollable Area for Cards
@@ -315,13 +118,26 @@ class PodcastDashboard:
         self.canvas.bind_all("<MouseWheel>", self._on_mousewheel)
         self.canvas.bind("<Configure>", self._on_canvas_configure)
 
+        # Undo / Redo shortcuts, on the main window only: in the edit
+        # window and in text fields Ctrl+Z belongs to the text being typed
+        self.root.bind("<Control-z>", lambda e: self.history_shortcut(e, "undo"))
+        self.root.bind("<Control-y>", lambda e: self.history_shortcut(e, "redo"))
+
         self.current_content = ""
         self.current_file_path = ""
         self.podcasts_data = []
+        self.selected = {}  # index -> (BooleanVar, podcast data) for move/copy
 
         # Initial Load
         self.switch_section("m2a")
 
+        # Keep the author index (author pages of build_site.py) current with our edits
+        self.root.after_idle(self.watch_author_index)
+
+    def watch_author_index(self):
+        import podcast_authors
+        podcast_authors.watch()
+
     def _on_canvas_configure(self, event):
         # Update the width of the window to match the canvas
         self.canvas.itemconfig(self.canvas_window, width=event.width)
@@ -358,19 +174,23 @@ class PodcastDashboard:
         rel = f"podcasts/{self.section_var.get()}/index.html"
         return os.path.join(script_dir, rel)
 
+    @timed("gui.load_podcasts")
     def load_podcasts(self):
         # Clear existing
-        for widget in self.scrollable_frame.winfo_children():
-            widget.destroy()
+        with span("gui.clear_cards"):
+            for widget in self.scrollable_frame.winfo_children():
+                widget.destroy()
+        self.selected = {}
 
+        import podcast_api
         self.current_file_path = self.get_path()
-        self.current_content = get_file_content(self.current_file_path)
-        
-        if not self.current_content:
+        try:
+            # Also reads sharded sections (podcast_shards.py)
+            self.current_file_path, self.current_content, self.podcasts_data = \
+                podcast_api.read_section(self.section_var.get())
+        except (OSError, ValueError):
             tk.Label(self.scrollable_frame, text="File not found!", bg=COLORS['bg'], fg=COLORS['text']).pack()
             return
-
-        self.podcasts_data = extract_podcasts(self.current_content)
         
         if not self.podcasts_data:
             tk.Label(self.scrollable_frame, text="No podcasts found.", bg=COLORS['bg'], fg=COLORS['text']).pack(pady=20)
@@ -378,6 +198,7 @@ class PodcastDashboard:
         for p in self.podcasts_data:
             self.create_podcast_card(p)
 
+    @timed("gui.create_podcast_card")
     def create_podcast_card(self, p_data):
         card = tk.Frame(self.scrollable_frame, bg=COLORS['card_bg'], padx=20, pady=20)
         card.pack(fill=tk.X, pady=10)
@@ -394,6 +215,12 @@ class PodcastDashboard:
         header = tk.Frame(content_frame, bg=COLORS['card_bg'])
         header.pack(fill=tk.X, pady=(0, 10))
         
+        # Selection for MOVE / COPY
+        selected_var = tk.BooleanVar(value=False)
+        self.selected[p_data['index']] = (selected_var, p_data)
+        tk.Checkbutton(header, variable=selected_var, bg=COLORS['card_bg'], activebackground=COLORS['card_bg'],
+                       selectcolor=COLORS['input_bg'], highlightthickness=0, bd=0).pack(side=tk.LEFT, padx=(0, 8))
+
         tk.Label(header, text=p_data['title'], font=("Segoe UI", 16, "bold"), bg=COLORS['card_bg'], fg=COLORS['accent']).pack(side=tk.LEFT)
         
         # Action Buttons
@@ -417,23 +244,85 @@ class PodcastDashboard:
         tk.Label(meta_frame, text=f"by {auth_str}", font=("Segoe UI", 9, "italic"), bg=COLORS['card_bg'], fg='#888888').pack(side=tk.LEFT)
         
         if p_data['link']:
+            self.draw_waveform(meta_frame, p_data['link'])
             link_lbl = tk.Label(meta_frame, text="▶ Play Audio", fg=COLORS['secondary'], cursor="hand2", bg=COLORS['card_bg'], font=("Segoe UI", 9, "bold"))
             link_lbl.pack(side=tk.RIGHT)
-            link_lbl.bind("<Button-1>", lambda e, l=p_data['link']: webbrowser.open(l))
-
+            link_lbl.bind("<Button-1>", lambda e, l=p_data['link']: open_in_browser(l))
+
+    def draw_waveform(self, parent, link):
+        """
+        Small waveform thumbnail from the precomputed peaks (podcast_cli.py peaks), if any.
+        """
+        import podcast_peaks
+        data = podcast_peaks.load_peaks(link)
+        if not data or not data.get('peaks'):
+            return
+        width, height = 160, 24
+        canvas = tk.Canvas(parent, width=width, height=height, bg=COLORS['card_bg'], highlightthickness=0)
+        canvas.pack(side=tk.RIGHT, padx=(10, 0))
+        peaks = data['peaks']
+        step = width / len(peaks)
+        for i, value in enumerate(peaks):
+            bar = max(1, value / 255 * height)
+            x = i * step
+            canvas.create_rectangle(x, (height - bar) / 2, x + max(1, step - 1), (height + bar) / 2,
+                                    fill=COLORS['accent'], width=0)
+
+    @timed("gui.delete_podcast")
     def delete_podcast(self, p_data):
         if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete '{p_data['title']}'?"):
-            # We must reload content first to be safe, then find exact block
-            self.current_content = get_file_content(self.current_file_path)
-            # Find the block in current content using the exact strings we stored
-            # (Note: if file changed externally, this might fail, simplistic approach)
-            new_content = self.current_content.replace(p_data['full_block'], "")
-            # Clean up empty lines
-            new_content = re.sub(r'\n\s*\n\s*\n', '\n\n', new_content)
-            
-            save_file_content(self.current_file_path, new_content)
+            import podcast_api
+            # Delete by position, but only if the card is still exactly what we showed
+            try:
+                podcast_api.delete_podcast(self.section_var.get(), p_data['index'],
+                                           expected_block=p_data['full_block'])
+            except (ValueError, IndexError, OSError) as e:
+                messagebox.showerror("Error", str(e))
             self.load_podcasts()
 
+    @timed("gui.transfer_selected")
+    def transfer_selected(self, mode):
+        import podcast_api
+        section = self.section_var.get()
+        chosen = [p for var, p in self.selected.values() if var.get()]
+        if not chosen:
+            messagebox.showinfo("Nothing selected", "Tick the episodes you want to move or copy first.")
+            return
+
+        others = [s for s in podcast_api.list_sections() if s != section] or [section]
+        verb = "Move" if mode == "move" else "Copy"
+        target = simpledialog.askstring(f"{verb} {len(chosen)} episode(s)",
+                                        f"Target section ({', '.join(others)}):",
+                                        initialvalue=others[0], parent=self.root)
+        if not target:
+            return
+
+        # All pages are written together; if anything changed meanwhile, nothing is written
+        selection = [{'section': section, 'index': p['index'], 'expected_block': p['full_block']} for p in chosen]
+        try:
+            podcast_api.transfer_podcasts(selection, target.strip().lower(), mode)
+        except (ValueError, IndexError, OSError) as e:
+            messagebox.showerror("Error", str(e))
+        self.load_podcasts()
+
+    def history_shortcut(self, event, direction):
+        if isinstance(event.widget, (tk.Entry, tk.Text)):
+            return
+        self.step_history(direction)
+
+    @timed("gui.step_history")
+    def step_history(self, direction):
+        import podcast_api
+        try:
+            result = podcast_api.step_history(self.section_var.get(), direction)
+        except (ValueError, OSError) as e:
+            messagebox.showerror("Error", str(e))
+            return
+        if not result[direction]:
+            messagebox.showinfo(direction.capitalize(), f"Nothing to {direction} in this section.")
+            return
+        self.load_podcasts()
+
     def edit_podcast_dialog(self, p_data):
         EditWindow(self.root, p_data, self)
 
@@ -449,46 +338,26 @@ class PodcastDashboard:
         }
         EditWindow(self.root, new_data, self)
 
+    @timed("gui.save_podcast_change")
     def save_podcast_change(self, old_data, new_data):
-        # Generate HTML content block first
-        html_block = generate_html_block(
-            new_data['title'],
-            new_data['details'], 
-            new_data['link'],
-            new_data['authors'],
-            new_data['sources']
-        ).strip() # Important strip to remove execss surrounding newlines 
-
-        file_path = self.get_path()
-        content = get_file_content(file_path)
-        
-        if not content:
-            messagebox.showerror("Error", "File not found.")
+        import podcast_api
+        import podcast_duplicates
+        section = self.section_var.get()
+        exclude = (section, old_data['index']) if old_data.get('full_block') else None
+        matches = podcast_duplicates.find_duplicates(new_data, exclude=exclude)
+        if matches and not messagebox.askyesno(
+                "Duplicate", f"This episode already exists:\n{podcast_duplicates.describe(matches)}\n\nSave anyway?"):
             return
-
-        if old_data.get('full_block'):
-            # Existing Edit
-            # We must be careful about simple replace if multiple exist.
-            # But here we assume unique blocks for simplicity.
-            if old_data['full_block'] in content:
-                content = content.replace(old_data['full_block'], html_block + "\n")
-            else:
-                 messagebox.showerror("Error", "Could not find original entry to update. Refresh list.")
-                 return
-        else:
-            # Add New
-            marker = "</main>"
-            if marker in content:
-                # Add newline before marker for spacing
-                replacement = f"{html_block}\n\n{marker}"
-                # Replace the LAST occurrence of marker
-                parts = content.rsplit(marker, 1)
-                content = parts[0] + replacement + parts[1]
+        try:
+            if old_data.get('full_block'):
+                # Existing Edit: replace exactly this card, even if an identical one exists
+                podcast_api.update_podcast(section, old_data['index'], new_data,
+                                           expected_block=old_data['full_block'])
             else:
-                messagebox.showerror("Error", "</main> tag not found.")
-                return
-
-        save_file_content(file_path, content)
+                podcast_api.add_podcast(section, new_data)
+        except (ValueError, IndexError, OSError) as e:
+            messagebox.showerror("Error", str(e))
+            return
         # Reload List
         self.load_podcasts()
 
@@ -517,7 +386,10 @@ class EditWindow:
                  insertbackground=COLORS['accent'], relief="flat", font=("Segoe UI", 11)).pack(fill=tk.X, pady=(0, 20), ipady=5)
         
         # Link Input
-        tk.Label(container, text="AUDIO URL", font=("Segoe UI", 10, "bold"), bg=COLORS['bg'], fg=COLORS['accent']).pack(anchor="w", pady=(0, 5))
+        frame_link = tk.Frame(container, bg=COLORS['bg'])
+        frame_link.pack(fill=tk.X, pady=(0, 5))
+        tk.Label(frame_link, text="AUDIO URL", font=("Segoe UI", 10, "bold"), bg=COLORS['bg'], fg=COLORS['accent']).pack(side=tk.LEFT)
+        DashboardBtn(frame_link, "+ UPLOAD AUDIO", self.upload_audio_file, bg=COLORS['secondary'], fg='black', font=("Segoe UI", 8)).pack(side=tk.RIGHT)
         self.link_var = tk.StringVar(value=data.get('link', ''))
         tk.Entry(container, textvariable=self.link_var, bg=COLORS['input_bg'], fg=COLORS['input_fg'], 
                  insertbackground=COLORS['accent'], relief="flat", font=("Segoe UI", 11)).pack(fill=tk.X, pady=(0, 20), ipady=5)
@@ -555,6 +427,18 @@ class EditWindow:
         if existing_sources:
              self.sources_txt.insert("1.0", "\n".join(existing_sources))
 
+        # PDF sources: pages, words and first page, filled in the background
+        self.pdf_info_var = tk.StringVar(value="")
+        self.pdf_thumbnail = None
+        self.pdf_info = tk.Label(container, textvariable=self.pdf_info_var, font=("Segoe UI", 9), bg=COLORS['bg'],
+                                 fg=COLORS['text'], justify=tk.LEFT, compound=tk.LEFT)
+        self.pdf_info.pack(anchor="w", pady=(0, 10))
+        import podcast_pdfs
+        section = self.dashboard.section_var.get()
+        local_pdfs = [p for p in (podcast_pdfs.source_pdf(s, section) for s in existing_sources) if p]
+        if local_pdfs:
+            self.show_pdf_info(local_pdfs)
+
         # Buttons
         btn_frame = tk.Frame(container, bg=COLORS['bg'])
         btn_frame.pack(fill=tk.X, pady=10)
@@ -562,6 +446,27 @@ class EditWindow:
         DashboardBtn(btn_frame, "CANCEL", self.win.destroy, bg=COLORS['card_bg'], fg=COLORS['text']).pack(side=tk.RIGHT, padx=10)
         DashboardBtn(btn_frame, "SAVE PODCAST", self.save_action, bg=COLORS['accent'], fg='#000000').pack(side=tk.RIGHT)
 
+    def upload_audio_file(self):
+        filename = filedialog.askopenfilename(title="Select Audio", filetypes=[("Audio Files", "*.mp3 *.m4a *.ogg *.opus *.wav *.flac"), ("All Files", "*.*")])
+        if not filename:
+            return
+        import threading
+        import podcast_upload
+        self.link_var.set(f"Uploading {os.path.basename(filename)} ...")
+
+        def show(text):
+            self.win.after(0, lambda: self.link_var.set(text))
+
+        # In the background, so the window stays responsive during large uploads
+        def run():
+            try:
+                result = podcast_upload.upload(filename, progress=lambda p: show(f"Uploading ... part {p['done']}/{p['parts']}"))
+                show(result['url'])
+            except (ValueError, OSError) as e:
+                show("")
+                self.win.after(0, lambda: messagebox.showerror("Upload failed", f"{e}\n\nUpload the file again to resume."))
+        threading.Thread(target=run, daemon=True).start()
+
     def add_pdf_file(self):
         filename = filedialog.askopenfilename(title="Select PDF", filetypes=[("PDF Files", "*.pdf")])
         if filename:
@@ -575,6 +480,7 @@ class EditWindow:
             
             # Copy file
             try:
+                import shutil
                 shutil.copy2(filename, dest_path)
                 # Insert relative path into sources
                 # Path relative to podcast html (podcasts/m2a/index.html) -> ../pdfs/file.pdf
@@ -587,11 +493,53 @@ class EditWindow:
                     self.sources_txt.insert(tk.END, rel_path)
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to copy PDF: {e}")
+                return
+            self.show_pdf_info([dest_path])
+
+    def show_pdf_info(self, paths):
+        import threading
+        import podcast_pdfs
+        self.pdf_info_var.set(f"Reading {', '.join(os.path.basename(p) for p in paths)} ...")
+
+        def show(text, thumbnail):
+            if not self.win.winfo_exists():
+                return
+            self.pdf_info_var.set(text)
+            if thumbnail:
+                try:
+                    # Tk reads PNG itself; a quarter of the 320px thumbnail fits next to the text
+                    self.pdf_thumbnail = tk.PhotoImage(file=thumbnail).subsample(4)
+                    self.pdf_info.configure(image=self.pdf_thumbnail)
+                except tk.TclError:
+                    pass
+
+        # Extraction runs once per file (cached by content), off the UI thread
+        def run():
+            try:
+                results = podcast_pdfs.process(paths)
+            except OSError as e:
+                results = {os.path.abspath(p): {'error': str(e)} for p in paths}
+            lines, thumbnail = [], None
+            for path, entry in results.items():
+                name = os.path.basename(path)
+                if entry.get('error'):
+                    lines.append(f"{name}: {entry['error']}")
+                    continue
+                lines.append(f"{name}: {entry['pages']} page{'s' if entry['pages'] != 1 else ''}, {entry['words']} words")
+                thumbnail = thumbnail or podcast_pdfs.thumbnail_path(entry)
+            try:
+                self.win.after(0, lambda: show("\n".join(lines), thumbnail))
+            except (tk.TclError, RuntimeError):
+                pass   # window closed meanwhile; the result is cached anyway
+        threading.Thread(target=run, daemon=True).start()
 
     def save_action(self):
         # Gather data
         new_title = self.title_var.get().strip()
         new_link = self.link_var.get().strip()
+        if new_link.startswith("Uploading"):
+            messagebox.showinfo("Upload running", "Wait until the upload has finished.")
+            return
         new_details = self.details_txt.get("1.0", "end-1c").strip()
         
         # Default description logic
@@ -621,7 +569,10 @@ class EditWindow:
         self.dashboard.save_podcast_change(self.data, new_data_dict)
         self.win.destroy()
 
-if __name__ == "__main__":
+def main():
     root = tk.Tk()
     app = PodcastDashboard(root)
     root.mainloop()
+
+if __name__ == "__main__":
+    run_main(main)
@@ -0,0 +1,147 @@
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import podcast_authors
+import podcast_chunks
+from podcast_core import episode_fingerprints
+from podcast_timing import timed
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_NAME = ".duplicate-cache"   # chunk hashes of audio files, by sha256
+SIMILARITY = 0.5                  # share of common chunks for "similar audio"
+
+# Two kinds of checks:
+#   metadata  the fingerprints of podcast_core.episode_fingerprints, kept in the
+#             episode index of podcast_authors.py: one dict lookup per key
+#   audio     (scan only) the bytes of mirrored or local audio files: equal
+#             SHA-256, or enough equal content-defined chunks (podcast_chunks.py)
+#             to be the same recording with other tags or a trimmed start
+
+
+# --- ADD-TIME CHECK ---
+
+def _position(index, episode_id):
+    episode = index['episodes'][episode_id]
+    return episode['section'], index['sections'][episode['section']]['episodes'].index(episode_id)
+
+def find_duplicates(fields, root=None, exclude=None):
+    """
+    Episodes that the given fields would duplicate, as
+    [{'section', 'index', 'title', 'reason'}]. `exclude` = (section, index)
+    of the episode being edited, which does not count as its own duplicate.
+    """
+    index = podcast_authors.current_index(root)
+    matches = {}
+    keys = episode_fingerprints(fields.get('title') or "", fields.get('authors') or [], fields.get('link') or "")
+    for key, reason in keys.items():
+        for episode_id in index['fingerprints'].get(key, {'episodes': []})['episodes']:
+            section, position = _position(index, episode_id)
+            if (section, position) != exclude and episode_id not in matches:
+                matches[episode_id] = {'section': section, 'index': position,
+                                       'title': index['episodes'][episode_id]['fields']['title'], 'reason': reason}
+    return sorted(matches.values(), key=lambda m: (m['section'], m['index']))
+
+def describe(matches):
+    """
+    One line for error messages and dialogs.
+    """
+    return "; ".join(f"{m['section']} #{m['index']} '{m['title']}' ({m['reason']})" for m in matches)
+
+
+# --- ARCHIVE SCAN ---
+
+def metadata_groups(index):
+    groups = []
+    for key, entry in index['fingerprints'].items():
+        if len(entry['episodes']) > 1:
+            reason = "same audio URL" if key.startswith("a:") else "same title and authors"
+            groups.append({'reason': reason, 'episodes': list(entry['episodes'])})
+    return groups
+
+def audio_file(index, episode_id, root):
+    import podcast_peaks
+    episode = index['episodes'][episode_id]
+    link = episode['fields']['link']
+    return podcast_peaks.resolve_audio(link, episode['section'], root) if link else None
+
+def cached_chunks(path, root):
+    """
+    (sha256, chunk hashes) of an audio file, chunked only once per content.
+    """
+    import podcast_peaks
+    digest = podcast_peaks.file_hash(path)
+    cache_path = os.path.join(root, CACHE_NAME, digest + ".json")
+    if os.path.exists(cache_path):
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return digest, json.load(f)
+    chunks = podcast_chunks.chunk_hashes(path)
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp = cache_path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(chunks, f)
+    os.replace(tmp, cache_path)
+    return digest, chunks
+
+def audio_groups(index, root, workers=4, threshold=SIMILARITY):
+    """
+    Groups episodes whose audio files are identical or similar. Candidates
+    come from an inverted chunk -> files index, so only files sharing at
+    least one chunk are ever compared.
+    """
+    files = {}
+    for episode_id in index['episodes']:
+        path = audio_file(index, episode_id, root)
+        if path:
+            files.setdefault(path, []).append(episode_id)
+    paths = sorted(files)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        fingerprints = dict(zip(paths, pool.map(lambda p: cached_chunks(p, root), paths)))
+
+    groups = []
+    by_digest = {}
+    for path in paths:
+        by_digest.setdefault(fingerprints[path][0], []).append(path)
+    for same in by_digest.values():
+        episodes = [e for p in same for e in files[p]]
+        if len(episodes) > 1:
+            groups.append({'reason': "same audio bytes", 'episodes': episodes})
+
+    # One file per distinct content from here on
+    unique = [same[0] for same in by_digest.values()]
+    holders = {}
+    for path in unique:
+        for chunk in set(fingerprints[path][1]):
+            holders.setdefault(chunk, []).append(path)
+    for path in unique:
+        chunks = set(fingerprints[path][1])
+        shared = {}
+        for chunk in chunks:
+            for other in holders[chunk]:
+                if other > path:
+                    shared[other] = shared.get(other, 0) + 1
+        for other, count in shared.items():
+            similarity = count / len(chunks | set(fingerprints[other][1]))
+            if similarity >= threshold:
+                episodes = [e for p in by_digest[fingerprints[path][0]] + by_digest[fingerprints[other][0]]
+                            for e in files[p]]
+                groups.append({'reason': f"similar audio ({similarity:.0%} equal chunks)", 'episodes': episodes})
+    return groups
+
+@timed("duplicates.scan")
+def scan(root=None, audio=False, workers=4, threshold=SIMILARITY):
+    """
+    Report of every duplicate group in the archive.
+    """
+    root = root or SCRIPT_DIR
+    index = podcast_authors.current_index(root)
+    groups = metadata_groups(index)
+    if audio:
+        groups += audio_groups(index, root, workers, threshold)
+    positions = podcast_authors.episode_positions(index)
+    for group in groups:
+        group['episodes'] = [{'section': positions[e][0], 'index': positions[e][1],
+                              'title': index['episodes'][e]['fields']['title']}
+                             for e in sorted(group['episodes'], key=positions.get)]
+    groups.sort(key=lambda g: (g['episodes'][0]['section'], g['episodes'][0]['index'], g['reason']))
+    return {'episodes': len(index['episodes']), 'groups': groups}
@@ -0,0 +1,345 @@
+import os
+import json
+import time
+
+from podcast_core import get_file_content, commit_files
+from podcast_timing import timed
+
+# Per-section undo/redo. Every change to a page is stored as a list of edits
+# [start, old_text, new_text] (start = offset in the page before the change),
+# so an entry costs about as much as the cards it touched, not the whole page.
+#
+# The stacks live next to the page in .history/undo.jsonl and redo.jsonl, one
+# entry per line with the newest last. Popping an entry reads the file backwards
+# and truncates it, so undo never has to load the older history. Recent entries
+# are also kept in memory (for the dashboard) up to MEMORY_BUDGET bytes per stack;
+# older ones are only on disk.
+#
+# A change spanning several files of one folder (the shards and manifest of a
+# sharded section, see podcast_shards.py) is a single entry whose 'files' maps
+# each file name to its edits; it is undone and redone as a whole.
+#
+# A change spanning several sections (moving episodes between them) is pushed
+# onto the stack of each, with the same 'id' and 'linked' naming the others.
+# Undoing it from any of them reverts every page, and only while it is the
+# newest step everywhere; otherwise the section with newer changes is named.
+HISTORY_DIR = ".history"
+MEMORY_BUDGET = 512 * 1024
+DISK_LIMIT = 8 * 1024 * 1024  # past this the oldest half of a stack is dropped
+READ_BLOCK = 64 * 1024
+
+
+class HistoryStack:
+    """
+    One stack file with a bounded in-memory cache of its newest entries.
+    """
+
+    def __init__(self, path, budget=None):
+        self.path = path
+        self.budget = MEMORY_BUDGET if budget is None else budget
+        self.cache = []       # [(entry, line bytes)], oldest first
+        self.cached_bytes = 0
+        self.known_size = None
+
+    def _size(self):
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def _check_cache(self):
+        # Another process (CLI vs. dashboard) may have changed the file
+        if self.known_size != self._size():
+            self.cache = []
+            self.cached_bytes = 0
+
+    def _remember(self, entry, size):
+        self.cache.append((entry, size))
+        self.cached_bytes += size
+        while self.cache and self.cached_bytes > self.budget:
+            _, dropped = self.cache.pop(0)  # still on disk
+            self.cached_bytes -= dropped
+
+    def push(self, entry):
+        self._check_cache()
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode('utf-8')
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'ab') as f:
+            f.write(line)
+        self.known_size = self._size()
+        self._remember(entry, len(line))
+        if self.known_size > DISK_LIMIT:
+            self._trim()
+
+    def pop(self):
+        """
+        Removes and returns the newest entry, or None if the stack is empty.
+        """
+        self._check_cache()
+        size = self._size()
+        if not size:
+            return None
+        if self.cache:
+            entry, length = self.cache.pop()
+            self.cached_bytes -= length
+        else:
+            line = self._last_line(size)
+            entry, length = json.loads(line.decode('utf-8')), len(line)
+        with open(self.path, 'r+b') as f:
+            f.truncate(size - length)
+        self.known_size = size - length
+        return entry
+
+    def peek(self):
+        """
+        The newest entry without removing it, or None.
+        """
+        self._check_cache()
+        if self.cache:
+            return self.cache[-1][0]
+        size = self._size()
+        return json.loads(self._last_line(size).decode('utf-8')) if size else None
+
+    def _last_line(self, size):
+        # Read backwards block by block until the newline before the last entry
+        with open(self.path, 'rb') as f:
+            data = b""
+            pos = size
+            while pos > 0:
+                step = min(READ_BLOCK, pos)
+                pos -= step
+                f.seek(pos)
+                data = f.read(step) + data
+                cut = data.rfind(b"\n", 0, len(data) - 1)
+                if cut != -1:
+                    return data[cut + 1:]
+            return data
+
+    def peek_all(self, limit=None):
+        """
+        Entries from newest to oldest (reads the file; meant for listings).
+        """
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+        entries.reverse()
+        return entries[:limit] if limit else entries
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.cache = []
+        self.cached_bytes = 0
+        self.known_size = 0
+
+    def _trim(self):
+        with open(self.path, 'rb') as f:
+            lines = f.readlines()
+        keep = lines[len(lines) // 2:]
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(b"".join(keep))
+        os.replace(tmp_path, self.path)
+        self.cache = []
+        self.cached_bytes = 0
+        self.known_size = self._size()
+
+
+_stacks = {}
+
+def stacks_for(page_path):
+    """
+    Returns the (undo, redo) stacks of a page, shared within the process.
+    """
+    key = os.path.abspath(page_path)
+    if key not in _stacks:
+        folder = os.path.join(os.path.dirname(key), HISTORY_DIR)
+        _stacks[key] = (HistoryStack(os.path.join(folder, "undo.jsonl")),
+                        HistoryStack(os.path.join(folder, "redo.jsonl")))
+    return _stacks[key]
+
+
+# --- EDITS ---
+
+def edits_from_splices(content, splices):
+    """
+    (start, end, replacement) splices on `content` -> [start, old_text, new_text] edits.
+    """
+    return [[start, content[start:end], text]
+            for start, end, text in sorted(splices, key=lambda s: (s[0], s[1]))
+            if content[start:end] != text]
+
+def apply_edits(content, edits, reverse=False):
+    """
+    Applies edits forwards (old -> new) or in reverse (new -> old). Every
+    touched span is checked first, so a page changed by other means is never
+    patched at the wrong place. Raises ValueError on a mismatch.
+    """
+    pieces = []
+    last = 0
+    shift = 0
+    for start, old, new in edits:
+        # Offsets are stored for the old page; in reverse they move by earlier edits
+        pos = start + shift if reverse else start
+        expected, replacement = (new, old) if reverse else (old, new)
+        if content[pos:pos + len(expected)] != expected:
+            raise ValueError("The page was changed outside the history, cannot apply this step.")
+        pieces.append(content[last:pos])
+        pieces.append(replacement)
+        last = pos + len(expected)
+        shift += len(new) - len(old)
+    pieces.append(content[last:])
+    return "".join(pieces)
+
+
+# --- RECORDING ---
+
+@timed("history.record")
+def record(page_path, content, splices, label):
+    """
+    Stores a change made to page_path (content = page before the change) and
+    clears the redo stack, like every editor does after a new change.
+    """
+    edits = edits_from_splices(content, splices)
+    if not edits:
+        return
+    undo_stack, redo_stack = stacks_for(page_path)
+    undo_stack.push({'time': time.strftime("%Y-%m-%d %H:%M:%S"), 'label': label, 'edits': edits})
+    redo_stack.clear()
+
+@timed("history.record")
+def record_files(key_path, changes, label):
+    """
+    Stores one change to several files next to key_path as a single step.
+    changes = [(path, content before, splices)].
+    """
+    folder = os.path.dirname(os.path.abspath(key_path))
+    files = {}
+    for path, content, splices in changes:
+        edits = edits_from_splices(content, splices)
+        if edits:
+            files[os.path.relpath(os.path.abspath(path), folder)] = edits
+    if not files:
+        return
+    undo_stack, redo_stack = stacks_for(key_path)
+    undo_stack.push({'time': time.strftime("%Y-%m-%d %H:%M:%S"), 'label': label, 'files': files})
+    redo_stack.clear()
+
+@timed("history.record")
+def record_linked(keys, changes, label):
+    """
+    Stores one change to several sections as a single step of each.
+    keys = {section: key path}, changes = [(path, content before, splices)].
+    """
+    edits = {os.path.abspath(path): e for path, content, splices in changes
+             for e in [edits_from_splices(content, splices)] if e}
+    if not edits:
+        return
+    entry_id = f"{time.time_ns()}-{os.getpid()}"
+    for section, key_path in keys.items():
+        folder = os.path.dirname(os.path.abspath(key_path))
+        undo_stack, redo_stack = stacks_for(key_path)
+        undo_stack.push({'time': time.strftime("%Y-%m-%d %H:%M:%S"), 'label': label, 'id': entry_id,
+                         'linked': {other: os.path.relpath(os.path.abspath(path), folder)
+                                    for other, path in keys.items() if other != section},
+                         'files': {os.path.relpath(path, folder): e for path, e in edits.items()}})
+        redo_stack.clear()
+
+def entry_files(page_path, entry):
+    """
+    {path: edits} of an entry.
+    """
+    if 'files' not in entry:
+        return {page_path: entry['edits']}
+    folder = os.path.dirname(os.path.abspath(page_path))
+    return {os.path.join(folder, name): edits for name, edits in entry['files'].items()}
+
+def _pair(page_path, direction):
+    undo_stack, redo_stack = stacks_for(page_path)
+    return (undo_stack, redo_stack) if direction == "undo" else (redo_stack, undo_stack)
+
+def _linked_entries(page_path, entry, direction):
+    """
+    [(section, source stack, target stack, entry)] of the other sections of a
+    linked entry, each of which must have it as its newest step.
+    """
+    folder = os.path.dirname(os.path.abspath(page_path))
+    others = []
+    for section, rel in entry.get('linked', {}).items():
+        source, target = _pair(os.path.join(folder, rel), direction)
+        top = source.peek()
+        if top is None or top.get('id') != entry['id']:
+            raise ValueError(f"'{entry['label']}' also changed section '{section}', which has newer changes. "
+                             f"Use {direction} in '{section}' first.")
+        others.append((section, source, target, top))
+    return others
+
+@timed("history.step")
+def step(page_path, direction, steps=1, linked=None):
+    """
+    Undoes (direction="undo") or redoes up to `steps` changes of a page.
+    Returns the labels of the steps taken, newest first. Sections changed
+    along with it (linked steps) are added to the `linked` set if given.
+    """
+    source, target = _pair(page_path, direction)
+
+    if not os.path.exists(page_path):
+        raise FileNotFoundError(f"File not found: {page_path}")
+
+    contents = {}
+    taken = []   # (source, target, entry) of every stack entry moved
+    labels = []
+    for _ in range(steps):
+        entry = source.pop()
+        if entry is None:
+            break
+        try:
+            others = _linked_entries(page_path, entry, direction)
+            changed = {}
+            for path, edits in entry_files(page_path, entry).items():
+                path = os.path.normpath(path)
+                if path not in contents:
+                    # A file the change created starts out empty
+                    contents[path] = get_file_content(path) or ""
+                changed[path] = apply_edits(changed.get(path, contents[path]), edits,
+                                            reverse=(direction == "undo"))
+        except ValueError:
+            source.push(entry)
+            if not taken:
+                raise
+            break
+        contents.update(changed)
+        taken.append((source, target, entry))
+        for section, other_source, other_target, other_entry in others:
+            other_source.pop()
+            taken.append((other_source, other_target, other_entry))
+            if linked is not None:
+                linked.add(section)
+        labels.append(entry['label'])
+
+    if taken:
+        try:
+            commit_files(contents)
+        except BaseException:
+            for stack, _, entry in reversed(taken):
+                stack.push(entry)
+            raise
+        for _, stack, entry in taken:
+            stack.push(entry)
+    return labels
+
+def undo(page_path, steps=1):
+    return step(page_path, "undo", steps)
+
+def redo(page_path, steps=1):
+    return step(page_path, "redo", steps)
+
+def entries(page_path, limit=20):
+    """
+    Returns {'undo': [...], 'redo': [...]} with time, label and size of each step, newest first.
+    """
+    out = {}
+    for name, stack in zip(("undo", "redo"), stacks_for(page_path)):
+        out[name] = [{'time': e['time'], 'label': e['label'],
+                      'bytes': sum(len(old) + len(new) for edits in entry_files(page_path, e).values()
+                                   for _, old, new in edits)}
+                     for e in stack.peek_all(limit)]
+    return out
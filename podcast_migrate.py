@@ -0,0 +1,159 @@
+import os
+import difflib
+
+import podcast_api
+import podcast_history
+import podcast_shards
+from podcast_core import CARD_FORMAT_VERSION, extract_podcasts, get_file_content, commit_files
+from podcast_timing import timed
+
+# Markup that only older versions of the tools wrote, used for the report
+LEGACY_MARKERS = {
+    'author-list': '<ul class="author-list">',
+    'autoren-item': '<strong>Autoren:</strong>',
+    'podcast-extra': '<div class="podcast-extra">',
+    'source-list': '<ul class="source-list">',
+    'podcast-description': '<p class="podcast-description">',
+    'moodle-indicator': 'class="moodle-indicator"',
+}
+
+
+def legacy_features(block):
+    return [name for name, marker in LEGACY_MARKERS.items() if marker in block]
+
+def comparable(fields):
+    """
+    Fields as they must survive a migration. Moodle links are compared without
+    the forcedownload parameter that generate_html_block adds on purpose.
+    """
+    link = fields['link']
+    for suffix in ("?forcedownload=0", "&forcedownload=0", "?forcedownload=1", "&forcedownload=1"):
+        link = link.replace(suffix, "")
+    return {**{k: fields[k] for k in podcast_api.FIELDS}, 'link': link}
+
+def migrate_card(podcast, rerender=False, root=None):
+    """
+    Returns (new_block, warning). new_block is None if the card stays as it is.
+    With rerender, cards already in the current format are rendered again too
+    (e.g. to pick up changed <source> tags).
+    """
+    if podcast['format'] == CARD_FORMAT_VERSION and not rerender:
+        return None, None
+    try:
+        fields = podcast_api.normalize_fields({}, base=podcast)
+    except ValueError as e:
+        return None, f"{podcast['title']}: {e}"
+
+    new_block = podcast_api.render_block(fields, root)
+    if new_block == podcast['full_block']:
+        return None, None
+
+    # Round trip: the canonical card must parse back to the same episode
+    reparsed = extract_podcasts(new_block)
+    if len(reparsed) != 1 or comparable(reparsed[0]) != comparable(fields):
+        return None, f"{podcast['title']}: fields change when re-rendered, card left as is"
+    return new_block, None
+
+def iter_migrated(content, report, splices=None, rerender=False, root=None):
+    """
+    Streams the migrated page as chunks: untouched text between cards is
+    passed through, legacy cards are replaced by their canonical rendering.
+    Replaced cards are also collected as (start, end, text) in `splices`.
+    """
+    last = 0
+    for podcast in extract_podcasts(content):
+        start, end = podcast['span']
+        yield content[last:start]
+        new_block, warning = migrate_card(podcast, rerender, root)
+        report['cards'] += 1
+        for feature in legacy_features(podcast['full_block']):
+            report['legacy'][feature] = report['legacy'].get(feature, 0) + 1
+        if warning:
+            report['warnings'].append(warning)
+        if new_block is None:
+            report['unchanged'] += 1
+            yield podcast['full_block']
+        else:
+            report['migrated'] += 1
+            report['changes'].append((podcast['full_block'], new_block, podcast['title']))
+            if splices is not None:
+                splices.append((start, end, new_block))
+            yield new_block
+        last = end
+    yield content[last:]
+
+@timed("migrate.section")
+def migrate_section(section, root=None, dry_run=False, rerender=False):
+    """
+    Rewrites one section into the canonical card format in a single pass.
+    The new page is streamed into a temporary file which then replaces the
+    original, so an interrupted run never leaves a half-written page.
+    """
+    report = {'section': section, 'cards': 0, 'migrated': 0, 'unchanged': 0,
+              'legacy': {}, 'warnings': [], 'changes': []}
+    if podcast_shards.is_sharded(section, root):
+        return migrate_shards(section, report, root, dry_run, rerender)
+    path, content, _ = podcast_api.read_section(section, root)
+
+    splices = []
+    chunks = iter_migrated(content, report, splices, rerender, root)
+    if dry_run:
+        for _ in chunks:
+            pass
+    else:
+        tmp_path = path + ".migrate.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            if report['migrated']:
+                os.replace(tmp_path, path)
+                podcast_history.record(path, content, splices, f"migrate {report['migrated']} cards")
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return report
+
+def migrate_shards(section, report, root=None, dry_run=False, rerender=False):
+    """
+    migrate_section for a sharded section. Shards are small, so each one is
+    migrated in memory; all changed shards are written together with the
+    manifest (new revision) and become one undo step.
+    """
+    manifest_path = podcast_shards.manifest_path(section, root)
+    manifest_text = get_file_content(manifest_path)
+    manifest = podcast_shards.parse_manifest(manifest_text, section)
+    files, changes = {}, []
+    for shard in manifest['shards']:
+        path = os.path.join(os.path.dirname(manifest_path), shard['file'])
+        content = get_file_content(path) or ""
+        splices = []
+        new = "".join(iter_migrated(content, report, splices, rerender, root))
+        if splices:
+            files[path] = new
+            changes.append((path, content, splices))
+    if files and not dry_run:
+        manifest['revision'] = manifest.get('revision', 0) + 1
+        files[manifest_path] = podcast_shards.dump_manifest(manifest)
+        changes.append((manifest_path, manifest_text, [(0, len(manifest_text), files[manifest_path])]))
+        commit_files(files)
+        podcast_history.record_files(manifest_path, changes, f"migrate {report['migrated']} cards")
+    return report
+
+def unified_diff(report):
+    """
+    The changes of a report as a unified diff, one hunk group per card.
+    """
+    lines = []
+    name = f"podcasts/{report['section']}/index.html"
+    for old, new, title in report['changes']:
+        lines.extend(difflib.unified_diff(old.splitlines(True), new.splitlines(True),
+                                          f"a/{name} ({title})", f"b/{name} ({title})"))
+    return "".join(line if line.endswith("\n") else line + "\n" for line in lines)
+
+def migrate(sections=None, root=None, dry_run=False, rerender=False):
+    """
+    Migrates the given sections (default: all) and returns their reports.
+    """
+    sections = sections or podcast_api.list_sections(root)
+    return [migrate_section(section, root, dry_run, rerender) for section in sections]
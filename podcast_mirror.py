@@ -0,0 +1,289 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import podcast_api
+from podcast_timing import timed
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+MIRROR_NAME = ".audio-mirror"
+MANIFEST_NAME = "manifest.json"
+
+DEFAULT_WORKERS = 4
+DEFAULT_TIMEOUT = 30
+DEFAULT_RETRIES = 3
+CHUNK_SIZE = 256 * 1024
+USER_AGENT = "podcast-mirror/1.0 (+https://minatobrot.github.io)"
+
+# Moodle files need a login and cannot be mirrored
+SKIP_HOSTS = ("moodle", "ksasz.ch")
+
+# Layout of the mirror (inside the site root, hidden from the site build):
+#   .audio-mirror/manifest.json            url -> sha256, size, etag, last_modified, path
+#   .audio-mirror/objects/ab/abcdef....mp3 content-addressed files
+#   .audio-mirror/partial/<url hash>.part  interrupted downloads, resumed with Range
+#
+# To try interrupted and resumed downloads without archive.org, serve files
+# with benchmarks/http_standin.py (--drop-after-bytes cuts answers short).
+
+
+# --- MANIFEST ---
+
+def mirror_dir(root=None):
+    return os.path.join(root or SCRIPT_DIR, MIRROR_NAME)
+
+def load_manifest(directory):
+    path = os.path.join(directory, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_manifest(directory, manifest):
+    path = os.path.join(directory, MANIFEST_NAME)
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+def mirrored_path(url, root=None):
+    """
+    Returns the local file of a mirrored URL, or None if it is not mirrored.
+    """
+    directory = mirror_dir(root)
+    entry = load_manifest(directory).get(url)
+    if not entry:
+        return None
+    path = os.path.join(directory, entry['path'])
+    return path if os.path.exists(path) else None
+
+
+# --- LINKS ---
+
+def is_mirrorable(url):
+    lower = url.lower()
+    return lower.startswith(("http://", "https://")) and not any(host in lower for host in SKIP_HOSTS)
+
+def audio_links(sections=None, root=None):
+    """
+    Returns {url: [(section, title), ...]} for every mirrorable audio link.
+    """
+    links = {}
+    for section in sections or podcast_api.list_sections(root):
+        for podcast in podcast_api.list_podcasts(section, root):
+            if is_mirrorable(podcast['link']):
+                links.setdefault(podcast['link'], []).append((section, podcast['title']))
+    return links
+
+def object_name(digest, url):
+    ext = os.path.splitext(urllib.parse.unquote(urllib.parse.urlsplit(url).path))[1].lower()
+    if not ext.isascii() or len(ext) > 8:
+        ext = ""
+    return os.path.join("objects", digest[:2], digest + ext)
+
+def partial_path(directory, url):
+    return os.path.join(directory, "partial", hashlib.sha1(url.encode('utf-8')).hexdigest() + ".part")
+
+
+# --- HTTP ---
+
+def _request(url, method="GET", headers=None):
+    return urllib.request.Request(url, method=method, headers={'User-Agent': USER_AGENT, **(headers or {})})
+
+def remote_info(url, timeout=DEFAULT_TIMEOUT):
+    """
+    HEAD request: returns {'size', 'etag', 'last_modified'} (values may be None).
+    """
+    with urllib.request.urlopen(_request(url, "HEAD"), timeout=timeout) as resp:
+        length = resp.headers.get('Content-Length')
+        return {'size': int(length) if length and length.isdigit() else None,
+                'etag': resp.headers.get('ETag'),
+                'last_modified': resp.headers.get('Last-Modified')}
+
+def _total_size(resp):
+    # "Content-Range: bytes 100-999/1000" for partial answers, Content-Length otherwise
+    content_range = resp.headers.get('Content-Range')
+    if content_range and "/" in content_range:
+        total = content_range.rsplit("/", 1)[1]
+        return int(total) if total.isdigit() else None
+    length = resp.headers.get('Content-Length')
+    return int(length) if length and length.isdigit() else None
+
+@timed("mirror.fetch")
+def fetch(url, part, timeout=DEFAULT_TIMEOUT):
+    """
+    Downloads url into the file `part`, continuing after the bytes already in it.
+    Returns (sha256, size, etag, last_modified, resumed_from). Raises OSError if
+    the transfer stops early; the partial file is kept for the next attempt.
+    """
+    offset = os.path.getsize(part) if os.path.exists(part) else 0
+    etag_path = part + ".etag"
+    headers = {}
+    if offset:
+        headers['Range'] = f"bytes={offset}-"
+        if os.path.exists(etag_path):
+            with open(etag_path, 'r', encoding='utf-8') as f:
+                # The server sends the whole file instead if it changed meanwhile
+                headers['If-Range'] = f.read()
+
+    try:
+        resp = urllib.request.urlopen(_request(url, headers=headers), timeout=timeout)
+    except urllib.error.HTTPError as e:
+        if e.code == 416 and offset:
+            # Range not satisfiable: the partial file is stale or already too long
+            os.remove(part)
+            return fetch(url, part, timeout)
+        raise
+
+    with resp:
+        digest = hashlib.sha256()
+        if resp.status == 206:
+            with open(part, 'rb') as f:
+                for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    digest.update(block)
+            mode = 'ab'
+        else:
+            offset = 0
+            mode = 'wb'
+            if resp.headers.get('ETag'):
+                with open(etag_path, 'w', encoding='utf-8') as f:
+                    f.write(resp.headers['ETag'])
+
+        total = _total_size(resp)
+        with open(part, mode) as f:
+            for block in iter(lambda: resp.read(CHUNK_SIZE), b""):
+                digest.update(block)
+                f.write(block)
+        etag = resp.headers.get('ETag')
+        last_modified = resp.headers.get('Last-Modified')
+
+    size = os.path.getsize(part)
+    if total is not None and size != total:
+        raise OSError(f"Incomplete download: {size} of {total} bytes")
+    return digest.hexdigest(), size, etag, last_modified, offset
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# --- MIRROR ---
+
+def is_current(directory, entry, url, check, verify, timeout):
+    """
+    True if the mirrored copy of url can be kept as it is.
+    """
+    if not entry:
+        return False
+    path = os.path.join(directory, entry['path'])
+    if not os.path.exists(path) or os.path.getsize(path) != entry['size']:
+        return False
+    if verify and file_hash(path) != entry['sha256']:
+        os.remove(path)  # damaged; the fresh copy gets the same name
+        return False
+    if not check:
+        return True
+    try:
+        info = remote_info(url, timeout)
+    except (urllib.error.URLError, OSError):
+        return True  # offline: keep what we have
+    if info['etag'] and entry.get('etag'):
+        return info['etag'] == entry['etag']
+    return info['size'] in (None, entry['size'])
+
+def mirror_one(directory, url, entry, check=True, verify=False, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES):
+    """
+    Brings one URL up to date. Returns a result dict; 'entry' is the new manifest entry.
+    """
+    if is_current(directory, entry, url, check, verify, timeout):
+        return {'url': url, 'status': 'up-to-date', 'bytes': 0, 'entry': entry}
+
+    part = partial_path(directory, url)
+    os.makedirs(os.path.dirname(part), exist_ok=True)
+    error = None
+    for _ in range(max(1, retries)):
+        try:
+            digest, size, etag, last_modified, resumed_from = fetch(url, part, timeout)
+            error = None
+            break
+        except urllib.error.HTTPError as e:
+            error = e
+            if e.code < 500:
+                break  # missing or forbidden, retrying will not help
+        except (urllib.error.URLError, OSError) as e:
+            error = e
+    if error is not None:
+        return {'url': url, 'status': 'failed', 'bytes': 0, 'error': str(error), 'entry': entry}
+
+    name = object_name(digest, url)
+    target = os.path.join(directory, name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    if os.path.exists(target):
+        os.remove(part)  # same content already stored for another URL
+    else:
+        os.replace(part, target)
+    if os.path.exists(part + ".etag"):
+        os.remove(part + ".etag")
+
+    new_entry = {'sha256': digest, 'size': size, 'etag': etag, 'last_modified': last_modified,
+                 'path': name.replace(os.sep, "/"), 'fetched': time.strftime("%Y-%m-%dT%H:%M:%S")}
+    return {'url': url, 'status': 'resumed' if resumed_from else 'downloaded',
+            'bytes': size - resumed_from, 'entry': new_entry}
+
+def remove_unreferenced(directory, manifest, paths):
+    referenced = {entry['path'] for entry in manifest.values()}
+    for rel in paths - referenced:
+        path = os.path.join(directory, rel)
+        if os.path.exists(path):
+            os.remove(path)
+
+@timed("mirror.run")
+def mirror(sections=None, root=None, workers=DEFAULT_WORKERS, check=True, verify=False,
+           timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, progress=None):
+    """
+    Mirrors every audio file linked from the given sections (default: all)
+    with a pool of `workers` threads. The manifest is saved after every
+    finished file, so an interrupted run loses at most the files in flight.
+    """
+    directory = mirror_dir(root)
+    os.makedirs(directory, exist_ok=True)
+    manifest = load_manifest(directory)
+    links = audio_links(sections, root)
+
+    results = []
+    replaced = set()
+    lock = threading.Lock()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [pool.submit(mirror_one, directory, url, manifest.get(url), check, verify, timeout, retries)
+                   for url in links]
+        for future in as_completed(futures):
+            result = future.result()
+            url = result['url']
+            with lock:
+                old = manifest.get(url)
+                if result['entry'] and result['entry'] is not old:
+                    if old:
+                        replaced.add(old['path'])
+                    manifest[url] = result['entry']
+                    save_manifest(directory, manifest)
+            result['episodes'] = [f"{section}: {title}" for section, title in links[url]]
+            del result['entry']
+            results.append(result)
+            if progress:
+                progress(result)
+
+    remove_unreferenced(directory, manifest, replaced)
+    summary = {}
+    for r in results:
+        summary[r['status']] = summary.get(r['status'], 0) + 1
+    return {'files': len(links), 'summary': summary,
+            'bytes': sum(r['bytes'] for r in results), 'results': results}
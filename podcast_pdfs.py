@@ -0,0 +1,501 @@
+import os
+import re
+import json
+import zlib
+import shutil
+import hashlib
+import subprocess
+from urllib.parse import unquote
+from concurrent.futures import ProcessPoolExecutor
+
+import podcast_api
+from podcast_timing import timed
+
+try:
+    import pypdf
+except ImportError:
+    pypdf = None
+
+try:
+    import fitz   # PyMuPDF
+except ImportError:
+    fitz = None
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_NAME = ".pdf-cache"
+PDF_DIR = "podcasts/pdfs"
+EXTRACT_VERSION = 1     # bump when extraction changes, so cached results are redone
+MAX_TEXT = 200000       # characters kept per PDF
+THUMBNAIL_WIDTH = 320
+
+# Text, page count and a first-page thumbnail of the PDF sources
+# (podcasts/pdfs/, added with the dashboard's "+ ADD PDF"), for the search
+# index and the dashboard:
+#
+#   .pdf-cache/<sha256>.json   {'v', 'pages', 'words', 'text', 'extractor', 'thumbnail', 'error'}
+#   .pdf-cache/<sha256>.png    first page, when pdftoppm or PyMuPDF is available
+#   .pdf-cache/files.json      path -> [size, mtime_ns, sha256], so unchanged files are not hashed again
+#
+# Results are keyed by content, so each PDF is processed once however often
+# it is linked or renamed. Extraction runs in worker processes. Text comes
+# from pypdf when installed, otherwise from a small built-in reader that
+# handles the usual text PDFs (Flate streams, ToUnicode maps) and leaves
+# scanned or encrypted ones empty.
+#
+#   python podcast_cli.py pdfs
+#   python podcast_cli.py pdfs --text "podcasts/pdfs/Heavy Metal.pdf"
+
+
+# --- BUILT-IN READER ---
+
+OBJECT = re.compile(rb'(\d+)\s+(\d+)\s+obj\b(.*?)\bendobj', re.DOTALL)
+REF = re.compile(rb'(\d+)\s+\d+\s+R')
+STREAM = re.compile(rb'stream\r?\n')
+TOKEN = re.compile(rb'\(|<<|>>|<[0-9A-Fa-f\s]*>|\[|\]|/[^\s/\[\]()<>{}%]*|[-+]?\d*\.?\d+|[A-Za-z\'"*]+|%[^\r\n]*')
+ESCAPES = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'\b', b'f': b'\f'}
+
+
+def read_objects(data):
+    """
+    {object number: body} including objects packed into object streams; later
+    definitions (incremental updates) win.
+    """
+    objects = {int(m.group(1)): m.group(3) for m in OBJECT.finditer(data)}
+    for body in list(objects.values()):
+        if not re.search(rb'/Type\s*/ObjStm', body):
+            continue
+        content = stream_data(body)
+        first = re.search(rb'/First\s+(\d+)', body)
+        if content is None or not first:
+            continue
+        header = content[:int(first.group(1))].split()
+        offsets = [(int(header[i]), int(header[i + 1])) for i in range(0, len(header) - 1, 2)]
+        for n, (number, offset) in enumerate(offsets):
+            start = int(first.group(1)) + offset
+            end = int(first.group(1)) + offsets[n + 1][1] if n + 1 < len(offsets) else len(content)
+            objects.setdefault(number, content[start:end])
+    return objects
+
+def stream_data(body):
+    """
+    Decoded stream of an object, or None (no stream, or a filter we cannot undo).
+    """
+    m = STREAM.search(body)
+    if not m:
+        return None
+    end = body.rfind(b'endstream')
+    raw = body[m.end():end if end != -1 else len(body)]
+    filters = re.findall(rb'/(\w+Decode)', body[:m.start()])
+    if not filters:
+        return raw
+    if filters != [b'FlateDecode']:
+        return None
+    try:
+        return zlib.decompressobj().decompress(raw)
+    except zlib.error:
+        return None
+
+def resolve(objects, value):
+    m = REF.fullmatch(value.strip()) if value else None
+    return objects.get(int(m.group(1)), b"") if m else value
+
+def dict_value(body, key):
+    """
+    Raw value of /key in a dictionary: a reference, array, dictionary or name.
+    """
+    m = re.search(rb'/' + key + rb'\s*(\d+\s+\d+\s+R|\[[^\]]*\]|<<|/\w+|\d+)', body)
+    if not m:
+        return None
+    if m.group(1) != b'<<':
+        return m.group(1)
+    depth, i = 0, m.start(1)
+    while i < len(body):
+        if body.startswith(b'<<', i):
+            depth += 1
+            i += 2
+        elif body.startswith(b'>>', i):
+            depth -= 1
+            i += 2
+            if not depth:
+                return body[m.start(1):i]
+        else:
+            i += 1
+    return body[m.start(1):]
+
+def page_objects(objects):
+    """
+    Page dictionaries in reading order, following /Kids from the page tree root.
+    """
+    catalog = next((b for b in objects.values() if re.search(rb'/Type\s*/Catalog', b)), None)
+    root = resolve(objects, dict_value(catalog, b'Pages')) if catalog else None
+    if not root:
+        return [b for b in objects.values() if re.search(rb'/Type\s*/Page(?!s)', b)]
+    pages, pending, seen = [], [root], set()
+    while pending:
+        node = pending.pop(0)
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        kids = dict_value(node, b'Kids')
+        if kids is None:
+            pages.append(node)
+            continue
+        pending[:0] = [objects.get(int(n), b"") for n in REF.findall(kids)]
+    return pages
+
+def parse_cmap(data):
+    """
+    ToUnicode CMap -> ({code bytes: text}, code length).
+    """
+    mapping, length = {}, 1
+    space = re.search(rb'begincodespacerange\s*<([0-9A-Fa-f]+)>', data)
+    if space:
+        length = len(space.group(1)) // 2
+    def text(hexstr):
+        raw = bytes.fromhex(hexstr.decode('ascii'))
+        return raw.decode('utf-16-be', 'replace')
+    for block in re.findall(rb'beginbfchar(.*?)endbfchar', data, re.DOTALL):
+        for src, dst in re.findall(rb'<([0-9A-Fa-f]+)>\s*<([0-9A-Fa-f]*)>', block):
+            mapping[bytes.fromhex(src.decode('ascii'))] = text(dst)
+    for block in re.findall(rb'beginbfrange(.*?)endbfrange', data, re.DOTALL):
+        for lo, hi, dst in re.findall(rb'<([0-9A-Fa-f]+)>\s*<([0-9A-Fa-f]+)>\s*(<[0-9A-Fa-f]*>|\[[^\]]*\])', block):
+            start, stop, size = int(lo, 16), int(hi, 16), len(lo) // 2
+            if stop - start > 0xFFFF:
+                continue
+            if dst.startswith(b'['):
+                targets = re.findall(rb'<([0-9A-Fa-f]*)>', dst)
+                for n, target in enumerate(targets[:stop - start + 1]):
+                    mapping[(start + n).to_bytes(size, 'big')] = text(target)
+            else:
+                base = bytes.fromhex(dst[1:-1].decode('ascii'))
+                for n in range(stop - start + 1):
+                    code = base[:-2] + (int.from_bytes(base[-2:], 'big') + n).to_bytes(2, 'big') if len(base) >= 2 \
+                        else bytes([base[-1] + n & 0xFF])
+                    mapping[(start + n).to_bytes(size, 'big')] = code.decode('utf-16-be', 'replace')
+    return mapping, length
+
+def page_fonts(objects, page):
+    """
+    {font resource name: (cmap, code length)} for the fonts of a page that have a ToUnicode map.
+    """
+    resources = resolve(objects, dict_value(page, b'Resources')) or b""
+    fonts = resolve(objects, dict_value(resources, b'Font')) or b""
+    result = {}
+    for name, number in re.findall(rb'/([^\s/<>\[\]()]+)\s+(\d+)\s+\d+\s+R', fonts):
+        to_unicode = dict_value(objects.get(int(number), b""), b'ToUnicode')
+        cmap = stream_data(resolve(objects, to_unicode)) if to_unicode else None
+        if cmap:
+            result[name] = parse_cmap(cmap)
+    return result
+
+def literal_string(data, i):
+    """
+    Reads a (...) string starting after the "(" at i. Returns (bytes, next index).
+    """
+    out, depth = bytearray(), 1
+    while i < len(data):
+        c = data[i:i + 1]
+        if c == b'\\':
+            nxt = data[i + 1:i + 2]
+            if nxt in ESCAPES:
+                out += ESCAPES[nxt]
+                i += 2
+            elif nxt.isdigit():
+                octal = re.match(rb'[0-7]{1,3}', data[i + 1:i + 4]).group(0)
+                out.append(int(octal, 8) & 0xFF)
+                i += 1 + len(octal)
+            elif nxt in (b'\r', b'\n'):
+                i += 2 + (data[i + 1:i + 3] == b'\r\n')
+            else:
+                out += nxt
+                i += 2
+            continue
+        if c == b'(':
+            depth += 1
+        elif c == b')':
+            depth -= 1
+            if not depth:
+                return bytes(out), i + 1
+        out += c
+        i += 1
+    return bytes(out), i
+
+def decode_text(raw, font):
+    if font:
+        cmap, length = font
+        return "".join(cmap.get(raw[i:i + length], "") for i in range(0, len(raw), length))
+    if raw.startswith(b'\xfe\xff'):
+        return raw[2:].decode('utf-16-be', 'replace')
+    return raw.decode('cp1252', 'replace')
+
+def content_text(data, fonts):
+    """
+    Text shown by the operators of one content stream. Lines break where the
+    baseline moves; pieces placed on the same baseline are joined.
+    """
+    pieces, operands, font, i = [], [], None, 0
+    y, shown_y = 0.0, None
+
+    def show(raw):
+        nonlocal shown_y
+        if shown_y is not None and abs(y - shown_y) > 1:
+            pieces.append("\n")
+        shown_y = y
+        pieces.append(decode_text(raw, font))
+
+    def number(token):
+        try:
+            return float(token)
+        except (TypeError, ValueError):
+            return 0.0
+
+    while True:
+        m = TOKEN.search(data, i)
+        if not m:
+            break
+        token, i = m.group(0), m.end()
+        if token == b'(':
+            raw, i = literal_string(data, i)
+            operands.append(('str', raw))
+        elif token.startswith(b'<') and token != b'<<':
+            digits = re.sub(rb'\s', b'', token[1:-1]).decode('ascii')
+            operands.append(('str', bytes.fromhex(digits + "0" * (len(digits) % 2))))
+        elif token == b'[':
+            operands.append(token)
+        elif token == b']':
+            start = len(operands) - 1 - operands[::-1].index(b'[') if b'[' in operands else 0
+            operands[start:] = [('array', operands[start + 1:])]
+        elif token.startswith((b'/', b'%', b'<<', b'>>')) or token[:1].isdigit() or token[:1] in b'-+.':
+            operands.append(token)
+        else:
+            op = token
+            strings = [o[1] for o in operands if isinstance(o, tuple) and o[0] == 'str']
+            if op == b'Tf' and len(operands) >= 2 and isinstance(operands[-2], bytes):
+                font = fonts.get(operands[-2][1:])
+            elif op == b'Tm' and len(operands) >= 6:
+                y = number(operands[-1])
+            elif op in (b'Td', b'TD') and len(operands) >= 2:
+                y += number(operands[-1])
+            elif op == b'T*':
+                y -= 1000   # next line: only the break matters
+            elif op in (b"'", b'"'):
+                y -= 1000
+                if strings:
+                    show(strings[-1])
+            elif op == b'Tj' and strings:
+                show(strings[-1])
+            elif op == b'TJ' and operands and isinstance(operands[-1], tuple) and operands[-1][0] == 'array':
+                for item in operands[-1][1]:
+                    if isinstance(item, tuple):
+                        show(item[1])
+                    elif number(item) < -200:
+                        pieces.append(" ")
+            operands = []
+    return "".join(pieces)
+
+def builtin_extract(path):
+    """
+    (pages, text) with the built-in reader.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(b'%PDF'):
+        raise ValueError("Not a PDF file")
+    if re.search(rb'/Encrypt\s', data):
+        raise ValueError("Encrypted PDF")
+    objects = read_objects(data)
+    texts = []
+    pages = page_objects(objects)
+    for page in pages:
+        fonts = page_fonts(objects, page)
+        contents = dict_value(page, b'Contents') or b""
+        for number in REF.findall(contents):
+            stream = stream_data(objects.get(int(number), b""))
+            if stream:
+                texts.append(content_text(stream, fonts))
+        texts.append("\n\n")
+    return len(pages), "".join(texts)
+
+
+# --- EXTRACTION ---
+
+def clean_text(text):
+    lines = (" ".join(line.split()) for line in text.replace("\x00", "").splitlines())
+    return re.sub(r'\n{3,}', "\n\n", "\n".join(lines)).strip()[:MAX_TEXT]
+
+def thumbnail_tool():
+    if shutil.which("pdftoppm"):
+        return "pdftoppm"
+    return "pymupdf" if fitz is not None else None
+
+def render_thumbnail(path, out):
+    """
+    First page as PNG, THUMBNAIL_WIDTH wide. Returns True if one was written.
+    """
+    tool = thumbnail_tool()
+    if tool == "pdftoppm":
+        prefix = out[:-4]
+        proc = subprocess.run(["pdftoppm", "-png", "-f", "1", "-l", "1", "-singlefile",
+                               "-scale-to-x", str(THUMBNAIL_WIDTH), "-scale-to-y", "-1", path, prefix],
+                              capture_output=True, timeout=120)
+        return proc.returncode == 0 and os.path.exists(out)
+    if tool == "pymupdf":
+        with fitz.open(path) as doc:
+            page = doc[0]
+            zoom = THUMBNAIL_WIDTH / page.rect.width
+            page.get_pixmap(matrix=fitz.Matrix(zoom, zoom)).save(out)
+        return True
+    return False
+
+def extract_file(path, digest, cache):
+    """
+    Worker: extracts one PDF and writes its cache entry. Returns the entry.
+    """
+    entry = {'v': EXTRACT_VERSION, 'pages': 0, 'words': 0, 'text': "", 'thumbnail': None, 'error': None}
+    try:
+        if pypdf is not None:
+            reader = pypdf.PdfReader(path)
+            entry['extractor'] = "pypdf"
+            entry['pages'] = len(reader.pages)
+            text = "\n\n".join(page.extract_text() or "" for page in reader.pages)
+        else:
+            entry['extractor'] = "builtin"
+            entry['pages'], text = builtin_extract(path)
+        entry['text'] = clean_text(text)
+        entry['words'] = len(entry['text'].split())
+    except Exception as e:
+        # Cached too: a broken PDF is not retried until it changes
+        entry['error'] = f"{type(e).__name__}: {e}"
+    try:
+        if render_thumbnail(path, os.path.join(cache, digest + ".png")):
+            entry['thumbnail'] = digest + ".png"
+    except (OSError, RuntimeError, ValueError, subprocess.SubprocessError):
+        pass
+    entry['thumbnail_tool'] = thumbnail_tool()
+    _write_json(os.path.join(cache, digest + ".json"), entry)
+    return entry
+
+
+# --- CACHE ---
+
+def cache_dir(root=None):
+    return os.path.join(root or SCRIPT_DIR, CACHE_NAME)
+
+def _read_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def is_current(entry):
+    # A thumbnail is tried again once a tool to render it is installed
+    return (entry is not None and entry.get('v') == EXTRACT_VERSION
+            and (entry['thumbnail'] or entry.get('thumbnail_tool') == thumbnail_tool()))
+
+@timed("pdfs.process")
+def process(paths, root=None, workers=None):
+    """
+    Makes sure every PDF in `paths` is extracted; only new or changed files
+    are read. Returns {path: entry (with 'sha256' and 'cached')}.
+    """
+    cache = cache_dir(root)
+    signatures_path = os.path.join(cache, "files.json")
+    signatures = _read_json(signatures_path) or {}
+    results, todo = {}, {}
+    for path in dict.fromkeys(os.path.abspath(p) for p in paths):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            results[path] = {'error': "File not found", 'pages': 0, 'words': 0, 'text': "", 'thumbnail': None}
+            continue
+        known = signatures.get(path)
+        if known and known[:2] == [stat.st_size, stat.st_mtime_ns]:
+            digest = known[2]
+        else:
+            digest = file_digest(path)
+            signatures[path] = [stat.st_size, stat.st_mtime_ns, digest]
+        entry = _read_json(os.path.join(cache, digest + ".json"))
+        if is_current(entry):
+            results[path] = {**entry, 'sha256': digest, 'cached': True}
+        else:
+            todo.setdefault(digest, []).append(path)
+
+    if todo:
+        os.makedirs(cache, exist_ok=True)
+        workers = min(workers or os.cpu_count() or 1, len(todo))
+        jobs = [(paths_[0], digest, cache) for digest, paths_ in todo.items()]
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                entries = list(pool.map(extract_file, *zip(*jobs)))
+        else:
+            entries = [extract_file(*job) for job in jobs]
+        for (digest, paths_), entry in zip(todo.items(), entries):
+            for path in paths_:
+                results[path] = {**entry, 'sha256': digest, 'cached': False}
+    if todo or len(signatures) != len(_read_json(signatures_path) or {}):
+        _write_json(signatures_path, signatures)
+    return results
+
+def thumbnail_path(entry, root=None):
+    return os.path.join(cache_dir(root), entry['thumbnail']) if entry.get('thumbnail') else None
+
+
+# --- SOURCES ---
+
+def source_pdf(source, section, root=None):
+    """
+    Local file a PDF source of an episode points to, or None.
+    """
+    value = unquote(source.split('#', 1)[0].split('?', 1)[0]).strip()
+    if not value.lower().endswith(".pdf") or value.lower().startswith(("http:", "https:", "//")):
+        return None
+    page_dir = os.path.dirname(podcast_api.section_path(section, root))
+    return os.path.normpath(os.path.join(page_dir, value))
+
+def all_pdfs(root=None):
+    """
+    Every PDF in podcasts/pdfs plus every local PDF an episode links to.
+    """
+    folder = os.path.join(root or SCRIPT_DIR, PDF_DIR)
+    paths = [os.path.join(folder, name) for name in sorted(os.listdir(folder))
+             if name.lower().endswith(".pdf")] if os.path.isdir(folder) else []
+    for section in podcast_api.list_sections(root):
+        for podcast in podcast_api.list_podcasts(section, root):
+            paths += [p for p in (source_pdf(s, section, root) for s in podcast['sources']) if p]
+    return list(dict.fromkeys(os.path.abspath(p) for p in paths))
+
+def episode_texts(sections_podcasts, root=None):
+    """
+    [(section, podcast)] -> list of the PDF text of each episode's sources
+    ("" without any), extracting all PDFs in one pool run.
+    """
+    wanted = [[p for p in (source_pdf(s, section, root) for s in podcast['sources']) if p]
+              for section, podcast in sections_podcasts]
+    entries = process([p for paths in wanted for p in paths], root) if any(wanted) else {}
+    return ["\n\n".join(entries[os.path.abspath(p)]['text'] for p in paths) for paths in wanted]
+
+@timed("pdfs.run")
+def extract_all(root=None, workers=None):
+    """
+    Extracts every PDF of the site. Returns a summary per file (no text).
+    """
+    root = root or SCRIPT_DIR
+    results = process(all_pdfs(root), root, workers)
+    return [{'file': os.path.relpath(path, root).replace(os.sep, "/"), 'pages': e['pages'], 'words': e['words'],
+             'thumbnail': thumbnail_path(e, root), 'extractor': e.get('extractor'), 'cached': e.get('cached'),
+             'error': e['error']} for path, e in results.items()]
@@ -0,0 +1,258 @@
+import os
+import re
+import sys
+import json
+import wave
+import array
+import shutil
+import hashlib
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from podcast_core import CARD_FORMAT_VERSION
+from podcast_timing import timed
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PEAKS_DIR = os.path.join("podcasts", "peaks")  # published, fetched by podcasts/waveform.js
+CACHE_NAME = ".peaks-cache"                   # by audio hash, survives renamed links
+
+PEAKS_VERSION = 1
+POINTS = 200            # bars per waveform
+BLOCK_SECONDS = 0.05    # resolution of the first pass, reduced to POINTS at the end
+DECODE_RATE = 8000      # ffmpeg decodes to 8 kHz mono, plenty for a preview
+READ_FRAMES = 1 << 16
+AUDIO_TAG = re.compile(r'<audio\b([^>]*)>')
+
+# Peaks file: {"v": 1, "duration": seconds, "peaks": [0..255, ...]}
+
+
+# --- LOOKUP ---
+
+def peaks_name(link):
+    # Named after the link, so generate_html_block can point at it without decoding anything
+    return hashlib.sha1(link.encode('utf-8')).hexdigest()[:16] + ".json"
+
+def peaks_path(link, root=None):
+    return os.path.join(root or SCRIPT_DIR, PEAKS_DIR, peaks_name(link))
+
+def peaks_url(link, root=None):
+    """
+    URL of the published peaks of a link, relative to a section page, or None.
+    """
+    if not link or not os.path.exists(peaks_path(link, root)):
+        return None
+    return f"../peaks/{peaks_name(link)}"
+
+def load_peaks(link, root=None):
+    path = peaks_path(link, root)
+    if not link or not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def resolve_audio(link, section, root=None):
+    """
+    Local file for an episode link: a file next to the site (../audio/x.opus)
+    or the mirrored copy of a remote URL. None if there is no local copy.
+    """
+    root = root or SCRIPT_DIR
+    if link.lower().startswith(("http://", "https://")):
+        import podcast_mirror
+        return podcast_mirror.mirrored_path(link, root)
+    path = os.path.normpath(os.path.join(root, "podcasts", section, link.split('?', 1)[0]))
+    return path if os.path.isfile(path) else None
+
+
+# --- DECODING ---
+
+def _wav_samples(data, width):
+    """
+    Raw little-endian PCM -> array of signed 16-bit style values.
+    """
+    if width == 1:
+        return array.array('h', ((b - 128) << 8 for b in data))
+    if width == 3:
+        # Keep the two most significant bytes of every 24-bit sample
+        buf = bytearray(len(data) // 3 * 2)
+        buf[0::2] = data[1::3]
+        buf[1::2] = data[2::3]
+        data, width = bytes(buf), 2
+    samples = array.array('h' if width == 2 else 'i', data)
+    if sys.byteorder == 'big':
+        samples.byteswap()
+    if width == 4:
+        samples = array.array('h', (s >> 16 for s in samples))
+    return samples
+
+def wav_blocks(path):
+    """
+    Streams (block peaks, duration) from a WAV file with the standard library.
+    """
+    with wave.open(path, 'rb') as w:
+        width, channels, rate = w.getsampwidth(), w.getnchannels(), w.getframerate()
+        block = max(1, int(rate * BLOCK_SECONDS)) * channels
+        peaks = []
+        rest = array.array('h')
+        while True:
+            data = w.readframes(READ_FRAMES)
+            if not data:
+                break
+            samples = rest + _wav_samples(data, width)
+            whole = len(samples) - len(samples) % block
+            for i in range(0, whole, block):
+                chunk = samples[i:i + block]
+                peaks.append(max(max(chunk), -min(chunk)))
+            rest = samples[whole:]
+        if rest:
+            peaks.append(max(max(rest), -min(rest)))
+        return peaks, w.getnframes() / rate
+
+def ffmpeg_blocks(path, ffmpeg):
+    """
+    Streams (block peaks, duration) from anything ffmpeg can decode.
+    """
+    block = int(DECODE_RATE * BLOCK_SECONDS)
+    cmd = [ffmpeg, "-nostdin", "-hide_banner", "-loglevel", "error", "-i", path,
+           "-vn", "-ac", "1", "-ar", str(DECODE_RATE), "-f", "s16le", "-"]
+    peaks = []
+    total = 0
+    rest = array.array('h')
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as proc:
+        for data in iter(lambda: proc.stdout.read(READ_FRAMES * 2), b""):
+            samples = rest + _wav_samples(data[:len(data) - len(data) % 2], 2)
+            total += len(data) // 2
+            whole = len(samples) - len(samples) % block
+            for i in range(0, whole, block):
+                chunk = samples[i:i + block]
+                peaks.append(max(max(chunk), -min(chunk)))
+            rest = samples[whole:]
+        error = proc.stderr.read().decode('utf-8', 'replace')
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg could not decode {os.path.basename(path)}: {error.strip()[-300:]}")
+    if rest:
+        peaks.append(max(max(rest), -min(rest)))
+    return peaks, total / DECODE_RATE
+
+def reduce_peaks(blocks, points=POINTS):
+    """
+    Folds the block peaks into `points` bars scaled to 0..255.
+    """
+    if not blocks:
+        return []
+    bars = []
+    for i in range(min(points, len(blocks))):
+        start = i * len(blocks) // min(points, len(blocks))
+        end = (i + 1) * len(blocks) // min(points, len(blocks))
+        bars.append(max(blocks[start:end]))
+    loudest = max(bars) or 1
+    return [min(255, round(b * 255 / loudest)) for b in bars]
+
+@timed("peaks.compute")
+def compute_peaks(path):
+    if path.lower().endswith(".wav"):
+        try:
+            blocks, duration = wav_blocks(path)
+        except (wave.Error, EOFError):
+            blocks = None
+        if blocks is not None:
+            return {'v': PEAKS_VERSION, 'duration': round(duration, 2), 'peaks': reduce_peaks(blocks)}
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        raise FileNotFoundError(f"ffmpeg is needed to decode {os.path.basename(path)} (only WAV works without it)")
+    blocks, duration = ffmpeg_blocks(path, ffmpeg)
+    return {'v': PEAKS_VERSION, 'duration': round(duration, 2), 'peaks': reduce_peaks(blocks)}
+
+
+# --- CACHE ---
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def cached_peaks(path, root=None):
+    """
+    Peaks of an audio file, decoded only if this exact file was never seen.
+    Returns (peaks, from_cache).
+    """
+    cache_dir = os.path.join(root or SCRIPT_DIR, CACHE_NAME)
+    cache_path = os.path.join(cache_dir, f"{file_hash(path)}-v{PEAKS_VERSION}-{POINTS}.json")
+    if os.path.exists(cache_path):
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f), True
+    peaks = compute_peaks(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    write_json(cache_path, peaks)
+    return peaks, False
+
+def write_json(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+# --- STAGE ---
+
+def peaks_for_episode(section, podcast, root):
+    link = podcast['link']
+    audio = resolve_audio(link, section, root) if link else None
+    result = {'section': section, 'index': podcast['index'], 'title': podcast['title']}
+    if not audio:
+        return {**result, 'status': 'no local audio (run mirror or transcode)'}
+    try:
+        peaks, from_cache = cached_peaks(audio, root)
+    except (OSError, RuntimeError) as e:
+        return {**result, 'status': 'failed', 'error': str(e)}
+    target = peaks_path(link, root)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    write_json(target, peaks)
+    return {**result, 'status': 'cached' if from_cache else 'decoded'}
+
+def with_peaks(block, url):
+    """
+    The card with only its <audio> tag changed to load the peaks at url,
+    or None if it has no audio player (moodle cards).
+    """
+    match = AUDIO_TAG.search(block)
+    if not match:
+        return None
+    attrs = re.sub(r'\s+(?:preload|data-peaks)="[^"]*"', "", match.group(1))
+    return f'{block[:match.start()]}<audio{attrs} preload="none" data-peaks="{url}">{block[match.end():]}'
+
+@timed("peaks.run")
+def generate(sections=None, root=None, workers=4):
+    """
+    Publishes peaks for every episode with local audio and points the cards
+    that do not reference their peaks yet at them (one commit for all
+    sections). Only the audio tag changes; cards in an older format are
+    left alone until podcast_cli.py migrate has brought them up to date.
+    """
+    import podcast_api
+    root = root or SCRIPT_DIR
+    episodes = []
+    for section in sections or podcast_api.list_sections(root):
+        _, _, podcasts = podcast_api.read_section(section, root)
+        episodes.extend((section, p) for p in podcasts)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = list(pool.map(lambda e: peaks_for_episode(e[0], e[1], root), episodes))
+
+    operations = []
+    for (section, podcast), result in zip(episodes, results):
+        url = peaks_url(podcast['link'], root)
+        if not url or f'data-peaks="{url}"' in podcast['full_block']:
+            continue
+        if podcast['format'] != CARD_FORMAT_VERSION:
+            result['card'] = 'legacy format (run podcast_cli.py migrate first)'
+            continue
+        block = with_peaks(podcast['full_block'], url)
+        if block:
+            operations.append({'op': 'update', 'section': section, 'index': podcast['index'],
+                               'block': block, 'expected_block': podcast['full_block']})
+            result['card'] = 'updated'
+    if operations:
+        podcast_api.commit(operations, root)
+    return results
@@ -0,0 +1,106 @@
+import re
+import time
+
+import podcast_api
+from podcast_timing import timed
+
+# Find and replace on the parsed fields of every episode, instead of editing
+# cards one by one or the raw HTML:
+#
+#   python podcast_cli.py replace "http://archive.org" "https://archive.org" --field link --field sources
+#   python podcast_cli.py replace "Mülller" "Müller" --field authors --apply
+#   python podcast_cli.py replace "\bSRF ?2\b" "SRF 2 Kultur" --regex --section m2a
+#
+# Without --apply only the preview diff is shown. With --apply every section
+# is read once and all changed pages are written together through
+# podcast_api.commit (one atomic write per file, one undo step per section,
+# audit log). Each update carries the values it replaces as 'expected', so
+# an episode someone else changed in between makes the write fail instead
+# of being overwritten.
+
+LIST_FIELDS = ('authors', 'sources')
+
+
+def compile_pattern(pattern, regex=False, ignore_case=False):
+    if not pattern:
+        raise ValueError("Empty search pattern")
+    try:
+        return re.compile(pattern if regex else re.escape(pattern), re.IGNORECASE if ignore_case else 0)
+    except re.error as e:
+        raise ValueError(f"Invalid regular expression {pattern!r}: {e}")
+
+def replace_value(compiled, replacement, value, regex):
+    """
+    (new value, matches) for a field value; list fields are replaced item by
+    item. A literal replacement is used as is (no backslash escapes).
+    """
+    repl = replacement if regex else (lambda m: replacement)
+    try:
+        if isinstance(value, list):
+            new, count = [], 0
+            for item in value:
+                replaced, n = compiled.subn(repl, item)
+                new.append(replaced)
+                count += n
+            return new, count
+        return compiled.subn(repl, value)
+    except (re.error, IndexError) as e:
+        raise ValueError(f"Invalid replacement {replacement!r}: {e}")
+
+def diff_lines(change):
+    """
+    The preview of one changed episode, in unified-diff style.
+    """
+    lines = [f"@@ {change['section']} #{change['index']} {change['title']}"]
+    for field, (before, after) in change['fields'].items():
+        if field in LIST_FIELDS:
+            lines += [f"-{field}: {item}" for item in before if item not in after]
+            lines += [f"+{field}: {item}" for item in after if item not in before]
+        else:
+            lines += [f"-{field}: {before}", f"+{field}: {after}"]
+    return lines
+
+@timed("replace.run")
+def replace(pattern, replacement, fields=None, sections=None, root=None, regex=False, ignore_case=False,
+            apply=False):
+    """
+    Replaces `pattern` in the given fields (default: all) of every episode of
+    the given sections (default: all). Returns {'changes': [{'section',
+    'index', 'title', 'fields': {field: [before, after]}}], 'matches',
+    'by_field', 'episodes', 'sections', 'applied', 'seconds'}.
+    """
+    start = time.perf_counter()
+    fields = list(fields or podcast_api.FIELDS)
+    unknown = set(fields) - set(podcast_api.FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+    compiled = compile_pattern(pattern, regex, ignore_case)
+
+    changes, operations, loaded = [], [], {}
+    by_field = dict.fromkeys(fields, 0)
+    for section in sections or podcast_api.list_sections(root):
+        loaded[section] = podcast_api.read_section(section, root)
+        for podcast in loaded[section][2]:
+            changed = {}
+            for field in fields:
+                new, count = replace_value(compiled, replacement, podcast[field], regex)
+                by_field[field] += count
+                if new != podcast[field]:
+                    changed[field] = [podcast[field], new]
+            if not changed:
+                continue
+            data = {field: after for field, (_, after) in changed.items()}
+            emptied = [field for field in ('title', 'link') if field in data and not data[field].strip()]
+            if emptied:
+                raise ValueError(f"{section} #{podcast['index']} '{podcast['title']}' would have no {emptied[0]}")
+            changes.append({'section': section, 'index': podcast['index'], 'title': podcast['title'],
+                            'fields': changed})
+            operations.append({'op': 'update', 'section': section, 'index': podcast['index'], 'data': data,
+                               'expected': {field: before for field, (before, _) in changed.items()}})
+
+    if apply and operations:
+        # Sharded sections are re-read shard by shard in commit(); the rest reuse this read
+        podcast_api.commit(operations, root, loaded)
+    return {'changes': changes, 'matches': sum(by_field.values()), 'by_field': by_field,
+            'episodes': len(changes), 'sections': len({c['section'] for c in changes}),
+            'applied': bool(apply and operations), 'seconds': round(time.perf_counter() - start, 3)}
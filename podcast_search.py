@@ -0,0 +1,209 @@
+import os
+import re
+import json
+import html
+import hashlib
+import unicodedata
+
+import podcast_api
+import podcast_pdfs
+from podcast_timing import timed
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE = os.path.join(SCRIPT_DIR, ".search-cache")
+INDEX_DIR = "podcasts/search"   # published path, read by podcasts/search.js
+
+INDEX_VERSION = 2
+PREFIX_LENGTH = 2          # terms are sharded by their first letters...
+MAX_PREFIX_LENGTH = 4
+SHARD_BYTES = 16 * 1024    # ...and a shard bigger than this is split one letter deeper
+DOCS_PER_CHUNK = 64        # results fetch only the chunks they sit in
+SNIPPET_LENGTH = 140
+
+# Field bits stored with every posting; the client scores a hit by its fields.
+# 'pdf' is the text of the episode's PDF sources (podcast_pdfs.py), weighted lowest.
+FIELD_BITS = (('title', 8), ('authors', 4), ('details', 2), ('pdf', 1))
+
+# Layout of the index (everything but meta.json carries a content hash in its name,
+# so the browser may cache it forever and only refetches shards that changed):
+#   podcasts/search/meta.json             sections, shard and doc chunk file names
+#   podcasts/search/t/<prefix>-<hash>.json {term: [doc delta, field bits, ...]}
+#   podcasts/search/d/<n>-<hash>.json      [[section, index, title, authors, snippet], ...]
+
+
+# --- TERMS ---
+
+def normalize(text):
+    """
+    "Blütezeit" -> "blutezeit". Must match normalize() in podcasts/search.js.
+    """
+    text = unicodedata.normalize('NFKD', html.unescape(text).lower())
+    return "".join(c for c in text if not unicodedata.combining(c)).replace("ß", "ss")
+
+def tokenize(text):
+    return [t for t in re.split(r'[\W_]+', normalize(text)) if len(t) >= PREFIX_LENGTH]
+
+def shard_file(prefix):
+    # File names stay ASCII; other prefixes are written as hex
+    return prefix if re.fullmatch(r'[a-z0-9]+', prefix) else "x" + prefix.encode('utf-8').hex()
+
+
+# --- INDEX ---
+
+def collect_documents(root=None):
+    """
+    Every episode of every section, in page order: (sections, docs). Each
+    podcast gets a 'pdf' field with the text of its PDF sources.
+    """
+    sections = podcast_api.list_sections(root)
+    docs = []
+    for number, section in enumerate(sections):
+        for podcast in podcast_api.list_podcasts(section, root):
+            docs.append((number, podcast))
+    texts = podcast_pdfs.episode_texts([(sections[n], p) for n, p in docs], root)
+    for (_, podcast), text in zip(docs, texts):
+        podcast['pdf'] = text
+    return sections, docs
+
+def invert(docs):
+    """
+    {term: [(doc id, field bits), ...]} with doc ids ascending.
+    """
+    postings = {}
+    for doc_id, (_, podcast) in enumerate(docs):
+        bits = {}
+        for field, bit in FIELD_BITS:
+            value = podcast[field]
+            text = " ".join(value) if isinstance(value, list) else value
+            for term in tokenize(text):
+                bits[term] = bits.get(term, 0) | bit
+        for term, mask in bits.items():
+            postings.setdefault(term, []).append((doc_id, mask))
+    return postings
+
+def encode_postings(pairs):
+    flat = []
+    last = 0
+    for doc_id, mask in pairs:
+        flat.extend((doc_id - last, mask))
+        last = doc_id
+    return flat
+
+def _dump(data):
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+def split_shards(postings):
+    """
+    Groups terms by prefix. Shards over SHARD_BYTES are split one letter
+    deeper; terms too short for the deeper prefix stay in the parent shard.
+    Returns {prefix: {term: encoded postings}}.
+    """
+    shards = {}
+    pending = [(PREFIX_LENGTH, {t: encode_postings(p) for t, p in postings.items()})]
+    while pending:
+        length, terms = pending.pop()
+        groups = {}
+        for term, flat in terms.items():
+            groups.setdefault(term[:length], {})[term] = flat
+        for prefix, group in groups.items():
+            if length >= MAX_PREFIX_LENGTH or len(_dump(group).encode('utf-8')) <= SHARD_BYTES:
+                shards[prefix] = group
+                continue
+            short = {t: f for t, f in group.items() if len(t) <= length}
+            if short:
+                shards[prefix] = short
+            pending.append((length + 1, {t: f for t, f in group.items() if len(t) > length}))
+    return shards
+
+def snippet(text):
+    text = html.unescape(text)
+    if len(text) <= SNIPPET_LENGTH:
+        return text
+    return text[:SNIPPET_LENGTH].rsplit(" ", 1)[0] + " …"
+
+def hashed_name(folder, name, data):
+    return f"{folder}/{name}-{hashlib.sha256(data).hexdigest()[:10]}.json"
+
+@timed("search.build_index")
+def build_index(root=None, cache_dir=DEFAULT_CACHE):
+    """
+    Writes the search index into cache_dir and returns
+      'files' - published path (podcasts/search/...) -> file in the cache
+      plus counts for the build report.
+    Files whose content did not change are left alone, so the site build
+    sees the same bytes and skips them.
+    """
+    sections, docs = collect_documents(root)
+    shards = split_shards(invert(docs))
+
+    outputs = {}
+    meta = {'v': INDEX_VERSION, 'sections': sections, 'docs': len(docs),
+            'fields': dict(FIELD_BITS), 'shards': {}, 'chunks': []}
+    for prefix in sorted(shards):
+        data = _dump(shards[prefix]).encode('utf-8')
+        name = hashed_name("t", shard_file(prefix), data)
+        meta['shards'][prefix] = name
+        outputs[name] = data
+    for start in range(0, len(docs), DOCS_PER_CHUNK):
+        chunk = [[number, p['index'], html.unescape(p['title']), ", ".join(p['authors']), snippet(p['details'])]
+                 for number, p in docs[start:start + DOCS_PER_CHUNK]]
+        data = _dump(chunk).encode('utf-8')
+        name = hashed_name("d", str(start // DOCS_PER_CHUNK), data)
+        meta['chunks'].append(name)
+        outputs[name] = data
+    meta['chunk'] = DOCS_PER_CHUNK
+    outputs["meta.json"] = _dump(meta).encode('utf-8')
+
+    files = {}
+    for name, data in outputs.items():
+        path = os.path.join(cache_dir, *name.split("/"))
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(data)
+        elif name == "meta.json":
+            with open(path, 'rb') as f:
+                if f.read() != data:
+                    with open(path, 'wb') as out:
+                        out.write(data)
+        files[f"{INDEX_DIR}/{name}"] = path
+    prune(cache_dir, set(files.values()))
+
+    return {'files': files, 'docs': len(docs), 'terms': sum(len(s) for s in shards.values()),
+            'shards': len(shards), 'bytes': sum(len(d) for d in outputs.values())}
+
+def prune(cache_dir, keep):
+    for dirpath, _, filenames in os.walk(cache_dir):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if path not in keep:
+                os.remove(path)
+
+
+# --- QUERY ---
+
+def search(query, root=None, limit=20):
+    """
+    Same matching and ranking as podcasts/search.js, straight from the pages
+    (for the CLI and for checking the client against).
+    """
+    sections, docs = collect_documents(root)
+    postings = invert(docs)
+    terms = tokenize(query)
+    if not terms:
+        return []
+    scores = None
+    for term in terms:
+        hits = {}
+        for token, pairs in postings.items():
+            if token.startswith(term):
+                exact = token == term
+                for doc_id, mask in pairs:
+                    hits[doc_id] = max(hits.get(doc_id, 0), field_score(mask) + exact)
+        scores = hits if scores is None else {d: s + hits[d] for d, s in scores.items() if d in hits}
+    ranked = sorted(scores, key=lambda d: (-scores[d], d))[:limit]
+    return [{'section': sections[docs[d][0]], 'score': scores[d], **podcast_api.public_fields(docs[d][1])}
+            for d in ranked]
+
+def field_score(mask):
+    return sum(bit for _, bit in FIELD_BITS if mask & bit)
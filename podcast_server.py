@@ -0,0 +1,363 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, unquote
+
+import podcast_api
+from podcast_timing import timed, run_main
+
+# Local HTTP/JSON editing API, so several people can edit at the same time
+# (the dashboard and manage_podcast.py are single-user).
+#
+#   python podcast_server.py --port 8765
+#
+#   GET    /sections                     section names
+#   GET    /sections/<section>           episodes of a section
+#   GET    /sections/<section>/<index>   one episode
+#   POST   /sections/<section>           add an episode (JSON fields)
+#   PATCH  /sections/<section>/<index>   change fields; "expected": {...} guards against lost updates
+#   DELETE /sections/<section>/<index>   delete; optional body {"expected": {...}}
+#   POST   /bulk                         list of operations as for podcast_cli.py bulk, all or nothing
+#   GET    /stats                        request and commit counters
+#
+# An X-User header names the editor in the audit log (podcast_audit.py).
+#
+# Writes are group-committed: every write waits COMMIT_WINDOW for others,
+# then the whole round goes through one podcast_api.commit, i.e. one file
+# write (and one undo step) per touched section. An update or delete is
+# pinned to the episode at its index when the request arrives (its fields
+# become "expected" unless the client sent its own). A request that has to
+# wait for a later round, because an earlier one of the round touches the
+# same episode, therefore gets a 409 instead of changing whatever episode
+# has moved into that index meanwhile.
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+COMMIT_WINDOW = 0.005
+MAX_BODY = 1 << 20
+
+STATUS_TEXT = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+               405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+               500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def error_status(e):
+    """
+    HTTP status for the exceptions podcast_api raises.
+    """
+    if isinstance(e, HTTPError):
+        return e.status
+    if isinstance(e, podcast_api.ConflictError):
+        return 409
+    if isinstance(e, (IndexError, FileNotFoundError)):
+        return 404
+    if isinstance(e, ValueError):
+        return 400
+    return 500
+
+
+# --- GROUP COMMIT ---
+
+def _touched(operations):
+    return {(op.get('section'), op.get('index')) for op in operations if op.get('op') in ('update', 'delete')}
+
+class GroupCommitter:
+    """
+    Queues write requests (each a list of operations that must succeed or
+    fail together) and commits them in rounds on one writer thread.
+    """
+
+    def __init__(self, root=None, window=COMMIT_WINDOW, cache=None):
+        self.root = root
+        self.window = window
+        self.cache = cache
+        self.pending = []   # [(operations, future)]
+        self.wakeup = asyncio.Event()
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="commit")
+        self.stats = {'write_requests': 0, 'rounds': 0, 'commits': 0, 'operations': 0, 'fallbacks': 0}
+
+    async def submit(self, operations):
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((operations, future))
+        self.stats['write_requests'] += 1
+        self.wakeup.set()
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.wakeup.wait()
+            await asyncio.sleep(self.window)
+            self.wakeup.clear()
+            batch, self.pending = self.pending, []
+            while batch:
+                batch_round, batch = self.split_round(batch)
+                outcomes = await loop.run_in_executor(self.writer, self.commit_round, batch_round)
+                for (_, future), (ok, value) in zip(batch_round, outcomes):
+                    if future.done():
+                        continue
+                    if ok:
+                        future.set_result(value)
+                    else:
+                        future.set_exception(value)
+
+    @staticmethod
+    def split_round(batch):
+        """
+        Requests touching an episode another request of the round already
+        touches wait for the next round (one batch may change an episode once).
+        """
+        batch_round, later, touched = [], [], set()
+        for item in batch:
+            keys = _touched(item[0])
+            if keys & touched:
+                later.append(item)
+            else:
+                touched |= keys
+                batch_round.append(item)
+        return batch_round, later
+
+    @timed("server.commit_round")
+    def commit_round(self, batch_round):
+        """
+        Runs on the writer thread. Returns [(ok, results or exception)] per request.
+        """
+        self.stats['rounds'] += 1
+        operations = [op for ops, _ in batch_round for op in ops]
+        try:
+            results = podcast_api.commit(operations, self.root, self.preloaded(operations))
+        except Exception:
+            # Someone's request is invalid: commit the requests one by one,
+            # so only that one fails. commit() raises only before writing
+            # (planning, validation, the all-or-nothing write itself), so
+            # nothing of this round is on disk yet.
+            self.stats['fallbacks'] += 1
+            return [self.commit_one(ops) for ops, _ in batch_round]
+        self.stats['commits'] += 1
+        self.stats['operations'] += len(operations)
+        outcomes = []
+        for ops, _ in batch_round:
+            outcomes.append((True, [podcast_api._result(r) for r in results[:len(ops)]]))
+            results = results[len(ops):]
+        return outcomes
+
+    def preloaded(self, operations):
+        loaded = {}
+        if self.cache:
+            for section in {op.get('section') for op in operations}:
+                try:
+                    loaded[section] = self.cache.loaded(section)
+                except (ValueError, OSError):
+                    pass  # commit() reports it
+        return loaded
+
+    def commit_one(self, operations):
+        try:
+            results = podcast_api.commit(operations, self.root, self.preloaded(operations))
+        except Exception as e:
+            return False, e
+        self.stats['commits'] += 1
+        self.stats['operations'] += len(operations)
+        return True, [podcast_api._result(r) for r in results]
+
+
+# --- READS ---
+
+class SectionCache:
+    """
+    Parsed sections, reused until the page's (or shard manifest's) size or
+    modification time changes. The writer uses them too, so a round does not parse its pages again.
+    """
+
+    def __init__(self, root=None):
+        self.root = root
+        self.entries = {}   # section -> (signature, read_section() result, public episodes)
+
+    def _entry(self, section):
+        path = podcast_api.storage_path(section, self.root)
+        stat = os.stat(path)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        cached = self.entries.get(section)
+        if cached and cached[0] == signature:
+            return cached
+        loaded = podcast_api.read_section(section, self.root)
+        cached = self.entries[section] = (signature, loaded, [podcast_api.public_fields(p) for p in loaded[2]])
+        return cached
+
+    def loaded(self, section):
+        return self._entry(section)[1]
+
+    def episodes(self, section):
+        return self._entry(section)[2]
+
+
+# --- HTTP ---
+
+class PodcastServer:
+
+    def __init__(self, root=None, window=COMMIT_WINDOW):
+        self.root = root
+        self.cache = SectionCache(root)
+        self.committer = GroupCommitter(root, window, self.cache)
+        self.started = time.time()
+        self.requests = 0
+
+    async def handle(self, method, path, body, user=None):
+        parts = [unquote(p) for p in urlsplit(path).path.strip("/").split("/") if p]
+        loop = asyncio.get_running_loop()
+        if parts == ["sections"] and method == "GET":
+            return 200, podcast_api.list_sections(self.root)
+        if parts == ["stats"] and method == "GET":
+            return 200, {**self.committer.stats, 'requests': self.requests,
+                         'uptime': round(time.time() - self.started, 1)}
+        if parts == ["bulk"] and method == "POST":
+            if not isinstance(body, list) or not all(isinstance(op, dict) for op in body):
+                raise HTTPError(400, "Expected a JSON list of operations")
+            operations = [{**op, 'user': user} if user else op for op in body]
+            await loop.run_in_executor(None, self.pin, operations)
+            return 200, await self.committer.submit(operations)
+
+        if not parts or parts[0] != "sections" or len(parts) > 3:
+            raise HTTPError(404, f"No route for {path}")
+        section = parts[1] if len(parts) > 1 else ""
+        if len(parts) == 2:
+            if method == "GET":
+                return 200, await loop.run_in_executor(None, self.cache.episodes, section)
+            if method == "POST":
+                op = {'op': 'add', 'section': section, 'data': self.fields(body), 'user': user}
+                return 201, (await self.committer.submit([op]))[0]
+            raise HTTPError(405, f"{method} not allowed on a section")
+
+        if not parts[2].isdigit():
+            raise HTTPError(404, f"Invalid episode index: {parts[2]!r}")
+        index = int(parts[2])
+        if method == "GET":
+            episodes = await loop.run_in_executor(None, self.cache.episodes, section)
+            if index >= len(episodes):
+                raise IndexError(f"No episode with index {index} (section has {len(episodes)})")
+            return 200, episodes[index]
+        body = body or {}
+        if method in ("PATCH", "PUT", "DELETE"):
+            op = {'op': 'update' if method != "DELETE" else 'delete', 'section': section,
+                  'index': index, 'expected': body.pop('expected', None) if isinstance(body, dict) else None,
+                  'user': user}
+            if method != "DELETE":
+                op['data'] = self.fields(body)
+            await loop.run_in_executor(None, self.pin, [op])
+            return 200, (await self.committer.submit([op]))[0]
+        raise HTTPError(405, f"{method} not allowed on an episode")
+
+    def pin(self, operations):
+        """
+        Gives updates and deletes without "expected" (or expected_block) the
+        current fields of their episode, so they cannot hit another one later.
+        """
+        for op in operations:
+            if op.get('op') not in ('update', 'delete') or op.get('expected') or op.get('expected_block'):
+                continue
+            try:
+                episodes = self.cache.episodes(op.get('section'))
+            except (ValueError, OSError):
+                continue  # commit() reports it
+            index = op.get('index')
+            if isinstance(index, int) and 0 <= index < len(episodes):
+                op['expected'] = {k: v for k, v in episodes[index].items() if k != 'index'}
+
+    @staticmethod
+    def fields(body):
+        if not isinstance(body, dict):
+            raise HTTPError(400, "Expected a JSON object with episode fields")
+        return body
+
+    async def serve_client(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode('latin-1').partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length') or 0)
+                keep_alive = headers.get('connection', "").lower() != "close" and version.upper() == "HTTP/1.1"
+                if length > MAX_BODY:
+                    # The body is not read, so the connection cannot be reused
+                    status, payload = 413, {'error': "Request body too large"}
+                    keep_alive = False
+                else:
+                    raw = await reader.readexactly(length) if length else b""
+                    self.requests += 1
+                    try:
+                        body = json.loads(raw) if raw.strip() else None
+                        status, payload = await self.handle(method.upper(), target, body, headers.get('x-user'))
+                    except json.JSONDecodeError as e:
+                        status, payload = 400, {'error': f"Invalid JSON: {e}"}
+                    except Exception as e:
+                        status, payload = error_status(e), {'error': str(e)}
+
+                data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                writer.write(f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                             f"Content-Type: application/json; charset=utf-8\r\n"
+                             f"Content-Length: {len(data)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, ready=None):
+        server = await asyncio.start_server(self.serve_client, host, port)
+        committer = asyncio.create_task(self.committer.run())
+        if ready:
+            ready(server.sockets[0].getsockname())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            committer.cancel()
+            self.committer.writer.shutdown(wait=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON API for editing the podcast sections.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--root", help="Site root (default: the folder of this script)")
+    parser.add_argument("--window", type=float, default=COMMIT_WINDOW * 1000,
+                        help="Milliseconds a write waits to share its commit (default: 5)")
+    args = parser.parse_args()
+
+    import podcast_authors
+    podcast_authors.watch(args.root)
+    server = PodcastServer(args.root, args.window / 1000)
+
+    def ready(address):
+        print(f"Serving podcasts on http://{address[0]}:{address[1]} (Ctrl+C to stop)", file=sys.stderr)
+    try:
+        asyncio.run(server.serve(args.host, args.port, ready))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(run_main(main))
@@ -0,0 +1,330 @@
+import os
+import json
+import shutil
+import bisect
+
+import podcast_api
+import podcast_history
+from podcast_core import get_file_content, commit_files, extract_podcasts
+from podcast_timing import timed
+
+# Optional layout for sections that outgrow one page (a class archive over
+# many years). The cards move out of the page into shard files of at most
+# `size` cards each:
+#
+#   podcasts/<section>/index.html               the page, with <!-- SHARDS --> where the cards were
+#   podcasts/<section>/.shards/manifest.json    {"v", "revision", "size", "shards": [{"file", "count"}]}
+#   podcasts/<section>/.shards/0000.html        <main> cards </main>, one file per shard
+#
+# An append touches only the last shard (or starts a new one), an edit or
+# delete only the shard holding the episode, plus the small manifest. A
+# write therefore costs the same no matter how many years the archive holds.
+# Episode indices stay section-wide: the counts in the manifest map them to
+# a shard. build_site.py stitches the shards back into the published page.
+#
+#   python podcast_cli.py shard m2a --size 200    # convert, or re-split / repair a sharded section
+#   python podcast_cli.py unshard m2a             # back to a single page
+SHARDS_DIR = ".shards"
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+DEFAULT_SIZE = 200
+MARKER = "<!-- SHARDS -->"
+MAIN_START = "<main>"
+SHARD_HEAD = "<!-- Cards of this section; build_site.py stitches them into ../index.html -->\n"
+DEFAULT_CACHE = ".shard-pages"   # stitched pages for the build
+
+
+# --- LAYOUT ---
+
+def shards_dir(section, root=None):
+    return os.path.join(root or podcast_api.SCRIPT_DIR, "podcasts", section, SHARDS_DIR)
+
+def manifest_path(section, root=None):
+    return os.path.join(shards_dir(section, root), MANIFEST_NAME)
+
+def is_sharded(section, root=None):
+    return os.path.isfile(manifest_path(section, root))
+
+def parse_manifest(text, section):
+    manifest = json.loads(text)
+    if manifest.get('v') != MANIFEST_VERSION:
+        raise ValueError(f"Unsupported shard manifest version for '{section}': {manifest.get('v')!r}")
+    return manifest
+
+def dump_manifest(manifest):
+    return json.dumps(manifest, indent=1) + "\n"
+
+def load_manifest(section, root=None):
+    text = get_file_content(manifest_path(section, root))
+    if text is None:
+        raise FileNotFoundError(f"Section '{section}' is not sharded")
+    return parse_manifest(text, section)
+
+def shard_page(body):
+    # The text before the first card (what separated it from the previous
+    # shard) is kept, so the stitched page has the original spacing
+    return f"{SHARD_HEAD}{MAIN_START}\n{body.rstrip()}\n\n{podcast_api.MAIN_END}\n"
+
+def shard_body(content):
+    start = content.find(MAIN_START)
+    end = content.rfind(podcast_api.MAIN_END)
+    if start == -1 or end == -1:
+        raise ValueError("Shard file without <main> ... </main>")
+    body = content[start + len(MAIN_START):end]
+    return (body[1:] if body.startswith("\n") else body).rstrip()
+
+def locate(manifest, index):
+    """
+    (shard position, index within the shard) of a section-wide index.
+    """
+    starts, total = [], 0
+    for shard in manifest['shards']:
+        starts.append(total)
+        total += shard['count']
+    if not isinstance(index, int) or not 0 <= index < total:
+        raise IndexError(f"No episode with index {index!r} (section has {total})")
+    # Empty shards share their start with the next one; take the last of them
+    position = bisect.bisect_right(starts, index) - 1
+    return position, index - starts[position]
+
+def _starts(counts):
+    starts, total = [], 0
+    for count in counts:
+        starts.append(total)
+        total += count
+    return starts
+
+
+# --- READING ---
+
+@timed("shards.read")
+def read_section(section, root=None):
+    """
+    Same shape as podcast_api.read_section: (manifest path, None, podcasts).
+    Indices are section-wide; 'span' refers to the episode's shard file,
+    whose position is in 'shard'.
+    """
+    path = manifest_path(section, root)
+    manifest = load_manifest(section, root)
+    podcasts = []
+    for position, shard in enumerate(manifest['shards']):
+        content = get_file_content(os.path.join(os.path.dirname(path), shard['file'])) or ""
+        for p in extract_podcasts(content):
+            p['index'] = len(podcasts)
+            p['shard'] = position
+            podcasts.append(p)
+    return path, None, podcasts
+
+def stitch(section, root=None):
+    """
+    The section page with all shards put back in place of the marker.
+    """
+    page = get_file_content(podcast_api.section_path(section, root))
+    return page.replace(MARKER, cards(section, root), 1)
+
+def cards(section, root=None):
+    """
+    The card region of a sharded section: all shard bodies in order.
+    """
+    folder = shards_dir(section, root)
+    return "".join(shard_body(get_file_content(os.path.join(folder, shard['file'])) or shard_page(""))
+                   for shard in load_manifest(section, root)['shards'])
+
+def remove_unlisted(section, root=None):
+    """
+    Deletes shard files the manifest does not list (left over after a
+    re-split, or after undoing an append that started a new shard).
+    """
+    folder = shards_dir(section, root)
+    listed = {shard['file'] for shard in load_manifest(section, root)['shards']}
+    for name in os.listdir(folder):
+        if name.endswith(".html") and name not in listed:
+            os.remove(os.path.join(folder, name))
+
+
+# --- WRITING ---
+
+@timed("shards.plan")
+def plan(section, operations, root=None):
+    """
+    Splits a batch on a sharded section into one batch per touched shard for
+    podcast_api.plan_section_changes. Only those shards and the manifest are
+    read. Returns (files, changes, results): the new file contents, the
+    (path, old content, splices) for the history and the results with
+    section-wide indices.
+    """
+    path = manifest_path(section, root)
+    folder = os.path.dirname(path)
+    old_manifest = get_file_content(path)
+    manifest = parse_manifest(old_manifest, section)
+    shards = manifest['shards']
+    old_counts = [s['count'] for s in shards]
+
+    by_shard = {}   # shard position -> [(operation position, operation with local index)]
+    adds = []
+    for n, op in enumerate(operations):
+        if op.get('op') == 'add':
+            adds.append(n)
+            continue
+        if op.get('op') not in ('update', 'delete'):
+            raise ValueError(f"Unknown operation: {op.get('op')!r}")
+        position, local = locate(manifest, op.get('index'))
+        by_shard.setdefault(position, []).append((n, {**op, 'index': local}))
+
+    # Appends fill up the last shard, then start new ones
+    if adds:
+        if not shards:
+            shards.append({'file': "0000.html", 'count': 0})
+        last = len(shards) - 1
+        deleted = sum(1 for _, op in by_shard.get(last, []) if op['op'] == 'delete')
+        room = manifest['size'] - (shards[last]['count'] - deleted)
+        for n in adds:
+            if room <= 0:
+                shards.append({'file': f"{len(shards):04d}.html", 'count': 0})
+                last, room = len(shards) - 1, manifest['size']
+            by_shard.setdefault(last, []).append((n, operations[n]))
+            room -= 1
+
+    files, changes = {}, []
+    planned = {}
+    for position in sorted(by_shard):
+        shard = shards[position]
+        shard_path = os.path.join(folder, shard['file'])
+        existing = get_file_content(shard_path) if position < len(old_counts) else None
+        content = existing if existing is not None else shard_page("")
+        podcasts = extract_podcasts(content)
+        if len(podcasts) != shard['count']:
+            raise ValueError(f"Shard {shard['file']} of '{section}' has {len(podcasts)} cards but the manifest "
+                             f"says {shard['count']}; run 'podcast_cli.py shard {section}' to rebuild it")
+        items = by_shard[position]
+        splices, results = podcast_api.plan_section_changes(content, podcasts, [op for _, op in items], root)
+        shard['count'] += (sum(1 for r in results if r['op'] == 'add')
+                           - sum(1 for r in results if r['op'] == 'delete'))
+        planned[position] = (items, results)
+        if splices:
+            new = files[shard_path] = podcast_api.apply_splices(content, splices)
+            changes.append((shard_path, existing, splices) if existing is not None
+                           else (shard_path, "", [(0, 0, new)]))
+
+    old_starts = _starts(old_counts)
+    new_starts = _starts([s['count'] for s in shards])
+    ordered = [None] * len(operations)
+    for position, (items, results) in planned.items():
+        for (n, _), r in zip(items, results):
+            r['index'] += old_starts[position] if r['op'] == 'delete' else new_starts[position]
+            ordered[n] = r
+
+    if files:
+        manifest['revision'] = manifest.get('revision', 0) + 1
+        files[path] = dump_manifest(manifest)
+        changes.append((path, old_manifest, [(0, len(old_manifest), files[path])]))
+    return files, changes, ordered
+
+
+# --- CONVERSION ---
+
+def _split(body, size):
+    """
+    Cuts the card region of a page into shard bodies of `size` cards; text
+    between cards stays with the card that follows it.
+    """
+    pieces, last = [], 0
+    for p in extract_podcasts(body):
+        pieces.append(body[last:p['span'][1]])
+        last = p['span'][1]
+    if pieces:
+        pieces[-1] += body[last:]
+    return ["".join(pieces[i:i + size]) for i in range(0, len(pieces), size)] or [""]
+
+def _clear_history(section, root):
+    # Offsets in the old history no longer fit the new files
+    for key in (podcast_api.section_path(section, root), manifest_path(section, root)):
+        for stack in podcast_history.stacks_for(key):
+            stack.clear()
+
+@timed("shards.shard_section")
+def shard_section(section, size=DEFAULT_SIZE, root=None):
+    """
+    Moves the cards of a section into shards of `size` cards. On a section
+    that is already sharded this re-splits it and rebuilds the manifest from
+    the shard files (after they were edited by hand).
+    """
+    if not isinstance(size, int) or size < 1:
+        raise ValueError(f"Shard size must be a positive number, got {size!r}")
+    page_path = podcast_api.section_path(section, root)
+    page = get_file_content(page_path)
+    folder = shards_dir(section, root)
+    old = None
+    if is_sharded(section, root):
+        old = load_manifest(section, root)
+        template, body = page, cards(section, root)
+    else:
+        if MARKER in page:
+            raise ValueError(f"'{MARKER}' already on the page but no shard manifest; restore it or remove the marker")
+        podcasts = extract_podcasts(page)
+        if podcasts:
+            start, end = podcasts[0]['span'][0], podcasts[-1]['span'][1]
+        else:
+            start = end = page.rfind(podcast_api.MAIN_END)
+            if start == -1:
+                raise ValueError(f"'{podcast_api.MAIN_END}' tag not found.")
+        template = page[:start] + MARKER + page[end:]
+        body = page[start:end]
+
+    bodies = _split(body, size)
+    shards = [{'file': f"{i:04d}.html", 'count': len(extract_podcasts(b))} for i, b in enumerate(bodies)]
+    manifest = {'v': MANIFEST_VERSION, 'revision': (old or {}).get('revision', 0) + 1, 'size': size, 'shards': shards}
+    os.makedirs(folder, exist_ok=True)
+    files = {os.path.join(folder, s['file']): shard_page(b) for s, b in zip(shards, bodies)}
+    files[page_path] = template
+    files[manifest_path(section, root)] = dump_manifest(manifest)
+    commit_files(files)
+    remove_unlisted(section, root)
+    _clear_history(section, root)
+    podcast_api._notify([{'op': 'reload', 'section': section, 'index': None}])
+    return {'section': section, 'size': size, 'shards': len(shards), 'episodes': sum(s['count'] for s in shards)}
+
+@timed("shards.unshard_section")
+def unshard_section(section, root=None):
+    """
+    Puts all cards back into the section page and removes the shards.
+    """
+    episodes = sum(s['count'] for s in load_manifest(section, root)['shards'])
+    page = stitch(section, root)
+    _clear_history(section, root)
+    # The page first: until the manifest is gone the stitched page is simply
+    # a page without marker, so an interruption loses nothing
+    commit_files({podcast_api.section_path(section, root): page})
+    shutil.rmtree(shards_dir(section, root))
+    podcast_api._notify([{'op': 'reload', 'section': section, 'index': None}])
+    return {'section': section, 'episodes': episodes}
+
+
+# --- BUILD ---
+
+def build_pages(root=None, cache_dir=DEFAULT_CACHE):
+    """
+    Stitches every sharded section for the build. Returns 'files':
+    published path (podcasts/<section>/index.html) -> stitched page in the
+    cache, and 'sections'. Unchanged pages are not rewritten, so the build
+    manifest sees them as unchanged too.
+    """
+    root = root or podcast_api.SCRIPT_DIR
+    cache = os.path.join(root, cache_dir)
+    files = {}
+    for section in podcast_api.list_sections(root):
+        if not is_sharded(section, root):
+            continue
+        out = os.path.join(cache, section, "index.html")
+        data = stitch(section, root).encode('utf-8')
+        try:
+            with open(out, 'rb') as f:
+                unchanged = f.read() == data
+        except OSError:
+            unchanged = False
+        if not unchanged:
+            os.makedirs(os.path.dirname(out), exist_ok=True)
+            with open(out, 'wb') as f:
+                f.write(data)
+        files[f"podcasts/{section}/index.html"] = out
+    return {'files': files, 'sections': len(files)}
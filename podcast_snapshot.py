@@ -0,0 +1,348 @@
+import os
+import sys
+import json
+import time
+import zlib
+import hashlib
+import zipfile
+import datetime
+
+import podcast_chunks
+from podcast_timing import timed
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+STORE_NAME = ".snapshots"
+
+# Deduplicated backups of the site tree (replaces hand-made zips like podcasts.zip).
+#
+#   .snapshots/chunks/ab/<sha256>     every distinct chunk once, zlib-compressed when that helps
+#   .snapshots/snapshots/<id>.json    {'id', 'time', 'label', 'files': {path: {'size', 'mtime_ns',
+#                                      'mode', 'chunks': [sha256, ...]}}, 'bytes', 'new_bytes'}
+#
+# Files are cut with podcast_chunks (content-defined), so an edit in the
+# middle of a page or a re-tagged audio file only adds the chunks around the
+# change. Files whose size and mtime match the previous snapshot are not
+# read at all. Everything streams chunk by chunk: no file is ever held in
+# memory as a whole, however large the audio mirror gets.
+#
+#   python podcast_cli.py snapshot create --label "vor Semesterende"
+#   python podcast_cli.py snapshot list
+#   python podcast_cli.py snapshot restore 20261019-130000 --to /tmp/site
+#   python podcast_cli.py snapshot prune --keep-last 7 --keep-daily 30 --keep-weekly 12
+#   python podcast_cli.py snapshot export 20261019-130000 site.zip     (- for stdout)
+
+# Regenerable caches and build output are not backed up; the audio mirror,
+# undo history and audit log are
+EXCLUDED_DIRS = {".git", STORE_NAME, "_site", "__pycache__", ".image-cache", ".search-cache", ".peaks-cache",
+                 ".duplicate-cache", ".validate-cache", ".shard-pages", ".author-index",
+                 ".pages-cache", ".pdf-cache", ".deploy-cache"}
+EXCLUDED_SUFFIXES = (".tmp", ".pyc")
+
+# Already compressed: stored as is in the chunk store and in zip exports
+COMPRESSED_EXTENSIONS = {".mp3", ".m4a", ".mp4", ".aac", ".opus", ".ogg", ".oga", ".webm", ".flac",
+                         ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".zip", ".gz", ".br", ".pdf"}
+
+RAW, DEFLATED = b"r", b"z"
+
+
+# --- STORE ---
+
+def store_dir(root=None):
+    return os.path.join(root or SCRIPT_DIR, STORE_NAME)
+
+def chunk_path(root, digest):
+    return os.path.join(store_dir(root), "chunks", digest[:2], digest)
+
+def put_chunk(root, data, compress=True):
+    """
+    Stores a chunk unless the store already has it. Returns (digest, bytes written).
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    path = chunk_path(root, digest)
+    if os.path.exists(path):
+        return digest, 0
+    packed = zlib.compress(data, 6) if compress else data
+    body = DEFLATED + packed if compress and len(packed) < len(data) * 0.9 else RAW + data
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(body)
+    os.replace(tmp, path)
+    return digest, len(body)
+
+def get_chunk(root, digest):
+    with open(chunk_path(root, digest), 'rb') as f:
+        body = f.read()
+    data = zlib.decompress(body[1:]) if body[:1] == DEFLATED else body[1:]
+    if hashlib.sha256(data).hexdigest() != digest:
+        raise ValueError(f"Chunk {digest} is damaged")
+    return data
+
+def snapshot_path(root, snapshot_id):
+    return os.path.join(store_dir(root), "snapshots", snapshot_id + ".json")
+
+def load_snapshot(snapshot_id, root=None):
+    try:
+        with open(snapshot_path(root, snapshot_id), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"No snapshot '{snapshot_id}' (see: podcast_cli.py snapshot list)")
+
+class StoreLock:
+    """
+    Held by create and prune: a prune running next to a create could
+    delete chunks the new snapshot is about to refer to.
+    """
+
+    def __init__(self, root):
+        self.path = os.path.join(store_dir(root), "lock")
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        try:
+            os.close(os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            raise RuntimeError(f"Another snapshot command is running (or crashed: remove {self.path})")
+        return self
+
+    def __exit__(self, *exc):
+        os.remove(self.path)
+
+def snapshot_ids(root=None):
+    folder = os.path.join(store_dir(root), "snapshots")
+    if not os.path.isdir(folder):
+        return []
+    return sorted(name[:-5] for name in os.listdir(folder) if name.endswith(".json"))
+
+
+# --- CREATE ---
+
+def iter_site_files(root):
+    """
+    Relative paths (forward slashes) of everything a snapshot covers.
+    """
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in EXCLUDED_DIRS)
+        for name in sorted(filenames):
+            if not name.endswith(EXCLUDED_SUFFIXES):
+                yield os.path.relpath(os.path.join(dirpath, name), root).replace(os.sep, "/")
+
+def store_file(root, path, compress):
+    """
+    Chunks a file into the store. Returns (chunk digests, new bytes stored).
+    """
+    chunks, added = [], 0
+    with open(path, 'rb') as f:
+        for data in podcast_chunks.iter_chunks(f):
+            digest, written = put_chunk(root, data, compress)
+            chunks.append(digest)
+            added += written
+    return chunks, added
+
+@timed("snapshot.create")
+def create(root=None, label=""):
+    """
+    Takes a snapshot of the site tree and returns its summary.
+    """
+    root = root or SCRIPT_DIR
+    with StoreLock(root):
+        return _create(root, label)
+
+def _create(root, label):
+    ids = snapshot_ids(root)
+    previous = load_snapshot(ids[-1], root)['files'] if ids else {}
+
+    files, read, new_bytes = {}, 0, 0
+    for rel in iter_site_files(root):
+        full = os.path.join(root, rel)
+        try:
+            stat = os.stat(full)
+        except OSError:
+            continue  # removed while walking
+        old = previous.get(rel)
+        if old and old['size'] == stat.st_size and old['mtime_ns'] == stat.st_mtime_ns:
+            chunks = old['chunks']
+        else:
+            compress = os.path.splitext(rel)[1].lower() not in COMPRESSED_EXTENSIONS
+            chunks, added = store_file(root, full, compress)
+            read += 1
+            new_bytes += added
+        files[rel] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'mode': stat.st_mode & 0o777,
+                      'chunks': chunks}
+
+    snapshot_id = time.strftime("%Y%m%d-%H%M%S")
+    suffix = 1
+    while snapshot_id in ids or os.path.exists(snapshot_path(root, snapshot_id)):
+        suffix += 1
+        snapshot_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{suffix}"
+    snapshot = {'id': snapshot_id, 'time': time.time(), 'label': label, 'files': files,
+                'bytes': sum(f['size'] for f in files.values()), 'new_bytes': new_bytes}
+    path = snapshot_path(root, snapshot_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, ensure_ascii=False, separators=(",", ":"))
+    # The snapshot exists only once all its chunks are stored
+    os.replace(tmp, path)
+    return {**summary(snapshot), 'files_read': read}
+
+def summary(snapshot):
+    return {'id': snapshot['id'], 'time': time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(snapshot['time'])),
+            'label': snapshot['label'], 'files': len(snapshot['files']), 'bytes': snapshot['bytes'],
+            'new_bytes': snapshot['new_bytes']}
+
+def list_snapshots(root=None):
+    return [summary(load_snapshot(snapshot_id, root)) for snapshot_id in snapshot_ids(root)]
+
+
+# --- RESTORE / EXPORT ---
+
+def _selected(snapshot, paths):
+    if not paths:
+        return sorted(snapshot['files'])
+    wanted = [p.strip("/") for p in paths]
+    selected = sorted(rel for rel in snapshot['files']
+                      if any(rel == w or rel.startswith(w + "/") for w in wanted))
+    if not selected:
+        raise ValueError(f"No file of snapshot {snapshot['id']} matches {', '.join(paths)}")
+    return selected
+
+def iter_file(root, entry):
+    for digest in entry['chunks']:
+        yield get_chunk(root, digest)
+
+@timed("snapshot.restore")
+def restore(snapshot_id, target=None, paths=None, root=None):
+    """
+    Writes the files of a snapshot (or those under `paths`) into target
+    (default: the site itself). Files that already match are skipped; every
+    other file is replaced atomically. Files the snapshot does not have
+    are left alone.
+    """
+    root = root or SCRIPT_DIR
+    target = os.path.abspath(target or root)
+    snapshot = load_snapshot(snapshot_id, root)
+    written = skipped = 0
+    for rel in _selected(snapshot, paths):
+        entry = snapshot['files'][rel]
+        out = os.path.join(target, *rel.split("/"))
+        try:
+            stat = os.stat(out)
+            if stat.st_size == entry['size'] and stat.st_mtime_ns == entry['mtime_ns']:
+                skipped += 1
+                continue
+        except OSError:
+            pass
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+        tmp = f"{out}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            for data in iter_file(root, entry):
+                f.write(data)
+        os.chmod(tmp, entry['mode'])
+        os.replace(tmp, out)
+        # Same mtime as in the snapshot, so the next snapshot does not re-read it
+        os.utime(out, ns=(entry['mtime_ns'], entry['mtime_ns']))
+        written += 1
+    return {'id': snapshot_id, 'target': target, 'written': written, 'unchanged': skipped}
+
+class _Stream:
+    """
+    Write-only file object for zipfile on a pipe (no seek, no tell).
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.position = 0
+
+    def write(self, data):
+        self.raw.write(data)
+        self.position += len(data)
+        return len(data)
+
+    def flush(self):
+        self.raw.flush()
+
+@timed("snapshot.export")
+def export_zip(snapshot_id, output, paths=None, root=None):
+    """
+    Writes a snapshot as a zip archive to a path ("-" = stdout), one chunk
+    at a time.
+    """
+    root = root or SCRIPT_DIR
+    snapshot = load_snapshot(snapshot_id, root)
+    selected = _selected(snapshot, paths)
+    out = _Stream(sys.stdout.buffer) if output == "-" else open(output, 'wb')
+    try:
+        with zipfile.ZipFile(out, 'w', allowZip64=True) as archive:
+            for rel in selected:
+                entry = snapshot['files'][rel]
+                stamp = datetime.datetime.fromtimestamp(entry['mtime_ns'] / 1e9)
+                info = zipfile.ZipInfo(rel, date_time=max(stamp, datetime.datetime(1980, 1, 1)).timetuple()[:6])
+                info.external_attr = (0o100000 | entry['mode']) << 16
+                info.compress_type = (zipfile.ZIP_STORED if os.path.splitext(rel)[1].lower() in COMPRESSED_EXTENSIONS
+                                      else zipfile.ZIP_DEFLATED)
+                with archive.open(info, 'w', force_zip64=entry['size'] > 0x7FFFFFFF) as f:
+                    for data in iter_file(root, entry):
+                        f.write(data)
+    finally:
+        if output != "-":
+            out.close()
+        else:
+            out.flush()
+    return {'id': snapshot_id, 'output': output, 'files': len(selected)}
+
+
+# --- RETENTION ---
+
+def retained(snapshots, keep_last=7, keep_daily=30, keep_weekly=12, keep_monthly=12):
+    """
+    Ids to keep: the newest `keep_last`, plus the newest snapshot of each of
+    the last `keep_daily` days, `keep_weekly` weeks and `keep_monthly` months
+    that have one. Labelled snapshots are always kept.
+    """
+    newest_first = sorted(snapshots, key=lambda s: s['time'], reverse=True)
+    keep = {s['id'] for s in newest_first[:keep_last]}
+    keep |= {s['id'] for s in newest_first if s['label']}
+    for count, period in ((keep_daily, "%Y-%m-%d"), (keep_weekly, "%G-W%V"), (keep_monthly, "%Y-%m")):
+        seen = []
+        for s in newest_first:
+            key = time.strftime(period, time.localtime(s['time']))
+            if key not in seen:
+                seen.append(key)
+                if len(seen) > count:
+                    break
+                keep.add(s['id'])
+    return keep
+
+@timed("snapshot.prune")
+def prune(root=None, keep_last=7, keep_daily=30, keep_weekly=12, keep_monthly=12, dry_run=False):
+    """
+    Deletes the snapshots the retention policy does not keep, then every
+    chunk no remaining snapshot refers to.
+    """
+    root = root or SCRIPT_DIR
+    with StoreLock(root):
+        return _prune(root, keep_last, keep_daily, keep_weekly, keep_monthly, dry_run)
+
+def _prune(root, keep_last, keep_daily, keep_weekly, keep_monthly, dry_run):
+    snapshots = [load_snapshot(snapshot_id, root) for snapshot_id in snapshot_ids(root)]
+    keep = retained([{'id': s['id'], 'time': s['time'], 'label': s['label']} for s in snapshots],
+                    keep_last, keep_daily, keep_weekly, keep_monthly)
+    removed = [s['id'] for s in snapshots if s['id'] not in keep]
+    used = {digest for s in snapshots if s['id'] in keep for f in s['files'].values() for digest in f['chunks']}
+    if not dry_run:
+        for snapshot_id in removed:
+            os.remove(snapshot_path(root, snapshot_id))
+
+    chunks = freed = 0
+    folder = os.path.join(store_dir(root), "chunks")
+    for dirpath, _, filenames in os.walk(folder):
+        for name in filenames:
+            if name not in used:
+                path = os.path.join(dirpath, name)
+                chunks += 1
+                freed += os.path.getsize(path)
+                if not dry_run:
+                    os.remove(path)
+    return {'removed': removed, 'kept': sorted(keep), 'chunks_removed': chunks, 'bytes_freed': freed,
+            'dry_run': dry_run}
@@ -0,0 +1,159 @@
+import os
+import sys
+import time
+import atexit
+import functools
+
+# Set PODCAST_PROFILE=1 for a timing report at exit,
+# or PODCAST_PROFILE=cprofile:<file> to also capture a cProfile dump.
+ENV_VAR = "PODCAST_PROFILE"
+
+_enabled = False
+_report_registered = False
+_stats = {}  # span name -> [calls, total seconds, max seconds]
+
+
+class _NullSpan:
+    """Shared do-nothing span returned while timing is disabled."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def is_enabled():
+    return _enabled
+
+def record(name, seconds):
+    entry = _stats.get(name)
+    if entry is None:
+        _stats[name] = [1, seconds, seconds]
+    else:
+        entry[0] += 1
+        entry[1] += seconds
+        if seconds > entry[2]:
+            entry[2] = seconds
+
+def span(name):
+    """
+    Context manager timing the enclosed block under `name`.
+    Costs one flag check when timing is disabled.
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name)
+
+def timed(name):
+    """
+    Decorator recording every call of the function under `name`.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+def enable(report_at_exit=True):
+    global _enabled, _report_registered
+    _enabled = True
+    if report_at_exit and not _report_registered:
+        atexit.register(print_report)
+        _report_registered = True
+
+def disable():
+    global _enabled
+    _enabled = False
+
+def reset():
+    _stats.clear()
+
+def get_stats():
+    """
+    Returns {name: {'calls', 'total', 'avg', 'max'}} with times in seconds.
+    """
+    return {name: {'calls': c, 'total': t, 'avg': t / c, 'max': m}
+            for name, (c, t, m) in _stats.items()}
+
+def print_report(file=None):
+    file = file or sys.stderr
+    if not _stats:
+        return
+    print("\n--- Timing report ---", file=file)
+    print(f"{'stage':<36}{'calls':>8}{'total ms':>12}{'avg ms':>10}{'max ms':>10}", file=file)
+    for name, (calls, total, worst) in sorted(_stats.items(), key=lambda kv: -kv[1][1]):
+        print(f"{name:<36}{calls:>8}{total * 1000:>12.2f}{total / calls * 1000:>10.3f}{worst * 1000:>10.3f}", file=file)
+
+def _pop_flag(argv, flag, takes_value=False):
+    if flag not in argv:
+        return None
+    i = argv.index(flag)
+    if not takes_value:
+        del argv[i]
+        return True
+    if i + 1 >= len(argv):
+        del argv[i]
+        return None
+    value = argv[i + 1]
+    del argv[i:i + 2]
+    return value
+
+def run_main(main, argv=None):
+    """
+    Runs a script's main() honouring --profile, --cprofile <file> and PODCAST_PROFILE.
+    The flags are removed from argv so the script's own argument parsing never sees them.
+    """
+    argv = sys.argv if argv is None else argv
+    cprofile_path = None
+
+    env = os.environ.get(ENV_VAR, "")
+    if env and env != "0":
+        enable()
+        if env.startswith("cprofile:"):
+            cprofile_path = env.split(":", 1)[1]
+
+    if _pop_flag(argv, "--profile"):
+        enable()
+    path = _pop_flag(argv, "--cprofile", takes_value=True)
+    if path:
+        enable()
+        cprofile_path = path
+
+    if not cprofile_path:
+        return main()
+
+    import cProfile
+    import pstats
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(main)
+    finally:
+        profiler.dump_stats(cprofile_path)
+        print(f"\ncProfile data written to {cprofile_path}", file=sys.stderr)
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(15)
@@ -0,0 +1,133 @@
+import os
+import re
+import json
+import shutil
+import hashlib
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from podcast_timing import timed
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join("podcasts", "audio")
+DEFAULT_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+
+# EBU R128 style loudness for spoken word: every episode plays at the same volume
+LOUDNORM = "loudnorm=I=-16:TP=-1.5:LRA=11"
+
+# Output formats, primary first. The page links the Opus file; generate_html_block
+# adds the AAC twin as a fallback (see AUDIO_FALLBACKS in podcast_core.py).
+PROFILES = (
+    ("opus", ".opus", ["-c:a", "libopus", "-b:a", "48k", "-vbr", "on", "-application", "audio"]),
+    ("aac", ".m4a", ["-c:a", "aac", "-b:a", "80k", "-movflags", "+faststart"]),
+)
+
+CHUNK_SIZE = 1 << 20
+
+
+def find_ffmpeg():
+    path = shutil.which("ffmpeg")
+    if not path:
+        raise FileNotFoundError("ffmpeg was not found on PATH; install it to transcode audio")
+    return path
+
+def input_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def settings_key():
+    """
+    Hash of everything that shapes the output, so changed settings never hit old results.
+    """
+    return hashlib.sha256(json.dumps([LOUDNORM, PROFILES]).encode('utf-8')).hexdigest()
+
+def slug(path):
+    """
+    "Soul (Sisters).mp3.mpeg" -> "soul-sisters"
+    """
+    name = os.path.basename(path)
+    while True:
+        stem, ext = os.path.splitext(name)
+        if not ext or not 1 < len(ext) <= 6:
+            break
+        name = stem
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-') or "episode"
+
+def output_base(source, digest):
+    # The name carries the input and settings hash: same input + settings = same file
+    key = hashlib.sha256((digest + settings_key()).encode('utf-8')).hexdigest()[:10]
+    return f"{slug(source)}-{key}"
+
+@timed("transcode.ffmpeg")
+def run_ffmpeg(ffmpeg, source, target, codec_args):
+    """
+    Encodes source into target via a temporary file, so a crashed encode never
+    looks like a finished (cached) one.
+    """
+    base, ext = os.path.splitext(target)
+    tmp = f"{base}.tmp{ext}"
+    cmd = [ffmpeg, "-nostdin", "-hide_banner", "-loglevel", "error", "-y",
+           "-i", source, "-vn", "-map_metadata", "-1", "-af", LOUDNORM, *codec_args, tmp]
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise RuntimeError(f"ffmpeg failed for {os.path.basename(source)}: {proc.stderr.strip()[-500:]}")
+    os.replace(tmp, target)
+    return target
+
+@timed("transcode.run")
+def transcode(sources, root=None, output_dir=None, workers=DEFAULT_WORKERS):
+    """
+    Transcodes local audio files into every profile with loudness
+    normalization. Each (file, profile) pair is one ffmpeg process; up to
+    `workers` of them run at the same time. Files whose output already
+    exists (same input hash and settings) are not encoded again.
+
+    Returns one result per source: the output files and the link to use in a
+    section page (relative to podcasts/<section>/index.html).
+    """
+    root = root or SCRIPT_DIR
+    output_dir = os.path.join(root, output_dir or DEFAULT_OUTPUT)
+    for source in sources:
+        if not os.path.isfile(source):
+            raise FileNotFoundError(f"Audio file not found: {source}")
+    ffmpeg = find_ffmpeg()
+    os.makedirs(output_dir, exist_ok=True)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        digests = list(pool.map(input_hash, sources))
+
+        results = []
+        jobs = []
+        for source, digest in zip(sources, digests):
+            base = output_base(source, digest)
+            outputs = {}
+            cached = True
+            for name, ext, codec_args in PROFILES:
+                target = os.path.join(output_dir, base + ext)
+                outputs[name] = os.path.relpath(target, root).replace(os.sep, "/")
+                if not os.path.exists(target):
+                    cached = False
+                    jobs.append(pool.submit(run_ffmpeg, ffmpeg, source, target, codec_args))
+            primary = os.path.relpath(os.path.join(output_dir, base + PROFILES[0][1]),
+                                      os.path.join(root, "podcasts", "section"))
+            results.append({'source': source, 'sha256': digest, 'cached': cached,
+                            'outputs': outputs, 'link': primary.replace(os.sep, "/")})
+
+        errors = []
+        for job in jobs:
+            try:
+                job.result()
+            except RuntimeError as e:
+                errors.append(str(e))
+    if errors:
+        raise RuntimeError("; ".join(errors))
+
+    for r in results:
+        r['bytes'] = {name: os.path.getsize(os.path.join(root, rel)) for name, rel in r['outputs'].items()}
+        r['source_bytes'] = os.path.getsize(r['source'])
+    return results
@@ -0,0 +1,338 @@
+import os
+import json
+import base64
+import hashlib
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from podcast_timing import timed
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_NAME = ".uploads"
+
+DEFAULT_ENDPOINT = "https://s3.us.archive.org"
+DEFAULT_PUBLIC_URL = "https://archive.org/download/{bucket}/{key}"
+DEFAULT_WORKERS = 4
+DEFAULT_TIMEOUT = 60
+DEFAULT_RETRIES = 3
+PART_SIZE = 16 * 1024 * 1024
+MIN_PART_SIZE = 5 * 1024 * 1024     # S3 rejects smaller parts (except the last)
+MAX_PARTS = 10000
+USER_AGENT = "podcast-upload/1.0 (+https://minatobrot.github.io)"
+
+# Uploads local audio to an S3-compatible endpoint (archive.org's IAS3 by
+# default) and returns the public URL for the card, instead of uploading in
+# the browser and pasting the link.
+#
+#   PODCAST_S3_ACCESS / PODCAST_S3_SECRET   keys (archive.org: https://archive.org/account/s3.php)
+#   PODCAST_S3_BUCKET                       bucket, i.e. the archive.org item identifier
+#   PODCAST_S3_ENDPOINT                     default https://s3.us.archive.org
+#   PODCAST_S3_PUBLIC_URL                   default https://archive.org/download/{bucket}/{key}
+#
+#   python podcast_cli.py upload ~/Aufnahmen/jazz.mp3 --bucket ksasz-m2a-podcasts
+#   python podcast_cli.py add m2a --title "Jazz" --upload-file ~/Aufnahmen/jazz.mp3
+#   python add_podcast.py      (a local file path as "Archive Link" is uploaded)
+#
+# Files go up as a multipart upload: parts of PART_SIZE are sent by
+# `workers` threads, each with a Content-MD5 the server checks, and the ETag
+# it answers (the part's MD5) is compared too. The upload id and finished
+# parts are kept in .uploads/<hash>.json, so an interrupted upload resumes
+# with the parts the server does not have yet. The final ETag is checked
+# against the MD5s of all parts before the URL is returned.
+#
+# Auth is the IAS3 "LOW access:secret" header; for a local stand-in server
+# see benchmarks/s3_standin.py.
+
+
+# --- CONFIG ---
+
+def config(bucket=None, endpoint=None, public_url=None):
+    """
+    Upload settings from the environment; arguments override it.
+    """
+    settings = {'endpoint': (endpoint or os.environ.get('PODCAST_S3_ENDPOINT') or DEFAULT_ENDPOINT).rstrip("/"),
+                'bucket': bucket or os.environ.get('PODCAST_S3_BUCKET'),
+                'access': os.environ.get('PODCAST_S3_ACCESS'),
+                'secret': os.environ.get('PODCAST_S3_SECRET'),
+                'public_url': public_url or os.environ.get('PODCAST_S3_PUBLIC_URL') or DEFAULT_PUBLIC_URL}
+    if not settings['bucket']:
+        raise ValueError("No bucket: set PODCAST_S3_BUCKET or pass --bucket")
+    return settings
+
+def object_key(path):
+    """
+    Key of a local file in the bucket: its name, with spaces and other
+    characters archive.org renames replaced.
+    """
+    name = os.path.basename(path)
+    return "".join(c if c.isalnum() or c in "._-" else "_" for c in name) or "audio"
+
+def public_url(settings, key):
+    return settings['public_url'].format(bucket=settings['bucket'], key=urllib.parse.quote(key))
+
+def part_size_for(size, part_size=PART_SIZE):
+    return max(part_size, MIN_PART_SIZE, -(-size // MAX_PARTS))
+
+
+# --- HTTP ---
+
+class UploadError(OSError):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+def _object_url(settings, key, **query):
+    url = f"{settings['endpoint']}/{settings['bucket']}/{urllib.parse.quote(key)}"
+    return url + ("?" + urllib.parse.urlencode(query) if query else "")
+
+def _send(settings, method, url, data=None, headers=None, timeout=DEFAULT_TIMEOUT):
+    """
+    One request; returns (status, headers, body).
+    """
+    headers = {'User-Agent': USER_AGENT, **(headers or {})}
+    if settings['access'] and settings['secret']:
+        headers['Authorization'] = f"LOW {settings['access']}:{settings['secret']}"
+    if data is not None:
+        headers['Content-Length'] = str(len(data))
+    request = urllib.request.Request(url, data=data, method=method, headers=headers)
+    with urllib.request.urlopen(request, timeout=timeout) as resp:
+        return resp.status, resp.headers, resp.read()
+
+def _retrying(call, retries):
+    """
+    Runs call() until it succeeds; server errors and broken connections are
+    retried, client errors (4xx) are not.
+    """
+    retries = max(1, retries)
+    for attempt in range(retries):
+        try:
+            return call()
+        except urllib.error.HTTPError as e:
+            if e.code < 500 or attempt == retries - 1:
+                raise UploadError(f"HTTP {e.code}: {e.read().decode('utf-8', 'replace')[:200]}", e.code)
+        except (urllib.error.URLError, OSError) as e:
+            if attempt == retries - 1:
+                raise UploadError(str(e))
+
+def _find(element, name):
+    """
+    Text of the first descendant called `name`, whatever its XML namespace.
+    """
+    for child in element.iter():
+        if child.tag.rsplit("}", 1)[-1] == name:
+            return child.text
+    return None
+
+def _children(element, name):
+    return [child for child in element.iter() if child.tag.rsplit("}", 1)[-1] == name]
+
+def _etag(value):
+    return (value or "").strip().strip('"')
+
+
+# --- MULTIPART ---
+
+def initiate(settings, key, content_type, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES):
+    headers = {'Content-Type': content_type,
+               # archive.org: create the item on first upload, file it as audio
+               'x-amz-auto-make-bucket': "1", 'x-archive-meta-mediatype': "audio"}
+    _, _, body = _retrying(lambda: _send(settings, "POST", _object_url(settings, key, uploads=""), b"",
+                                         headers, timeout), retries)
+    upload_id = _find(ET.fromstring(body), "UploadId")
+    if not upload_id:
+        raise UploadError("Server did not return an UploadId")
+    return upload_id
+
+def list_parts(settings, key, upload_id, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES):
+    """
+    {part number: etag} of the parts the server already has, or None if it
+    no longer knows the upload.
+    """
+    parts, marker = {}, 0
+    while True:
+        url = _object_url(settings, key, uploadId=upload_id, **{'part-number-marker': marker})
+        try:
+            _, _, body = _retrying(lambda: _send(settings, "GET", url, timeout=timeout), retries)
+        except UploadError as e:
+            if e.status == 404:
+                return None
+            raise
+        tree = ET.fromstring(body)
+        for part in _children(tree, "Part"):
+            parts[int(_find(part, "PartNumber"))] = _etag(_find(part, "ETag"))
+        if (_find(tree, "IsTruncated") or "").lower() != "true":
+            return parts
+        marker = int(_find(tree, "NextPartNumberMarker"))
+
+def read_part(path, number, part_size):
+    with open(path, 'rb') as f:
+        f.seek((number - 1) * part_size)
+        return f.read(part_size)
+
+def upload_part(settings, key, upload_id, path, number, part_size, timeout=DEFAULT_TIMEOUT,
+                retries=DEFAULT_RETRIES):
+    """
+    Sends one part and checks the server stored what was sent. Returns (number, md5 hex, bytes).
+    """
+    data = read_part(path, number, part_size)
+    md5 = hashlib.md5(data)
+    url = _object_url(settings, key, partNumber=number, uploadId=upload_id)
+    headers = {'Content-MD5': base64.b64encode(md5.digest()).decode('ascii')}
+    _, response_headers, _ = _retrying(lambda: _send(settings, "PUT", url, data, headers, timeout), retries)
+    etag = _etag(response_headers.get('ETag'))
+    if etag and etag != md5.hexdigest():
+        raise UploadError(f"Part {number}: server stored ETag {etag}, sent MD5 {md5.hexdigest()}")
+    return number, md5.hexdigest(), len(data)
+
+def complete(settings, key, upload_id, md5s, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES):
+    """
+    Joins the parts and checks the final ETag: for a multipart upload it is
+    the MD5 of the part MD5s, followed by -<number of parts>.
+    """
+    numbers = sorted(md5s)
+    body = "<CompleteMultipartUpload>" + "".join(
+        f"<Part><PartNumber>{n}</PartNumber><ETag>\"{md5s[n]}\"</ETag></Part>" for n in numbers
+    ) + "</CompleteMultipartUpload>"
+    _, _, answer = _retrying(lambda: _send(settings, "POST", _object_url(settings, key, uploadId=upload_id),
+                                           body.encode('utf-8'), {'Content-Type': "application/xml"},
+                                           timeout), retries)
+    tree = ET.fromstring(answer)
+    if _children(tree, "Error") or tree.tag.rsplit("}", 1)[-1] == "Error":
+        raise UploadError(f"Completing the upload failed: {_find(tree, 'Message') or answer[:200]!r}")
+    expected = hashlib.md5(b"".join(bytes.fromhex(md5s[n]) for n in numbers)).hexdigest() + f"-{len(numbers)}"
+    etag = _etag(_find(tree, "ETag"))
+    if etag and etag != expected:
+        raise UploadError(f"Uploaded file has ETag {etag}, expected {expected}")
+    return etag or expected
+
+def abort(settings, key, upload_id, timeout=DEFAULT_TIMEOUT):
+    try:
+        _send(settings, "DELETE", _object_url(settings, key, uploadId=upload_id), timeout=timeout)
+    except (urllib.error.URLError, OSError):
+        pass  # the server drops unfinished uploads on its own eventually
+
+
+# --- RESUME STATE ---
+
+def state_path(root, path, settings, key):
+    name = hashlib.sha1(f"{os.path.abspath(path)}\n{settings['endpoint']}\n{settings['bucket']}\n{key}"
+                        .encode('utf-8')).hexdigest()
+    return os.path.join(root or SCRIPT_DIR, STATE_NAME, name + ".json")
+
+def load_state(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_state(path, state):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp, path)
+
+def resumable_parts(settings, key, state, path, timeout, retries):
+    """
+    {part number: md5} of the parts of an interrupted upload the server has
+    and that still match the file; None if the upload cannot be resumed.
+    """
+    remote = list_parts(settings, key, state['upload_id'], timeout, retries)
+    if remote is None:
+        return None
+    done = {}
+    for number, etag in remote.items():
+        md5 = state['parts'].get(str(number))
+        if md5 is None and number <= state['parts_total']:
+            # Sent, but interrupted before the state was saved
+            md5 = hashlib.md5(read_part(path, number, state['part_size'])).hexdigest()
+        if md5 == etag:
+            done[number] = md5
+    return done
+
+
+# --- UPLOAD ---
+
+@timed("upload.file")
+def upload(path, root=None, bucket=None, key=None, workers=DEFAULT_WORKERS, part_size=PART_SIZE,
+           timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, settings=None, progress=None):
+    """
+    Uploads a local file, resuming an interrupted upload of the same file.
+    Returns {'url', 'bucket', 'key', 'size', 'parts', 'resumed_parts',
+    'bytes', 'etag'}; 'bytes' is what this call sent.
+    """
+    settings = settings or config(bucket)
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"No such file: {path}")
+    key = key or object_key(path)
+    stat = os.stat(path)
+    size = stat.st_size
+    part_size = part_size_for(size, part_size)
+    total = max(1, -(-size // part_size))
+
+    from podcast_core import AUDIO_TYPES
+    content_type = AUDIO_TYPES.get(os.path.splitext(path)[1].lower(), "application/octet-stream")
+
+    state_file = state_path(root, path, settings, key)
+    state = load_state(state_file)
+    done = None
+    if state and (state['size'], state['mtime_ns'], state['part_size']) == (size, stat.st_mtime_ns, part_size):
+        done = resumable_parts(settings, key, state, path, timeout, retries)
+    if done is None:
+        if state:
+            abort(settings, key, state['upload_id'], timeout)  # the file changed: start over
+        state = {'file': os.path.abspath(path), 'size': size, 'mtime_ns': stat.st_mtime_ns,
+                 'part_size': part_size, 'parts_total': total, 'key': key,
+                 'upload_id': initiate(settings, key, content_type, timeout, retries), 'parts': {}}
+        done = {}
+    state['parts'] = {str(n): md5 for n, md5 in done.items()}
+    save_state(state_file, state)
+    resumed = len(done)
+
+    sent = 0
+    lock = threading.Lock()
+    missing = [n for n in range(1, total + 1) if n not in done]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [pool.submit(upload_part, settings, key, state['upload_id'], path, n, part_size, timeout, retries)
+                   for n in missing]
+        try:
+            for future in as_completed(futures):
+                number, md5, length = future.result()
+                with lock:
+                    done[number] = md5
+                    sent += length
+                    state['parts'][str(number)] = md5
+                    save_state(state_file, state)
+                if progress:
+                    progress({'part': number, 'parts': total, 'done': len(done), 'bytes': length})
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    if os.stat(path).st_mtime_ns != stat.st_mtime_ns:
+        raise UploadError(f"{path} changed during the upload; run the upload again")
+    etag = complete(settings, key, state['upload_id'], done, timeout, retries)
+    os.remove(state_file)
+    return {'url': public_url(settings, key), 'bucket': settings['bucket'], 'key': key, 'size': size,
+            'parts': total, 'resumed_parts': resumed, 'bytes': sent, 'etag': etag}
+
+def pending(root=None):
+    """
+    Interrupted uploads that the next upload of the same file resumes.
+    """
+    folder = os.path.join(root or SCRIPT_DIR, STATE_NAME)
+    if not os.path.isdir(folder):
+        return []
+    uploads = []
+    for name in sorted(os.listdir(folder)):
+        state = load_state(os.path.join(folder, name)) if name.endswith(".json") else None
+        if state:
+            uploads.append({'file': state['file'], 'key': state['key'], 'parts': len(state['parts']),
+                            'parts_total': state['parts_total']})
+    return uploads
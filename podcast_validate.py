@@ -0,0 +1,316 @@
+import os
+import re
+import glob
+import json
+import hashlib
+from urllib.parse import unquote
+from concurrent.futures import ProcessPoolExecutor
+
+import podcast_api
+import podcast_shards
+from podcast_core import get_file_content, extract_podcasts, AUDIO_TYPES
+from podcast_timing import timed
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_NAME = ".validate-cache"
+CHECKS_VERSION = 1   # bump when a card check changes, so cached results are dropped
+PDF_DIR = "podcasts/pdfs"
+# Pages that are not sections; a run over the whole site checks their tag balance too
+SITE_PAGES = ("index.html", "podcasts/index.html", "grades/*.html")
+
+# Checks every card and page of the site:
+#   structure   unclosed or stray tags (in a card, and in the page around the cards)
+#   fields      title and audio link present, <h3> and "Titel:" agree
+#   links       no empty src/href, moodle links with forcedownload=0
+#   audio       <source type> matches the file extension
+#   files       local files (audio, PDFs) exist; PDFs live under podcasts/pdfs
+#
+# The other pages of the site (SITE_PAGES: landing page, podcast overview,
+# grades) get the structure check only, when no sections are named.
+#
+# Card results depend only on the card's HTML, so they are cached by its
+# SHA-256 in .validate-cache/cache.json: a second run only checks cards that
+# changed, and a page or shard file whose hash is unchanged is not parsed at
+# all. Whether local files exist is checked on every run (a stat per
+# reference). Sections are validated in parallel worker processes.
+#
+#   python podcast_cli.py validate
+#   python podcast_cli.py validate m2a --no-cache
+
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param',
+             'source', 'track', 'wbr'}
+# Closing tags HTML lets you leave out
+OPTIONAL_END = {'li', 'p', 'dt', 'dd', 'option', 'tr', 'td', 'th'}
+TAG = re.compile(r'<!--.*?-->|<(/?)([a-zA-Z][a-zA-Z0-9-]*)\b[^>]*?(/?)>', re.DOTALL)
+H3 = re.compile(r'<h3>(.*?)</h3>', re.DOTALL)
+TITEL = re.compile(r'<strong>Titel:</strong>\s*(.*?)</li>', re.DOTALL)
+SOURCE_TAG = re.compile(r'<source\b[^>]*>')
+ATTRIBUTE = re.compile(r'\s(src|href)="([^"]*)"')
+TYPE_ATTRIBUTE = re.compile(r'\stype="([^"]*)"')
+EXTERNAL = ("http:", "https:", "//", "#", "mailto:", "tel:", "data:", "javascript:")
+
+
+def issue(severity, check, message):
+    return {'severity': severity, 'check': check, 'message': message}
+
+
+# --- CARD CHECKS ---
+
+def check_structure(html):
+    """
+    Tag balance of an HTML fragment. Returns a list of issues.
+    """
+    issues = []
+    stack = []
+    for m in TAG.finditer(html):
+        closing, name, self_closing = m.group(1), (m.group(2) or "").lower(), m.group(3)
+        if not name or name in VOID_TAGS or self_closing:
+            continue
+        if not closing:
+            stack.append(name)
+            continue
+        if name not in stack:
+            issues.append(issue('error', 'structure', f"Stray </{name}>"))
+            continue
+        while stack[-1] != name:
+            open_tag = stack.pop()
+            if open_tag not in OPTIONAL_END:
+                issues.append(issue('error', 'structure', f"<{open_tag}> is not closed before </{name}>"))
+        stack.pop()
+    for open_tag in stack:
+        if open_tag not in OPTIONAL_END:
+            issues.append(issue('error', 'structure', f"<{open_tag}> is never closed"))
+    return issues
+
+def _clean(text):
+    return " ".join(text.split())
+
+def check_card(podcast):
+    """
+    Everything about a card that depends only on its HTML. Returns
+    (issues, local references as [attribute, path]).
+    """
+    block = podcast['full_block']
+    issues = check_structure(block)
+
+    if not podcast['title']:
+        issues.append(issue('error', 'fields', "No title"))
+    if not podcast['link']:
+        issues.append(issue('error', 'fields', "No audio link"))
+    if not podcast['authors']:
+        issues.append(issue('warning', 'fields', "No authors"))
+    h3, titel = H3.search(block), TITEL.search(block)
+    if h3 and titel and _clean(h3.group(1)) != _clean(titel.group(1)):
+        issues.append(issue('error', 'fields',
+                            f"<h3> '{_clean(h3.group(1))}' differs from Titel: '{_clean(titel.group(1))}'"))
+
+    refs = []
+    for attribute, value in ATTRIBUTE.findall(block):
+        if not value.strip():
+            issues.append(issue('error', 'links', f"Empty {attribute}=\"\""))
+            continue
+        lower = value.lower()
+        if ("moodle" in lower or "ksasz.ch" in lower) and "forcedownload=0" not in lower:
+            issues.append(issue('error', 'links', f"Moodle link without forcedownload=0: {value}"))
+        if not lower.startswith(EXTERNAL):
+            refs.append([attribute, value])
+
+    for tag in SOURCE_TAG.findall(block):
+        src = ATTRIBUTE.search(tag)
+        declared = TYPE_ATTRIBUTE.search(tag)
+        if not src or not declared:
+            continue
+        ext = os.path.splitext(src.group(2).split('#', 1)[0].split('?', 1)[0])[1].lower()
+        expected = AUDIO_TYPES.get(ext)
+        if expected and declared.group(1) != expected:
+            issues.append(issue('warning', 'audio',
+                                f"type=\"{declared.group(1)}\" for a {ext} file (expected {expected})"))
+    return issues, refs
+
+def check_refs(refs, page_dir, root):
+    """
+    Local files a card points to: they must exist, PDFs under podcasts/pdfs.
+    """
+    issues = []
+    pdf_dir = os.path.normpath(os.path.join(root, PDF_DIR))
+    for attribute, value in refs:
+        path = os.path.normpath(os.path.join(page_dir, unquote(value.split('#', 1)[0].split('?', 1)[0])))
+        if not os.path.exists(path):
+            issues.append(issue('error', 'files', f"{attribute}=\"{value}\" not found"))
+        elif path.lower().endswith(".pdf") and not path.startswith(pdf_dir + os.sep):
+            issues.append(issue('warning', 'files', f"PDF outside {PDF_DIR}: {value}"))
+    return issues
+
+def card_key(podcast):
+    return hashlib.sha256(f"{CHECKS_VERSION}\n{podcast['full_block']}".encode('utf-8')).hexdigest()
+
+
+# --- PAGE CHECKS ---
+
+def check_page(content, podcasts, label="page"):
+    """
+    The page around its cards: one <main>, no cards outside it, no
+    <article> the parser missed, balanced tags once the cards are cut out.
+    """
+    issues = []
+    main_start, main_end = content.find("<main"), content.rfind(podcast_api.MAIN_END)
+    if main_start == -1 or main_end == -1:
+        issues.append(issue('error', 'structure', f"{label}: no <main> ... </main>"))
+    elif content.count("<main") > 1:
+        issues.append(issue('error', 'structure', f"{label}: more than one <main>"))
+    else:
+        outside = [p for p in podcasts if p['span'][0] < main_start or p['span'][1] > main_end]
+        for p in outside:
+            issues.append(issue('error', 'structure', f"{label}: card '{p['title']}' is outside <main>"))
+
+    articles = len(re.findall(r'<article\b', content))
+    if articles != len(podcasts):
+        issues.append(issue('error', 'structure',
+                            f"{label}: {articles} <article> tags but {len(podcasts)} readable cards"))
+
+    pieces, last = [], 0
+    for p in podcasts:
+        pieces.append(content[last:p['span'][0]])
+        last = p['span'][1]
+    pieces.append(content[last:])
+    issues += [{**i, 'message': f"{label}: {i['message']}"} for i in check_structure("".join(pieces))]
+    return issues
+
+
+# --- SECTIONS ---
+
+def load_cache(root):
+    """
+    {'pages': {file key: {'issues', 'cards': [[card key, title]]}}, 'cards': {card key: [issues, refs]}}
+    """
+    try:
+        with open(os.path.join(root, CACHE_NAME, "cache.json"), 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache.get('v') == CHECKS_VERSION:
+            return cache
+    except (OSError, ValueError):
+        pass
+    return {'v': CHECKS_VERSION, 'pages': {}, 'cards': {}}
+
+def save_cache(root, cache):
+    folder = os.path.join(root, CACHE_NAME)
+    os.makedirs(folder, exist_ok=True)
+    tmp = os.path.join(folder, f"cache.json.{os.getpid()}.tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, os.path.join(folder, "cache.json"))
+
+def section_files(section, root):
+    """
+    [(label, content, issues)] of the files that make up a section; issues
+    are the ones only visible from the shard manifest.
+    """
+    page = get_file_content(podcast_api.section_path(section, root))
+    if not podcast_shards.is_sharded(section, root):
+        return [("page", page, [])]
+    marker = [] if page.count(podcast_shards.MARKER) == 1 else [
+        issue('error', 'structure', f"page: needs exactly one {podcast_shards.MARKER}")]
+    files = [("page", page, marker)]
+    folder = podcast_shards.shards_dir(section, root)
+    for shard in podcast_shards.load_manifest(section, root)['shards']:
+        content = get_file_content(os.path.join(folder, shard['file'])) or ""
+        count = content.count('<article class="podcast-card"')
+        files.append((f"shard {shard['file']}", content, [] if count == shard['count'] else [
+            issue('error', 'structure', f"shard {shard['file']}: {count} cards, manifest says {shard['count']}")]))
+    return files
+
+@timed("validate.section")
+def validate_section(section, root=None, use_cache=True):
+    """
+    Report of one section plus what to cache:
+    ({'section', 'cards', 'checked', 'issues'}, {'pages': {...}, 'cards': {...}}).
+    A file whose content is unchanged is not even parsed again.
+    """
+    root = root or SCRIPT_DIR
+    cache = load_cache(root) if use_cache else {'pages': {}, 'cards': {}}
+    page_dir = os.path.dirname(podcast_api.section_path(section, root))
+    report = {'section': section, 'cards': 0, 'checked': 0, 'issues': []}
+    results = {'pages': {}, 'cards': {}}
+
+    for label, content, extra in section_files(section, root):
+        key = hashlib.sha256(f"{CHECKS_VERSION}\n{label}\n{content}".encode('utf-8')).hexdigest()
+        page = cache['pages'].get(key)
+        if page is None or any(card not in cache['cards'] for card, _ in page['cards']):
+            podcasts = extract_podcasts(content)
+            page = {'issues': check_page(content, podcasts, label), 'cards': []}
+            for p in podcasts:
+                card = card_key(p)
+                page['cards'].append([card, p['title']])
+                if card not in cache['cards']:
+                    cache['cards'][card] = check_card(p)
+                    report['checked'] += 1
+        results['pages'][key] = page
+
+        for i in extra + page['issues']:
+            report['issues'].append({'index': None, 'title': None, **i})
+        for card, title in page['cards']:
+            issues, refs = results['cards'][card] = cache['cards'][card]
+            for i in issues + check_refs(refs, page_dir, root):
+                report['issues'].append({'index': report['cards'], 'title': title, **i})
+            report['cards'] += 1
+    return report, results
+
+def site_pages(root):
+    return [path for pattern in SITE_PAGES for path in sorted(glob.glob(os.path.join(root, pattern)))]
+
+@timed("validate.pages")
+def validate_pages(root, cache):
+    """
+    Tag balance of the pages outside the sections. Returns
+    ([{'page', 'issues'}], {file key: cached result}).
+    """
+    reports, results = [], {}
+    for path in site_pages(root):
+        label = os.path.relpath(path, root).replace(os.sep, "/")
+        content = get_file_content(path) or ""
+        key = hashlib.sha256(f"{CHECKS_VERSION}\n{label}\n{content}".encode('utf-8')).hexdigest()
+        page = cache['pages'].get(key) or {'issues': check_structure(content), 'cards': []}
+        results[key] = page
+        reports.append({'page': label, 'issues': page['issues']})
+    return reports, results
+
+def _run(args):
+    return validate_section(*args)
+
+@timed("validate.site")
+def validate(sections=None, root=None, workers=None, use_cache=True):
+    """
+    Validates the given sections (default: all, plus the SITE_PAGES) in
+    parallel and returns {'sections': [reports], 'pages': [reports], 'cards',
+    'checked', 'errors', 'warnings'}.
+    """
+    root = root or SCRIPT_DIR
+    pages, page_results = validate_pages(root, load_cache(root) if use_cache else {'pages': {}}) \
+        if not sections else ([], {})
+    sections = sections or podcast_api.list_sections(root)
+    jobs = [(section, root, use_cache) for section in sections]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            outcomes = list(pool.map(_run, jobs))
+    else:
+        outcomes = [_run(job) for job in jobs]
+
+    # Keep only what this run used, plus the other sections' entries on a partial run
+    everything = len(sections) == len(podcast_api.list_sections(root))
+    cache = load_cache(root) if use_cache and not everything else {'v': CHECKS_VERSION, 'pages': {}, 'cards': {}}
+    reports = []
+    for report, results in outcomes:
+        reports.append(report)
+        cache['pages'].update(results['pages'])
+        cache['cards'].update(results['cards'])
+    cache['pages'].update(page_results)
+    save_cache(root, cache)
+
+    issues = [i for r in reports + pages for i in r['issues']]
+    return {'sections': reports,
+            'pages': pages,
+            'cards': sum(r['cards'] for r in reports),
+            'checked': sum(r['checked'] for r in reports),
+            'errors': sum(1 for i in issues if i['severity'] == 'error'),
+            'warnings': sum(1 for i in issues if i['severity'] == 'warning')}
@@ -0,0 +1,132 @@
+document.addEventListener('DOMContentLoaded', () => {
+
+    // --- Episode search ---
+    // The index is built by build_site.py (podcast_search.py) and split into
+    // small shards by term prefix; a query only downloads the shards of its
+    // own terms, plus the document chunks of the results it shows.
+    const form = document.getElementById('search');
+    if (!form) return;
+    const input = form.querySelector('input');
+    const list = document.getElementById('search-results');
+    const base = 'search/';
+    const cache = new Map();
+    let meta = null;
+    let pending = 0;
+
+    const load = name => {
+        if (!cache.has(name)) {
+            const request = fetch(base + name, name === 'meta.json' ? { cache: 'no-cache' } : {})
+                .then(response => response.ok ? response.json() : Promise.reject(response.status));
+            request.catch(() => cache.delete(name));
+            cache.set(name, request);
+        }
+        return cache.get(name);
+    };
+
+    input.addEventListener('input', () => {
+        clearTimeout(pending);
+        pending = setTimeout(() => run(input.value), 150);
+    });
+    form.addEventListener('submit', event => {
+        event.preventDefault();
+        run(input.value);
+    });
+
+    let latest = 0;
+    async function run(query) {
+        const ticket = ++latest;
+        const terms = tokenize(query);
+        if (!terms.length) {
+            list.replaceChildren();
+            return;
+        }
+        try {
+            meta = meta || await load('meta.json');
+            const results = await search(terms);
+            if (ticket === latest) show(results, query);
+        } catch (error) {
+            if (ticket === latest) message('Die Suche ist gerade nicht verfügbar.');
+        }
+    }
+
+    async function search(terms) {
+        let scores = null;
+        for (const term of terms) {
+            const names = Object.keys(meta.shards)
+                .filter(prefix => prefix.startsWith(term) || term.startsWith(prefix))
+                .map(prefix => meta.shards[prefix]);
+            const shards = await Promise.all(names.map(load));
+            const hits = new Map();
+            for (const shard of shards) {
+                for (const [token, postings] of Object.entries(shard)) {
+                    if (!token.startsWith(term)) continue;
+                    const exact = token === term ? 1 : 0;
+                    let doc = 0;
+                    for (let i = 0; i < postings.length; i += 2) {
+                        doc += postings[i];
+                        const score = fieldScore(postings[i + 1]) + exact;
+                        hits.set(doc, Math.max(hits.get(doc) || 0, score));
+                    }
+                }
+            }
+            if (scores === null) {
+                scores = hits;
+            } else {
+                for (const [doc, score] of scores) {
+                    if (hits.has(doc)) scores.set(doc, score + hits.get(doc));
+                    else scores.delete(doc);
+                }
+            }
+            if (!scores.size) return [];
+        }
+
+        const ranked = [...scores].sort((a, b) => b[1] - a[1] || a[0] - b[0]).slice(0, 20);
+        const chunks = await Promise.all(ranked.map(([doc]) => load(meta.chunks[Math.floor(doc / meta.chunk)])));
+        return ranked.map(([doc], i) => chunks[i][doc % meta.chunk]);
+    }
+
+    function fieldScore(mask) {
+        let score = 0;
+        for (const bit of Object.values(meta.fields)) {
+            if (mask & bit) score += bit;
+        }
+        return score;
+    }
+
+    function show(results, query) {
+        if (!results.length) {
+            message(`Keine Episode gefunden für „${query.trim()}“.`);
+            return;
+        }
+        list.replaceChildren(...results.map(([section, index, title, authors, snippet]) => {
+            const name = meta.sections[section];
+            const link = document.createElement('a');
+            link.className = 'project-card search-result';
+            // Text fragment: the browser scrolls to the card with this title
+            link.href = `${name}/#:~:text=${encodeURIComponent(title).replace(/-/g, '%2D')}`;
+            const heading = document.createElement('h3');
+            heading.textContent = title;
+            const info = document.createElement('p');
+            info.textContent = `${name.charAt(0).toUpperCase() + name.slice(1)} · von ${authors}`;
+            const text = document.createElement('p');
+            text.textContent = snippet;
+            link.append(heading, info, text);
+            return link;
+        }));
+    }
+
+    function message(text) {
+        const p = document.createElement('p');
+        p.textContent = text;
+        list.replaceChildren(p);
+    }
+});
+
+// Must match normalize() and tokenize() in podcast_search.py
+function normalize(text) {
+    return text.toLowerCase().normalize('NFKD').replace(/\p{M}/gu, '').replace(/ß/g, 'ss');
+}
+
+function tokenize(text) {
+    return normalize(text).split(/[^\p{L}\p{N}]+/u).filter(term => term.length >= 2);
+}
@@ -0,0 +1,60 @@
+document.addEventListener('DOMContentLoaded', () => {
+
+    // --- Waveform previews ---
+    // Cards with precomputed peaks (podcast_cli.py peaks) get a clickable
+    // waveform; the audio file itself is only loaded once playback starts.
+    document.querySelectorAll('audio[data-peaks]').forEach(audio => {
+        fetch(audio.dataset.peaks)
+            .then(response => response.ok ? response.json() : Promise.reject(response.status))
+            .then(data => addWaveform(audio, data))
+            .catch(() => { /* no peaks: the plain player is still there */ });
+    });
+});
+
+function addWaveform(audio, data) {
+    const canvas = document.createElement('canvas');
+    canvas.className = 'waveform';
+    canvas.setAttribute('role', 'presentation');
+    audio.parentNode.insertBefore(canvas, audio);
+
+    const styles = getComputedStyle(document.documentElement);
+    const played = styles.getPropertyValue('--accent-color').trim() || '#bb86fc';
+    const rest = '#555555';
+
+    const duration = () => (isFinite(audio.duration) && audio.duration) || data.duration || 1;
+
+    const draw = () => {
+        const ratio = window.devicePixelRatio || 1;
+        const width = canvas.clientWidth * ratio;
+        const height = canvas.clientHeight * ratio;
+        if (!width || !height) return;
+        if (canvas.width !== width || canvas.height !== height) {
+            canvas.width = width;
+            canvas.height = height;
+        }
+
+        const ctx = canvas.getContext('2d');
+        ctx.clearRect(0, 0, width, height);
+        const peaks = data.peaks;
+        const step = width / peaks.length;
+        const progress = audio.currentTime / duration();
+
+        peaks.forEach((value, i) => {
+            const bar = Math.max(1, (value / 255) * height);
+            ctx.fillStyle = (i / peaks.length) < progress ? played : rest;
+            ctx.fillRect(i * step, (height - bar) / 2, Math.max(1, step - ratio), bar);
+        });
+    };
+
+    // Click to seek (and start playing)
+    canvas.addEventListener('click', event => {
+        const box = canvas.getBoundingClientRect();
+        audio.currentTime = ((event.clientX - box.left) / box.width) * duration();
+        audio.play();
+    });
+
+    audio.addEventListener('timeupdate', draw);
+    audio.addEventListener('loadedmetadata', draw);
+    window.addEventListener('resize', draw, { passive: true });
+    draw();
+}